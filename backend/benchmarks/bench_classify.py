@@ -0,0 +1,100 @@
+"""
+bench_classify.py — the classify path end to end, per LLM backend.
+
+Runs gemini_service.classify_all_emails_async() over fixtures/events.json
+with LLM_CLASSIFY_BACKEND set to each backend in turn (the local classifier
+off, so every email reaches the backend) and reports time per email, how the
+answers parsed, fallbacks, and precision / recall / F1 of the event fields
+against the labels:
+  stub    deterministic, always available
+  local   needs llama-cpp-python and a GGUF model at LLM_LOCAL_MODEL_PATH
+  gemini  needs GEMINI_API_KEY and network access; uses real quota
+
+Backends that aren't available here are skipped.
+
+Usage: python -m benchmarks.bench_classify [--backends stub,local,gemini] [--concurrency 4] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_extract import score
+from benchmarks.common import FIXTURES_DIR, print_table, use_file_backend, write_json
+from django.conf import settings
+from emails import llm_backends
+from emails.extract import EVENT_FIELDS
+from emails.gemini_service import classify_all_emails_async
+from emails.structured import parse_stats
+
+PROFILE = {'RAID': 'high', 'PROMETEO': 'medium'}
+
+
+def unavailable(name):
+    """Why a backend can't run here, or None"""
+    if name == 'local':
+        if llm_backends.llama_cpp is None:
+            return 'llama-cpp-python is not installed'
+        if not os.path.exists(settings.LLM_LOCAL_MODEL_PATH):
+            return f'no model at {settings.LLM_LOCAL_MODEL_PATH}'
+    if name == 'gemini' and not settings.GEMINI_API_KEY:
+        return 'GEMINI_API_KEY is not set'
+    return None
+
+
+def outcomes():
+    return next((dict(r) for r in parse_stats.stats() if r['op'] == 'classify'), {})
+
+
+def run(name, cases, concurrency):
+    settings.LLM_CLASSIFY_BACKEND = name
+    before = outcomes()
+    t = time.perf_counter()
+    classifications = dict(asyncio.run(
+        classify_all_emails_async(cases, PROFILE, concurrency=concurrency)))
+    elapsed = time.perf_counter() - t
+    after = outcomes()
+
+    results = [classifications[c['gmail_id']] for c in cases]
+    row = {'backend': name, 'emails': len(cases), 'ms_per_email': elapsed * 1000 / len(cases),
+           'fallbacks': sum(1 for r in results if r.get('fallback'))}
+    for outcome in ('valid', 'repaired', 'wasted', 'failed'):
+        row[outcome] = after.get(outcome, 0) - before.get(outcome, 0)
+    return row, score(cases, results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', default='stub,local,gemini')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='in-flight requests (default: GEMINI_CONCURRENCY)')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    use_file_backend()
+    settings.LOCAL_MODEL_ENABLED = False
+    with open(os.path.join(FIXTURES_DIR, 'events.json'), encoding='utf-8') as f:
+        cases = [dict(c, gmail_id=f'e{i}', sender='') for i, c in enumerate(json.load(f))]
+
+    rows, field_rows = [], []
+    for name in args.backends.split(','):
+        reason = unavailable(name)
+        if reason:
+            print(f'{name}: skipped — {reason}')
+            continue
+        row, fields = run(name, cases, args.concurrency)
+        rows.append(row)
+        field_rows.extend(dict(r, backend=name) for r in fields)
+    field_rows.sort(key=lambda r: (EVENT_FIELDS.index(r['field']), r['backend']))
+
+    print(f'\nClassify over {len(cases)} labelled emails')
+    print_table(rows, ['backend', 'emails', 'ms_per_email', 'valid', 'repaired', 'wasted', 'failed',
+                       'fallbacks'])
+    print('\nEvent fields in the classification')
+    print_table(field_rows, ['field', 'backend', 'expected', 'predicted', 'precision', 'recall', 'f1'])
+    write_json(args.json, {'backends': rows, 'fields': field_rows})
+
+
+if __name__ == '__main__':
+    main()
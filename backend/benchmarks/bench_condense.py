@@ -0,0 +1,106 @@
+"""
+bench_condense.py — classifier input size and what survives of it.
+
+Compares the body the classify prompt used to get (the first 1000
+characters) with emails.condense.condense() at CLASSIFY_BODY_TOKENS:
+  mailbox  fixtures/mailbox.json as parsed at ingest — tokens per body
+  events   fixtures/events.json with each body wrapped the way real mail
+           arrives: a newsletter-style intro before it (one paragraph for
+           half the emails, two for the rest), then a signature, a footer
+           and a quoted older message (with its own date) after it.
+           Scored by running the rule extractor on each version of the
+           body: an event field it can no longer find is one the model
+           can't see either.
+
+Tokens are estimated at 4 characters each.
+
+Usage: python -m benchmarks.bench_condense [--budget 200] [--json out.json]
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.bench_extract import score
+from benchmarks.common import FIXTURES_DIR, MAILBOX_FIXTURE, print_table, write_json
+from emails.condense import condense, estimate_tokens
+from emails.extract import EVENT_FIELDS, extract_events
+from emails.gmail_service import parse_email
+
+OLD_CAP = 1000
+
+INTRO = ("Hello everyone! We hope your semester is going well and that you are settling into "
+         "the new routine on campus. As always, our community has been busy behind the scenes "
+         "with projects, reading groups and a lot of late-night debugging sessions, and we are "
+         "grateful to every member who showed up, asked questions and helped others along the "
+         "way. Our mission has always been to make learning collaborative and fun, and this "
+         "term we want to open our doors even wider to first-years and to students from other "
+         "departments who are curious but unsure where to begin. Whether you are an expert or "
+         "have never written a line of code, there will be something for you. Please read on "
+         "for the details of what is coming up next.\n\n")
+NEWS = ("A quick look back first: our reading group finished the second part of its series on "
+        "probabilistic models, the project teams shipped three open-source tools that are now "
+        "used by students across departments, and our alumni mentorship programme has paired "
+        "more than forty juniors with seniors working in industry and research. Thank you to "
+        "all the volunteers who made it happen and to everyone who sent us feedback.\n\n")
+SIGNATURE = ("\n\nWarm regards,\nCore Team\nStudent Gymkhana, IIT Jodhpur\n"
+             "Phone: +91 98290 12345 | Instagram: @gymkhana_iitj\n")
+FOOTER = ("\nYou are receiving this email because you subscribed to our mailing list.\n"
+          "Unsubscribe: https://lists.iitj.ac.in/unsubscribe?id=829173&utm_source=newsletter\n"
+          "© 2026 Student Gymkhana. All rights reserved. Privacy policy.\n")
+QUOTED = ("\nOn Mon, 2 Feb 2026 at 10:00, Core Team <gymkhana@iitj.ac.in> wrote:\n"
+          "> Last month's session was held on 28 January 2026 at 3 PM in LT-9.\n"
+          "> Thanks to everyone who attended.\n")
+
+
+def wrap(case, long_intro):
+    intro = INTRO + NEWS if long_intro else INTRO
+    return dict(case, body=intro + case['body'] + SIGNATURE + FOOTER + QUOTED)
+
+
+def variants(case, budget):
+    body = case['body']
+    return {'old': body[:OLD_CAP], 'condensed': condense(body, budget)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=int, default=None,
+                        help='body tokens (default: CLASSIFY_BODY_TOKENS)')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    with open(MAILBOX_FIXTURE) as f:
+        mailbox = [parse_email(m) for m in json.load(f)]
+    with open(os.path.join(FIXTURES_DIR, 'events.json'), encoding='utf-8') as f:
+        events = [wrap(c, i % 2) for i, c in enumerate(json.load(f))]
+
+    size_rows = []
+    for name, emails in (('mailbox', mailbox), ('events (wrapped)', events)):
+        bodies = [variants(e, args.budget) for e in emails]
+        t = time.perf_counter()
+        for e in emails:
+            condense(e['body'], args.budget)
+        condense_us = (time.perf_counter() - t) * 1e6 / len(emails)
+        old = sum(estimate_tokens(b['old']) for b in bodies) / len(bodies)
+        new = sum(estimate_tokens(b['condensed']) for b in bodies) / len(bodies)
+        size_rows.append({'corpus': name, 'emails': len(emails), 'old_tokens': old,
+                          'condensed_tokens': new, 'saved_pct': 100 * (old - new) / old if old else 0.0,
+                          'condense_us': condense_us})
+
+    field_rows = []
+    for version in ('old', 'condensed'):
+        results = [extract_events(dict(c, body=variants(c, args.budget)[version])) for c in events]
+        for row in score(events, results):
+            field_rows.append(dict(row, body=version))
+    field_rows.sort(key=lambda r: (EVENT_FIELDS.index(r['field']), r['body']))
+
+    print('Body tokens per classify request (estimated, chars / 4)')
+    print_table(size_rows, ['corpus', 'emails', 'old_tokens', 'condensed_tokens', 'saved_pct', 'condense_us'])
+    print(f'\nEvent fields still readable in the body ({len(events)} wrapped fixture emails)')
+    print_table(field_rows, ['field', 'body', 'expected', 'correct', 'precision', 'recall', 'f1'])
+    write_json(args.json, {'sizes': size_rows, 'fields': field_rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+bench_extract.py — accuracy and speed of the rule-based event extractor.
+
+Runs emails.extract.extract_events() over a hand-labelled corpus
+(fixtures/events.json: subject, body, Date header and the expected
+event_date / event_time / event_venue / registration_link) and reports
+per-field precision, recall and F1. A field counts as predicted when the
+extractor returns a value; venues compare case- and punctuation-blind.
+
+Usage: python -m benchmarks.bench_extract [--fixture events.json] [--repeat 200] [--verbose] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from benchmarks.common import FIXTURES_DIR, print_table, write_json
+from emails.extract import EVENT_FIELDS, extract_events
+
+
+def same(field, got, want):
+    if field == 'event_venue':
+        def key(v):
+            return re.sub(r'[\W_]+', ' ', v.lower()).strip()
+        return key(got) == key(want)
+    if field == 'registration_link':
+        return got.rstrip('/') == want.rstrip('/')
+    return got == want
+
+
+def score(cases, results):
+    rows = []
+    for field in EVENT_FIELDS:
+        predicted = expected = correct = 0
+        for case, result in zip(cases, results):
+            got, want = result[field], case['expected'][field]
+            predicted += got is not None
+            expected  += want is not None
+            correct   += got is not None and want is not None and same(field, got, want)
+        precision = correct / predicted if predicted else 0.0
+        recall    = correct / expected if expected else 0.0
+        rows.append({'field': field, 'expected': expected, 'predicted': predicted, 'correct': correct,
+                     'precision': precision, 'recall': recall,
+                     'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixture', default=os.path.join(FIXTURES_DIR, 'events.json'))
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--verbose', action='store_true', help='print every wrong or missed field')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding='utf-8') as f:
+        cases = json.load(f)
+
+    results = [extract_events(case) for case in cases]
+    rows = score(cases, results)
+
+    t = time.perf_counter()
+    for _ in range(args.repeat):
+        for case in cases:
+            extract_events(case)
+    us_per_email = (time.perf_counter() - t) * 1e6 / (args.repeat * len(cases))
+
+    if args.verbose:
+        for case, result in zip(cases, results):
+            for field in EVENT_FIELDS:
+                got, want = result[field], case['expected'][field]
+                if got != want and not (got and want and same(field, got, want)):
+                    print(f'{case["subject"][:40]:<40}  {field:<17}  got {got!r}, expected {want!r}')
+        print()
+
+    print(f'{len(cases)} labelled emails, {us_per_email:.0f} µs per email')
+    print_table(rows, ['field', 'expected', 'predicted', 'correct', 'precision', 'recall', 'f1'])
+    write_json(args.json, {'emails': len(cases), 'us_per_email': us_per_email, 'fields': rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+bench_ingest.py — ingestion pipeline over the recorded fixture mailbox.
+
+Runs emails.ingestion.ingest() (the path behind views.fetch_and_classify and
+Phase_2.run_email_pipeline) against every available storage backend:
+  cold — empty store, every message is fetched, parsed and stored
+  warm — everything already stored + classified, only list + dedup run
+
+Usage: python -m benchmarks.bench_ingest [--latency 0.05] [--repeat 5] [--json out.json]
+"""
+import argparse
+
+from benchmarks.common import MAILBOX_FIXTURE, backends, print_table, write_json
+from emails import models
+from emails.ingestion import ingest, FixtureSource, ModelsSink, CollectionSink
+
+STAGES = ['list', 'dedup', 'fetch', 'parse', 'store']
+
+
+def mark_all_classified():
+    if models.MONGO_AVAILABLE:
+        models.emails_col.update_many({}, {'$set': {'classified': True}})
+    else:
+        for e in models.emails_col:
+            e['classified'] = True
+
+
+def reset_emails(name, handle):
+    if name == 'file':
+        models.emails_col.clear()
+    else:
+        models.emails_col.delete_many({})
+        handle['phase2_emails'].delete_many({})
+
+
+def run_once(source, sink, label, rows):
+    result = ingest(source, sink, max_results=len(source.order))
+    row = {'scenario': label, 'listed': result['listed'], 'stored': result['stored'],
+           'total_ms': sum(result['timings'].values()) * 1000}
+    row.update({f'{s}_ms': result['timings'][s] * 1000 for s in STAGES})
+    rows.append(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='simulated seconds per Gmail round trip')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    source = FixtureSource(MAILBOX_FIXTURE, latency=args.latency)
+    rows = []
+    for name, handle in backends():
+        for _ in range(args.repeat):
+            reset_emails(name, handle)
+            run_once(source, ModelsSink('bench_user'), f'{name}/models cold', rows)
+            mark_all_classified()
+            run_once(source, ModelsSink('bench_user'), f'{name}/models warm', rows)
+            if name == 'mongomock':
+                sink = CollectionSink(handle['phase2_emails'], 'bench_user')
+                run_once(source, sink, f'{name}/phase2 cold', rows)
+                run_once(source, sink, f'{name}/phase2 warm', rows)
+
+    # median per scenario
+    summary = []
+    for label in dict.fromkeys(r['scenario'] for r in rows):
+        runs = sorted((r for r in rows if r['scenario'] == label), key=lambda r: r['total_ms'])
+        summary.append(runs[len(runs) // 2])
+    print(f'{len(source.order)} fixture messages, median of {args.repeat} runs')
+    print_table(summary, ['scenario', 'listed', 'stored', 'total_ms'] + [f'{s}_ms' for s in STAGES])
+    write_json(args.json, {'messages': len(source.order), 'runs': rows, 'summary': summary})
+
+
+if __name__ == '__main__':
+    main()
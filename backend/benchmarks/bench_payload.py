@@ -0,0 +1,121 @@
+"""
+bench_payload.py — size and serialization cost of the email list response.
+
+Builds N classified emails from the recorded fixture mailbox (parsed exactly as
+ingestion stores them) and serializes the /api/emails/ payload in each shape:
+  legacy    — every field incl. body, `grouped` repeats every record
+  no-body   — default projection (body omitted), `grouped` holds gmail_ids
+  minimal   — fields=subject,sender,date,summary,colour
+with the stdlib encoder JsonResponse uses and with responses.dumps
+(orjson when installed), then compresses with gzip and brotli (if installed).
+
+Usage: python -m benchmarks.bench_payload [--emails 1000] [--repeat 7] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from benchmarks.common import MAILBOX_FIXTURE, print_table, write_json
+from emails.ingestion import FixtureSource, parse_all
+from emails.models import DASHBOARD_BUCKETS, email_bucket, project_email
+from emails.responses import dumps, orjson
+from mailmind.middleware import brotli, compress
+
+QUADRANTS = ['Q1', 'Q2', 'Q3', 'Q4']
+MINIMAL   = ('subject', 'sender', 'date', 'summary', 'colour')
+
+
+def build_emails(n):
+    source = FixtureSource(MAILBOX_FIXTURE)
+    parsed = parse_all(source.messages[i] for i in source.order)
+    emails = []
+    for i in range(n):
+        email = dict(parsed[i % len(parsed)], gmail_id=f'bench{i:06d}', google_id='bench_user')
+        email.update({
+            'classified': True, 'classified_at': '2026-03-01T10:00:00',
+            'class': 'EXAM', 'importance': 'high', 'urgency': 'medium',
+            'quadrant': QUADRANTS[i % 4], 'colour': 'red', 'action': 'notify',
+            'summary': 'Mid-term exam moved to Friday 10:00 in LHC 101; bring your ID card.',
+            'event_date': '2026-03-06', 'is_informal': i % 7 == 0,
+        })
+        emails.append(email)
+    return emails
+
+
+def legacy_payload(emails):
+    grouped = {b: [] for b in DASHBOARD_BUCKETS}
+    for e in emails:
+        grouped[email_bucket(e)].append(e)
+    return {'success': True, 'emails': emails, 'grouped': grouped,
+            'counts': {k: len(v) for k, v in grouped.items()}}
+
+
+def projected_payload(emails, fields):
+    emails  = [project_email(e, fields) for e in emails]
+    grouped = {b: [] for b in DASHBOARD_BUCKETS}
+    for e in emails:
+        grouped[email_bucket(e)].append(e['gmail_id'])
+    return {'success': True, 'emails': emails, 'grouped': grouped,
+            'counts': {k: len(v) for k, v in grouped.items()}}
+
+
+ENCODERS = {
+    'json':                       lambda data: json.dumps(data, cls=DjangoJSONEncoder).encode(),
+    'orjson' if orjson else 'json-compact': dumps,
+}
+
+
+def median_ms(fn, data, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(data)
+        samples.append((time.perf_counter() - t) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--emails', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    emails = build_emails(args.emails)
+    shapes = {
+        'legacy':  legacy_payload(emails),
+        'no-body': projected_payload(emails, None),
+        'minimal': projected_payload(emails, MINIMAL),
+    }
+    per_1k = 1000 / args.emails
+
+    rows = []
+    for shape, payload in shapes.items():
+        for encoder, fn in ENCODERS.items():
+            body = fn(payload)
+            row = {'shape': shape, 'encoder': encoder,
+                   'raw_kb': len(body) / 1024 * per_1k,
+                   'encode_ms': median_ms(fn, payload, args.repeat) * per_1k}
+            for coding in ('gzip', 'br'):
+                if coding == 'br' and brotli is None:
+                    continue
+                t = time.perf_counter()
+                compressed = compress(body, coding)
+                row[f'{coding}_kb'] = len(compressed) / 1024 * per_1k
+                row[f'{coding}_ms'] = (time.perf_counter() - t) * 1000 * per_1k
+            rows.append(row)
+
+    columns = ['shape', 'encoder', 'raw_kb', 'encode_ms', 'gzip_kb', 'gzip_ms']
+    if brotli is not None:
+        columns += ['br_kb', 'br_ms']
+    else:
+        print('brotli not installed — gzip only')
+    print(f'/api/emails/ payload per 1k emails ({args.emails} built, median of {args.repeat})')
+    print_table(rows, columns)
+    write_json(args.json, {'emails': args.emails, 'rows': rows})
+
+
+if __name__ == '__main__':
+    main()
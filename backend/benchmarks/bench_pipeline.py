@@ -0,0 +1,169 @@
+"""
+bench_pipeline.py — end-to-end fetch_and_classify throughput.
+
+Runs emails.pipeline.run_fetch() (behind views.fetch_and_classify and the
+poller) for --users users at once, each over its own synthetic mailbox
+(benchmarks/synthetic.py), against every available storage backend, with
+  Gmail     a fake source serving the mailbox, --gmail-latency per round trip
+  LLM       the stub backend, --llm-latency per answer (LLM_STUB_LATENCY)
+  Calendar  fake create / update calls, --calendar-latency each
+Mail arrives in rounds: each fetch lists the newest --batch messages, --new
+of them new since the previous fetch (all of them in the first round).
+
+Reports per backend:
+  throughput  new emails per second over all fetches, wall clock
+  stages      p50 / p95 / p99 per fetch: list, dedup, fetch, parse, store
+              (ingest), classify, apply (store results, calendar,
+              notifications) and total
+  writes      write amplification — bytes handed to storage per byte of
+              Gmail message fetched — and write calls per email
+              (common.counting_writes: whole-file rewrites for the file
+              backend, BSON payloads for Mongo)
+
+Usage: python -m benchmarks.bench_pipeline [--users 5] [--rounds 4] [--batch 30] [--new 20]
+       [--gmail-latency 0.02] [--llm-latency 0.05] [--calendar-latency 0.02] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import synthetic
+from benchmarks.common import backends, counting_writes, percentile, print_table, write_json
+from django.conf import settings
+from emails import pipeline
+from emails.ingestion import GMAIL_BATCH_SIZE, plan_fetch
+from emails.llm_backends import stub_interpret
+
+INTERESTS = 'I like AI, coding, hackathons and dance'
+INGEST_STAGES = ['list', 'dedup', 'fetch', 'parse', 'store']
+STAGES = INGEST_STAGES + ['classify', 'apply', 'total']
+
+
+class FakeGmail:
+    """AsyncGmailSource stand-in over a message list, delivering it a few messages at a time"""
+
+    def __init__(self, messages, latency):
+        self.oldest_first = messages[::-1]
+        self.by_id     = {m['id']: m for m in messages}
+        self.delivered = 0
+        self.latency   = latency
+        self.thread_of = {}
+
+    def deliver(self, n):
+        self.delivered = min(len(self.oldest_first), self.delivered + n)
+
+    async def list_ids(self, max_results):
+        await asyncio.sleep(self.latency)
+        visible = self.oldest_first[:self.delivered][::-1][:max_results]
+        self.thread_of = {m['id']: m.get('threadId') for m in visible}
+        return [m['id'] for m in visible]
+
+    async def fetch(self, ids):
+        # one round trip per batch of calls, like AsyncGmailSource
+        threads, singles = plan_fetch(ids, self.thread_of)
+        await asyncio.sleep(self.latency * -(-(len(threads) + len(singles)) // GMAIL_BATCH_SIZE))
+        return [self.by_id[i] for i in ids]
+
+
+def instrument(args, sources, timings):
+    """Route run_fetch to the fakes and record per-stage timings into `timings[google_id]`"""
+    ingest, classify, apply = pipeline.ingest_async, pipeline.classify_clusters, pipeline.apply_classifications
+
+    async def ingest_async(source, sink, **kwargs):
+        result = await ingest(source, sink, **kwargs)
+        timings[sink.google_id].update(result['timings'])
+        timings[sink.google_id]['fetched_bytes'] = sum(
+            len(json.dumps(source.by_id[e['gmail_id']])) for e in result['emails'])
+        return result
+
+    def timed(name, fn):
+        async def wrapper(google_id, *a, **kw):
+            t = time.perf_counter()
+            try:
+                return await fn(google_id, *a, **kw)
+            finally:
+                timings[google_id][name] = time.perf_counter() - t
+        return wrapper
+
+    async def calendar_call(*a, **kw):
+        await asyncio.sleep(args.calendar_latency)
+        return {'success': True, 'event_id': f'ev{time.perf_counter_ns()}'}
+
+    pipeline.ingest_async          = ingest_async
+    pipeline.classify_clusters     = timed('classify', classify)
+    pipeline.apply_classifications = timed('apply', apply)
+    pipeline.AsyncGmailSource      = lambda token, budget=None, google_id=None: sources[token['google_id']]
+    pipeline.AsyncGoogleSession    = lambda token, google_id=None: None
+    pipeline.create_calendar_event_async = pipeline.update_calendar_event_async = calendar_call
+
+
+async def fetch_all(users, prefs, timings, max_results):
+    async def one(google_id):
+        timings[google_id] = {}
+        t = time.perf_counter()
+        summary = await pipeline.run_fetch(google_id, users[google_id], prefs, max_results=max_results)
+        timings[google_id]['total'] = time.perf_counter() - t
+        return dict(timings[google_id], fetched=summary['fetched'])
+    return await asyncio.gather(*(one(g) for g in users))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=30, help='messages listed per fetch (max_results)')
+    parser.add_argument('--new', type=int, default=20, help='new messages per fetch after the first')
+    parser.add_argument('--gmail-latency', type=float, default=0.02)
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--calendar-latency', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    settings.LLM_CLASSIFY_BACKEND = 'stub'
+    settings.LLM_STUB_LATENCY     = args.llm_latency
+    settings.LOCAL_MODEL_ENABLED  = False
+    prefs = {'priority_profile': stub_interpret(INTERESTS)}
+    size  = args.batch + args.new * (args.rounds - 1)
+
+    rows, stage_rows = [], []
+    for name, _ in backends():
+        users   = {f'bench{u}': {'token': {'google_id': f'bench{u}'}} for u in range(args.users)}
+        sources = {g: FakeGmail(synthetic.mailbox(size, seed=args.seed + u), args.gmail_latency)
+                   for u, g in enumerate(users)}
+        timings = {}
+        instrument(args, sources, timings)
+
+        fetches, wall = [], 0.0
+        with counting_writes() as writes:
+            for r in range(args.rounds):
+                for source in sources.values():
+                    source.deliver(args.batch if r == 0 else args.new)
+                t = time.perf_counter()
+                fetches += asyncio.run(fetch_all(users, prefs, timings, args.batch))
+                wall += time.perf_counter() - t
+
+        emails = sum(f['fetched'] for f in fetches)
+        fetched_bytes = sum(f.get('fetched_bytes', 0) for f in fetches)
+        rows.append({'backend': name, 'fetches': len(fetches), 'emails': emails,
+                     'emails_per_s': emails / wall if wall else 0.0,
+                     'write_ops_per_email': writes['ops'] / emails if emails else 0.0,
+                     'written_mb': writes['bytes'] / 1e6,
+                     'write_amplification': writes['bytes'] / fetched_bytes if fetched_bytes else 0.0})
+        for stage in STAGES:
+            samples = [f[stage] * 1000 for f in fetches if stage in f]
+            stage_rows.append({'backend': name, 'stage': stage,
+                               **{f'p{p}_ms': percentile(samples, p) for p in (50, 95, 99)}})
+
+    print(f'{args.users} users × {args.rounds} fetches ({args.batch} listed, {args.new} new after the first); '
+          f'latency: Gmail {args.gmail_latency}s, LLM {args.llm_latency}s, Calendar {args.calendar_latency}s')
+    print_table(rows, ['backend', 'fetches', 'emails', 'emails_per_s', 'write_ops_per_email', 'written_mb',
+                       'write_amplification'])
+    print('\nPer-fetch stage latency')
+    print_table(stage_rows, ['backend', 'stage', 'p50_ms', 'p95_ms', 'p99_ms'])
+    write_json(args.json, {'params': vars(args), 'backends': rows, 'stages': stage_rows})
+
+
+if __name__ == '__main__':
+    main()
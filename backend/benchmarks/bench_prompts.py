@@ -0,0 +1,110 @@
+"""
+bench_prompts.py — prompt size and build cost per Gemini request.
+
+For every fixture email × a few priority profiles, builds the classify prompt
+and reports what one request sends:
+  full    — static prefix + dynamic tail (no context caching, the old behaviour)
+  cached  — dynamic tail only (CLASSIFY_PREFIX served from Gemini cached content)
+and the same for interpret_preferences. Build time is measured cold (what every
+request used to pay: college context rebuilt, profile lists recomputed) and
+warm (static prefixes built at import, profile segment memoized).
+
+Token counts are estimated at 4 characters per token; with --count-tokens and
+GEMINI_API_KEY set they come from Gemini's count_tokens instead (one API call
+per distinct prompt, no generation).
+
+Usage: python -m benchmarks.bench_prompts [--profiles 3] [--count-tokens] [--json out.json]
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import MAILBOX_FIXTURE, print_table, write_json
+from emails import gemini_service as gs
+from emails.gmail_service import parse_email
+
+INTERESTS = ['I like AI, interested in tech fests',
+             'dance and music, skip sports',
+             'placements, quant and finance clubs, hackathons']
+
+
+def token_counter(use_api):
+    if not use_api:
+        return lambda text: round(len(text) / 4)
+    counted = {}
+
+    def count(text):
+        if text not in counted:
+            counted[text] = gs.model.count_tokens(text).total_tokens
+        return counted[text]
+    return count
+
+
+def build_us(build, repeat=200):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        build()
+    return (time.perf_counter() - t) / repeat * 1e6
+
+
+def cold_classify(e, p):
+    gs._profile_segment.cache_clear()
+    return gs.build_classify_prompt(e, p, e.get('sender', ''))
+
+
+def cold_interpret(text):
+    return gs.build_college_context() + gs.build_interpret_prompt(text)
+
+
+def summarise(op, prefix, tails, cold, warm, count):
+    prefix_tokens = count(prefix.text)
+    tail_tokens   = sum(count(t) for t in tails) / len(tails)
+    full_tokens   = prefix_tokens + tail_tokens
+    return {
+        'op': op, 'requests': len(tails), 'prefix_tokens': prefix_tokens,
+        'full_tokens': full_tokens, 'cached_tokens': tail_tokens,
+        'saved_per_request': prefix_tokens, 'saved_pct': 100 * prefix_tokens / full_tokens,
+        'cold_build_us': sum(build_us(b) for b in cold) / len(cold),
+        'warm_build_us': sum(build_us(b) for b in warm) / len(warm),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profiles', type=int, default=3)
+    parser.add_argument('--count-tokens', action='store_true')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    with open(MAILBOX_FIXTURE) as f:
+        emails = [parse_email(m) for m in json.load(f)]
+    rng = random.Random(0)
+    profiles = [{c: rng.choice(['high', 'medium', 'low', 'ignore']) for c in gs.ALL_CODES}
+                for _ in range(args.profiles)]
+    count = token_counter(args.count_tokens)
+
+    pairs = [(e, p) for p in profiles for e in emails]
+    classify = summarise(
+        'classify', gs.CLASSIFY_PREFIX,
+        [gs.build_classify_prompt(e, p, e.get('sender', '')) for e, p in pairs],
+        [lambda e=e, p=p: cold_classify(e, p) for e, p in pairs[::10]],
+        [lambda e=e, p=p: gs.build_classify_prompt(e, p, e.get('sender', '')) for e, p in pairs[::10]],
+        count)
+    interpret = summarise(
+        'interpret', gs.INTERPRET_PREFIX,
+        [gs.build_interpret_prompt(t) for t in INTERESTS],
+        [lambda t=t: cold_interpret(t) for t in INTERESTS],
+        [lambda t=t: gs.build_interpret_prompt(t) for t in INTERESTS],
+        count)
+
+    rows = [classify, interpret]
+    unit = 'Gemini count_tokens' if args.count_tokens else 'estimated (chars / 4)'
+    print(f'{len(emails)} fixture emails × {args.profiles} profiles, tokens {unit}')
+    print_table(rows, ['op', 'requests', 'prefix_tokens', 'full_tokens', 'cached_tokens',
+                       'saved_per_request', 'saved_pct', 'cold_build_us', 'warm_build_us'])
+    write_json(args.json, {'token_unit': unit, 'rows': rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_rescore.py — re-ranking a whole mailbox after a preference change.
+
+Stores N classified emails for one user, then alternates between two
+priority profiles and times ranking.rescore_emails() (load → NumPy rank →
+grouped bulk write → dashboard rebuild) on every available backend.
+rank() alone is timed too, to separate compute from storage.
+
+mongomock runs only with --mongomock: it evaluates UpdateMany/$in by scanning
+every document per id, so its numbers say nothing about a real mongod.
+
+Usage: python -m benchmarks.bench_rescore [--emails 10000] [--repeat 5] [--mongomock] [--json out.json]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import backends, print_table, write_json
+from college_data import CLUBS, FESTS
+from emails import models
+from emails.ranking import RANK_FIELDS, rank, rescore_emails
+
+USER    = 'bench_user'
+CODES   = list(CLUBS) + list(FESTS)
+CLASSES = CODES + ['ACADEMIC', 'INFORMAL_FOOD', 'INFORMAL_DEALS', 'SPAM', 'OTHER']
+SENDERS = ['exam@iitj.ac.in', 'raid@iitj.ac.in', 'offers@swiggy.in', 'noreply@unstop.com']
+
+
+def build_emails(n, rng):
+    return [{
+        'gmail_id': f'bench{i:06d}', 'subject': f'Email {i}', 'date': f'2026-03-{1 + i % 28:02d}',
+        'sender': rng.choice(SENDERS), 'classified': True, 'class': rng.choice(CLASSES),
+        'urgency': rng.choice(['high', 'medium', 'low']), 'importance': 'medium',
+        'quadrant': 'Q2', 'colour': 'yellow', 'action': 'ignore',
+        'event_date': '2026-03-20' if i % 3 == 0 else None, 'summary': 'x',
+    } for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--emails', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mongomock', action='store_true')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    profiles = [{c: rng.choice(['high', 'medium', 'low', 'ignore']) for c in CODES}
+                for _ in range(2)]
+    rows = []
+    for name, _ in backends():
+        if name == 'mongomock' and not args.mongomock:
+            continue
+        models.save_emails_bulk(USER, build_emails(args.emails, rng))
+        models.rebuild_dashboard(USER)
+        for run in range(args.repeat):
+            t = time.perf_counter()
+            changed = rescore_emails(USER, profiles[run % 2])
+            total_ms = (time.perf_counter() - t) * 1000
+
+            emails = models.get_classified_emails(USER, RANK_FIELDS)
+            t = time.perf_counter()
+            rank(emails, profiles[run % 2])
+            rank_ms = (time.perf_counter() - t) * 1000
+            rows.append({'backend': name, 'emails': args.emails, 'run': run,
+                         'changed': changed, 'rank_ms': rank_ms, 'total_ms': total_ms})
+
+    summary = []
+    for name in dict.fromkeys(r['backend'] for r in rows):
+        runs = sorted((r for r in rows if r['backend'] == name and r['run'] > 0),
+                      key=lambda r: r['total_ms']) or [r for r in rows if r['backend'] == name]
+        summary.append(runs[len(runs) // 2])
+    print(f'{args.emails} emails, median of {args.repeat - 1} profile flips (first run excluded)')
+    print_table(summary, ['backend', 'emails', 'changed', 'rank_ms', 'total_ms'])
+    write_json(args.json, {'emails': args.emails, 'runs': rows, 'summary': summary})
+
+
+if __name__ == '__main__':
+    main()
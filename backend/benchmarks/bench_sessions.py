@@ -0,0 +1,116 @@
+"""
+bench_sessions.py — auth-check latency with many active sessions.
+
+Creates N sessions holding what oauth_callback stores (google_id, email, name)
+in each session engine, then times what auth_required does per request —
+SessionStore(key).get('google_id') — for random keys after one warm-up pass:
+  file     — django.contrib.sessions.backends.file (the old setting)
+  cached   — mailmind.sessions (file + stat-validated LRU)
+  signed   — django.contrib.sessions.backends.signed_cookies
+Then ages half the session files past SESSION_COOKIE_AGE and times
+clear_expired() for the file-backed engines.
+
+Usage: python -m benchmarks.bench_sessions [--sessions 10000] [--checks 20000] [--json out.json]
+"""
+import argparse
+import importlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+
+from benchmarks.common import percentile, print_table, write_json
+from django.contrib.sessions.backends import file as file_backend
+from mailmind import sessions as cached_backend
+
+ENGINES = {
+    'file':   'django.contrib.sessions.backends.file',
+    'cached': 'mailmind.sessions',
+    'signed': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def use_session_dir(path):
+    settings.SESSION_FILE_PATH = path
+    for cls in (file_backend.SessionStore, cached_backend.SessionStore):
+        if '_storage_path' in cls.__dict__:   # the file backend caches the path per class
+            del cls._storage_path
+    cached_backend.session_cache.clear()
+    cached_backend._last_sweep = time.monotonic()   # no background sweep mid-benchmark
+
+
+def create_sessions(store_class, n):
+    keys = []
+    for i in range(n):
+        store = store_class()
+        store['google_id'] = f'1{i:020d}'
+        store['email']     = f'student{i}@iitj.ac.in'
+        store['name']      = f'Student {i}'
+        store.save()
+        keys.append(store.session_key)
+    return keys
+
+
+def auth_check(store_class, key):
+    return store_class(key).get('google_id')
+
+
+def age_half(path):
+    old = time.time() - settings.SESSION_COOKIE_AGE - 60
+    names = sorted(os.listdir(path))
+    for name in names[::2]:
+        os.utime(os.path.join(path, name), (old, old))
+    return len(names) - len(names[::2])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    rows = []
+    for name, engine in ENGINES.items():
+        store_class = importlib.import_module(engine).SessionStore
+        tmpdir = tempfile.mkdtemp(prefix='mailmind-sessions-')
+        use_session_dir(tmpdir)
+        try:
+            t = time.perf_counter()
+            keys = create_sessions(store_class, args.sessions)
+            create_s = time.perf_counter() - t
+
+            for key in keys:                       # warm-up: OS page cache / LRU
+                auth_check(store_class, key)
+            samples = []
+            for key in random.choices(keys, k=args.checks):
+                t = time.perf_counter()
+                assert auth_check(store_class, key)
+                samples.append((time.perf_counter() - t) * 1e6)
+
+            row = {'engine': name, 'sessions': args.sessions,
+                   'create_s': create_s, 'checks_per_s': len(samples) / (sum(samples) / 1e6),
+                   'p50_us': percentile(samples, 50), 'p99_us': percentile(samples, 99),
+                   'files': len(os.listdir(tmpdir))}
+            if name != 'signed':
+                expected = age_half(tmpdir)
+                t = time.perf_counter()
+                store_class.clear_expired()
+                row['sweep_s'] = time.perf_counter() - t
+                row['files_after_sweep'] = len(os.listdir(tmpdir))
+                assert row['files_after_sweep'] == expected
+            rows.append(row)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f'{args.sessions} active sessions, {args.checks} auth checks')
+    print_table(rows, ['engine', 'sessions', 'create_s', 'checks_per_s', 'p50_us', 'p99_us',
+                       'files', 'sweep_s', 'files_after_sweep'])
+    write_json(args.json, {'sessions': args.sessions, 'checks': args.checks, 'rows': rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+bench_storage.py — models.py storage operations at 1k … 1M records.
+
+Loads --sizes emails, calendar events and notifications (benchmarks/synthetic.py,
+spread over --users users) into each backend, then times one operation at a
+time for a rotating user:
+  save_email               a new email (file: duplicate scan + emails.json rewrite)
+  get_emails               the newest 50 classified emails
+  search_emails            subject / summary / class / sender regex, newest 20
+  get_calendar_events      one month of events
+  save_calendar_event      a new event (file: key scan + calendar.json rewrite)
+  mark_notifications_seen  a user with unseen notifications (file: scan + notifications.json rewrite)
+
+Reports per backend, size and operation:
+  ops_per_s, p50_ms, p99_ms  over up to --ops calls, stopping early after
+                             --budget seconds (always at least one call)
+  written_kb_per_op          common.counting_writes: whole-file rewrites for the
+                             file backend, BSON payloads for Mongo
+  peak_rss_mb                peak RSS of the process holding that dataset —
+                             every backend × size runs in its own forked
+                             process, so sizes don't inherit each other's peak
+
+mongomock scans a collection in Python and uses no index, so its latencies
+grow with size where a real mongod's wouldn't; it shows the Mongo code path's
+calls and write sizes, not server speed. The datasets live in memory (and on
+disk for the file backend, in a temp dir removed afterwards): 1M records takes
+several GB, and a run that is killed for lack of memory is reported as failed.
+
+Usage: python -m benchmarks.bench_storage [--sizes 1000,10000,100000,1000000] [--backends file,mongomock]
+       [--only save_email,get_emails] [--ops 50] [--budget 10] [--users 100] [--json out.json]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import resource
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from benchmarks import synthetic
+from benchmarks.common import (counting_writes, percentile, print_table, timed, use_file_backend,
+                               use_mongomock, write_json)
+from emails import models, storage
+
+LOAD_CHUNK = 10000
+SEARCH     = 'workshop'
+
+
+def new_email(i):
+    email = next(synthetic.stored_emails(1, 1, seed=i))
+    return dict(email, gmail_id=f'new{i:08d}', thread_id=f'new{i:08d}', cluster_id=f'new{i:08d}')
+
+
+def new_event(i):
+    event = next(synthetic.calendar_events(1, 1, seed=i))
+    return dict(event, gmail_id=f'new{i:08d}', google_event_id=f'newev{i:08d}')
+
+
+# name → fn(google_id, i): one call of the operation under test
+OPS = {
+    'save_email':              lambda g, i: models.save_email(g, new_email(i)),
+    'get_emails':              lambda g, i: models.get_emails(g, limit=50),
+    'search_emails':           lambda g, i: models.search_emails(g, SEARCH),
+    'get_calendar_events':     lambda g, i: models.get_calendar_events(g, month=3 + i % 10, year=2026),
+    'save_calendar_event':     lambda g, i: models.save_calendar_event(g, new_event(i)),
+    'mark_notifications_seen': lambda g, i: models.mark_notifications_seen(g),
+}
+
+DATASETS = (
+    # generator,                   file-backend list,            save,                        Mongo collection
+    (synthetic.stored_emails,   'emails_data',        storage.save_emails,        'emails_col'),
+    (synthetic.calendar_events, 'calendar_data',      storage.save_calendar,      'calendar_col'),
+    (synthetic.notifications,   'notifications_data', storage.save_notifications, 'notifications_col'),
+)
+
+
+def load(size, users):
+    """Bulk-load `size` records of each kind into the active backend, bypassing models.py"""
+    for generate, data_name, save, col_name in DATASETS:
+        records = generate(size, users)
+        if models.MONGO_AVAILABLE:
+            # mongomock checks a unique index by scanning on every insert; index afterwards
+            collection, chunk = getattr(models, col_name), []
+            collection.drop_indexes()
+            for record in records:
+                chunk.append(record)
+                if len(chunk) == LOAD_CHUNK:
+                    collection.insert_many(chunk)
+                    chunk = []
+            if chunk:
+                collection.insert_many(chunk)
+        else:
+            getattr(storage, data_name).extend(records)
+            save()   # the files exist at full size before the first timed write
+    if models.MONGO_AVAILABLE:
+        models.create_indexes()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KiB on Linux
+
+
+def run(backend, size, args):
+    """Load one dataset and time every operation on it — runs in a child process"""
+    tmpdir = use_file_backend() if backend == 'file' else None
+    if backend == 'mongomock':
+        use_mongomock()
+    try:
+        t = time.perf_counter()
+        load(size, args.users)
+        loaded = time.perf_counter() - t
+        print(f'  {backend} {size:,}: loaded in {loaded:.1f}s', file=sys.stderr, flush=True)
+
+        rows = []
+        for op in args.ops_list:
+            samples, started = [], time.perf_counter()
+            with counting_writes() as writes:
+                for i in range(args.ops):
+                    _, elapsed = timed(OPS[op], synthetic.user_id(i % args.users), i)
+                    samples.append(elapsed)
+                    if time.perf_counter() - started > args.budget:
+                        break
+            rows.append({'backend': backend, 'size': size, 'op': op, 'ops': len(samples),
+                         'ops_per_s': len(samples) / sum(samples) if sum(samples) else 0.0,
+                         'p50_ms': percentile(samples, 50) * 1000, 'p99_ms': percentile(samples, 99) * 1000,
+                         'written_kb_per_op': writes['bytes'] / len(samples) / 1024})
+        rss = peak_rss_mb()
+        for row in rows:
+            row['peak_rss_mb'] = rss
+        return rows, {'backend': backend, 'size': size, 'load_s': loaded, 'peak_rss_mb': rss}
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000', help='records of each kind, e.g. 1000,…,1000000')
+    parser.add_argument('--backends', default='file,mongomock')
+    parser.add_argument('--ops', type=int, default=50, help='calls per operation (at most)')
+    parser.add_argument('--only', default=','.join(OPS), help='operations to run')
+    parser.add_argument('--budget', type=float, default=10.0, help='seconds per operation before stopping early')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--json')
+    args = parser.parse_args()
+    args.ops_list = args.only.split(',')
+    unknown = set(args.ops_list) - set(OPS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    names = args.backends.split(',')
+    if 'mongomock' in names and importlib.util.find_spec('mongomock') is None:
+        print('mongomock not installed — skipping the Mongo backend')
+        names.remove('mongomock')
+
+    rows, loads = [], []
+    fork = multiprocessing.get_context('fork')
+    for size in (int(s) for s in args.sizes.split(',')):
+        for backend in names:
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=fork) as pool:
+                    op_rows, load_row = pool.submit(run, backend, size, args).result()
+            except BrokenProcessPool:
+                print(f'  {backend} {size:,}: the process died (out of memory?)', file=sys.stderr)
+                loads.append({'backend': backend, 'size': size, 'failed': True})
+                continue
+            rows += op_rows
+            loads.append(load_row)
+
+    rows.sort(key=lambda r: (list(OPS).index(r['op']), r['backend'], r['size']))
+    print(f'\n{args.users} users; up to {args.ops} calls or {args.budget}s per operation')
+    print_table(rows, ['op', 'backend', 'size', 'ops', 'ops_per_s', 'p50_ms', 'p99_ms', 'written_kb_per_op'])
+    print('\nDatasets')
+    print_table(loads, ['backend', 'size', 'load_s', 'peak_rss_mb', 'failed'])
+    write_json(args.json, {'params': {k: v for k, v in vars(args).items() if k != 'ops_list'},
+                           'operations': rows, 'datasets': loads})
+
+
+if __name__ == '__main__':
+    main()
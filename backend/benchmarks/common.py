@@ -0,0 +1,209 @@
+# benchmarks/common.py — shared setup for the benchmark scripts
+# Run any benchmark from backend/:  python -m benchmarks.bench_ingest
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+BACKEND_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'fixtures')
+MAILBOX_FIXTURE = os.path.join(FIXTURES_DIR, 'mailbox.json')
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mailmind.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from emails import models, storage  # noqa: E402
+from emails.cache import CACHES  # noqa: E402
+
+COLLECTIONS = {
+    'users_col':         ('users',           'users_data'),
+    'emails_col':        ('emails',          'emails_data'),
+    'preferences_col':   ('preferences',     'preferences_data'),
+    'notifications_col': ('notifications',   'notifications_data'),
+    'calendar_col':      ('calendar_events', 'calendar_data'),
+    'dashboards_col':    ('dashboards',      'dashboards_data'),
+    'reclassify_col':    ('reclassify_queue', 'reclassify_data'),
+    'usage_col':         ('gemini_usage',    'usage_data'),
+}
+
+
+# ── BACKENDS ──────────────────────────────────────────
+def use_file_backend():
+    """Point models.py at empty fallback storage in a temp dir. Returns the dir."""
+    tmpdir = tempfile.mkdtemp(prefix='mailmind-bench-')
+    storage.STORAGE_DIR = tmpdir
+    models.MONGO_AVAILABLE = False
+    for col_name, (_, data_name) in COLLECTIONS.items():
+        data = getattr(storage, data_name)
+        data.clear()   # models and storage share these lists
+        setattr(models, col_name, data)
+    models.versions_col = {}   # fallback versions live in memory only
+    clear_caches()
+    return tmpdir
+
+
+def use_mongomock():
+    """Point models.py at an empty in-process Mongo stand-in. None if not installed."""
+    try:
+        import mongomock
+    except ImportError:
+        return None
+    db = mongomock.MongoClient()['mailmind']
+    models.MONGO_AVAILABLE = True
+    models.db = db
+    for col_name, (mongo_name, _) in COLLECTIONS.items():
+        setattr(models, col_name, db[mongo_name])
+    models.versions_col = db['data_versions']
+    models.create_indexes()
+    clear_caches()
+    return db
+
+
+def clear_caches():
+    # cached user/preference docs belong to the previous backend
+    for cache in CACHES.values():
+        cache.clear()
+
+
+def backends():
+    """Yield (name, handle) for every backend available here"""
+    yield 'file', use_file_backend()
+    db = use_mongomock()
+    if db is None:
+        print('mongomock not installed — skipping the Mongo backend')
+    else:
+        yield 'mongomock', db
+
+
+# ── MEASUREMENT ───────────────────────────────────────
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(fmt(r.get(c))) for r in rows)) for c in columns]
+    print('  '.join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print('  '.join(fmt(r.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def fmt(value):
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return '' if value is None else str(value)
+
+
+# ── STORAGE WRITES ────────────────────────────────────
+class CountingCollection:
+    """A pymongo / mongomock collection that counts its writes and their BSON payload bytes"""
+
+    WRITES = ('insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one', 'bulk_write',
+              'find_one_and_update', 'delete_one', 'delete_many')
+
+    def __init__(self, collection, counter):
+        self._collection = collection
+        self._counter    = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in self.WRITES:
+            return attr
+
+        def write(*args, **kwargs):
+            self._counter['ops']   += 1
+            self._counter['bytes'] += payload_bytes(name, args)
+            return attr(*args, **kwargs)
+        return write
+
+
+def payload_bytes(method, args):
+    import bson
+    if method == 'insert_many':
+        docs = args[0]
+    elif method == 'bulk_write':
+        docs = [part for op in args[0] for part in (getattr(op, '_filter', None), getattr(op, '_doc', None))]
+    else:
+        docs = args[:2]
+    total = 0
+    for doc in docs:
+        for part in doc if isinstance(doc, list) else [doc]:   # update pipelines are lists
+            if isinstance(part, dict):
+                total += len(bson.encode(part))
+    return total
+
+
+@contextmanager
+def counting_writes():
+    """
+    Count what models.py writes to the active backend inside the block:
+    {'ops', 'bytes'}. File backend: every JSON file rewrite and its size.
+    Mongo: write calls and the BSON size of their filters and documents
+    (index and journal work is not visible here).
+    """
+    counter = {'ops': 0, 'bytes': 0}
+    if models.MONGO_AVAILABLE:
+        names = list(COLLECTIONS) + ['versions_col']
+        originals = {name: getattr(models, name) for name in names}
+        for name, collection in originals.items():
+            setattr(models, name, CountingCollection(collection, counter))
+        try:
+            yield counter
+        finally:
+            for name, collection in originals.items():
+                setattr(models, name, collection)
+        return
+
+    original = storage.save_data
+
+    def save_data(filename, data):
+        original(filename, data)
+        counter['ops']   += 1
+        counter['bytes'] += os.path.getsize(os.path.join(storage.STORAGE_DIR, filename))
+    storage.save_data = save_data
+    try:
+        yield counter
+    finally:
+        storage.save_data = original
+
+
+# ── RESULTS ───────────────────────────────────────────
+def run_metadata():
+    """Where a result came from: commit, time, interpreter, command line"""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  timeout=10).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'argv': sys.argv[1:]}
+
+
+def write_json(path, payload):
+    """Save `payload` plus run_metadata() under 'meta', for benchmarks.compare"""
+    if not path:
+        return
+    with open(path, 'w') as f:
+        json.dump(dict(payload, meta=run_metadata()), f, indent=2)
+    print(f'results written to {path}')
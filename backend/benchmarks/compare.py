@@ -0,0 +1,80 @@
+"""
+compare.py — diff two benchmark result files (any bench_* --json output).
+
+Numbers are matched by their path in the JSON. Rows of a list are matched
+by their text fields (backend, stage, scenario, field, ...), so reordered or
+added rows don't shift the comparison. Prints every number that changed by
+more than --threshold percent, plus the commits both files came from.
+
+Usage: python -m benchmarks.compare before.json after.json [--threshold 10] [--all]
+"""
+import argparse
+import json
+
+
+def flatten(value, path=''):
+    """{path: number} for every numeric leaf"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return {}
+    if isinstance(value, (int, float)):
+        return {path: value}
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = ((row_key(v, i), v) for i, v in enumerate(value))
+    out = {}
+    for key, child in items:
+        if path == '' and key == 'meta':
+            continue
+        out.update(flatten(child, f'{path}.{key}' if path else str(key)))
+    return out
+
+
+def row_key(row, index):
+    """A list row's identity: its text fields, else its position"""
+    if isinstance(row, dict):
+        labels = [str(v) for v in row.values() if isinstance(v, str)]
+        if labels:
+            return '[' + '/'.join(labels) + ']'
+    return f'[{index}]'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change worth showing')
+    parser.add_argument('--all', action='store_true', help='show unchanged numbers too')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    for label, result in (('before', before), ('after', after)):
+        meta = result.get('meta', {})
+        print(f"{label}: {meta.get('commit') or 'unknown commit'}{' (dirty)' if meta.get('dirty') else ''}"
+              f"  {meta.get('time', '')}")
+
+    old, new = flatten(before), flatten(after)
+    rows = []
+    for path in old.keys() & new.keys():
+        a, b = old[path], new[path]
+        change = (b - a) / abs(a) * 100 if a else (0.0 if b == a else float('inf'))
+        if args.all or abs(change) > args.threshold:
+            rows.append((path, a, b, change))
+    rows.sort(key=lambda r: -abs(r[3]))
+
+    width = max([len(r[0]) for r in rows] + [4])
+    print(f"\n{'path':<{width}}  {'before':>12}  {'after':>12}  {'change':>8}")
+    for path, a, b, change in rows:
+        print(f'{path:<{width}}  {a:>12.4g}  {b:>12.4g}  {change:>+7.1f}%')
+    only = sorted(old.keys() ^ new.keys())
+    if only:
+        print(f'\n{len(only)} numbers only in one file, e.g. {only[0]}')
+    if not rows:
+        print(f'no number changed by more than {args.threshold}%')
+
+
+if __name__ == '__main__':
+    main()
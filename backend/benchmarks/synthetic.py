@@ -0,0 +1,164 @@
+# benchmarks/synthetic.py — seeded synthetic mailboxes for the benchmarks
+# Messages are Gmail API message resources (like fixtures/mailbox.json), built
+# from college_data: club and fest announcements using their keywords, with a
+# date, time, venue from VENUES and usually a registration link; academic
+# notices (ACADEMIC terms); informal food / deals mail; spam. A share of the
+# messages are replies in an earlier message's thread (short text plus the
+# quoted original) or reminders re-sending an earlier announcement, so the
+# thread and near-duplicate paths get exercised. Same seed, same mailbox.
+import base64
+import random
+from datetime import datetime, timedelta
+
+from college_data import ACADEMIC, CLUBS, FESTS, VENUES
+
+START = datetime(2026, 3, 2, 9, 0)   # a Monday
+
+ORGS = {**CLUBS, **FESTS}
+ACTIVITIES = ('workshop', 'talk', 'session', 'hackathon', 'meetup', 'competition', 'screening', 'audition')
+INTROS = ('Hello everyone!', 'Dear students,', 'Hi all,', 'Greetings from the team!')
+FILLER = ('We are excited to bring you something new this semester.',
+          'Everyone is welcome, no prior experience is needed.',
+          'Snacks and refreshments will be provided.',
+          'Seats are limited, so register early.',
+          'Bring your laptops and your curiosity.',
+          'Certificates will be given to all participants.')
+SIGN_OFFS = ('Regards,\nCore Team', 'Thanks and regards,\nCoordinators', 'Cheers,\nThe Organising Committee')
+FOOTER = '\n\nYou are receiving this email because you are subscribed to the mailing list. Unsubscribe here.'
+REPLIES = ('Will this be recorded?', 'Is it open to first years?', 'Thanks, see you there!',
+           'Can we attend online as well?', 'Is there a registration fee?')
+INFORMAL = (('Night canteen special', 'Maggi and cold coffee at half price tonight near the hostel canteen.'),
+            ('Discount on bicycles', 'Second-hand bicycles at great prices, contact me before Sunday.'),
+            ('Pizza order', 'Group order from the pizza place at 9 pm, reply to join.'))
+SPAM = (('You have won a prize', 'Claim your reward now by sharing your bank details at http://prize.example.com'),
+        ('Limited offer', 'Earn money from home, click http://earn.example.net today.'))
+
+
+def encode(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def resource(msg_id, thread_id, subject, sender, sent, body):
+    return {
+        'id': msg_id, 'threadId': thread_id, 'labelIds': ['INBOX', 'UNREAD'], 'snippet': body[:100],
+        'payload': {'mimeType': 'text/plain',
+                    'headers': [{'name': 'Subject', 'value': subject},
+                                {'name': 'From', 'value': sender},
+                                {'name': 'Date', 'value': sent.strftime('%a, %d %b %Y %H:%M:%S +0530')}],
+                    'body': {'size': len(body), 'data': encode(body)}},
+        'sizeEstimate': len(body) + 300,
+    }
+
+
+def announcement(rng, sent):
+    code = rng.choice(list(ORGS))
+    org  = ORGS[code]
+    keywords = rng.sample(org['keywords'], min(2, len(org['keywords'])))
+    activity = rng.choice(ACTIVITIES)
+    day  = sent + timedelta(days=rng.randint(1, 14))
+    hour = rng.choice((10, 11, 14, 16, 17, 18, 19))
+    lines = [rng.choice(INTROS), '',
+             f"{code} invites you to a {activity} on {' and '.join(keywords)}.",
+             f"Date: {day.day} {day.strftime('%B %Y')}",
+             f"Time: {hour % 12 or 12} {'AM' if hour < 12 else 'PM'}",
+             f"Venue: {rng.choice(list(VENUES))}"]
+    if rng.random() < 0.7:
+        lines.append(f"Register at https://forms.gle/{code.lower()}{rng.randint(100, 999)}")
+    lines += ['', ' '.join(rng.sample(FILLER, 2)), '', rng.choice(SIGN_OFFS)]
+    subject = f"{code}: {activity.title()} on {keywords[0]}"
+    sender  = f"{org['full_name'].split(' —')[0]} <{code.lower()}@iitj.ac.in>"
+    return subject, sender, '\n'.join(lines) + FOOTER
+
+
+def academic(rng, sent):
+    term, meaning = rng.choice(list(ACADEMIC.items()))
+    day = sent + timedelta(days=rng.randint(2, 20))
+    body = (f"Dear students,\n\nThe {term} ({meaning}) schedule has been released. It starts on "
+            f"{day.day} {day.strftime('%B %Y')}. Please check the portal for your slots.\n\nAcademic Office")
+    return f"{term} schedule released", 'Academic Office <academics@iitj.ac.in>', body
+
+
+def mailbox(n, seed=0, start=START, reply_rate=0.15, reminder_rate=0.1):
+    """`n` message resources, newest first, one every 7 minutes from `start`"""
+    rng = random.Random(seed)
+    sent_so_far, out = [], []
+    for i in range(n):
+        sent   = start + timedelta(minutes=7 * i)
+        msg_id = f'{seed:02x}{i:014x}'
+        roll   = rng.random()
+        if sent_so_far and roll < reply_rate:
+            original = rng.choice(sent_so_far)
+            subject, sender, body, thread = original
+            reply = f"{rng.choice(REPLIES)}\n\nOn {sent.strftime('%a, %d %b %Y')}, {sender} wrote:\n" + \
+                '\n'.join('> ' + line for line in body.splitlines())
+            out.append(resource(msg_id, thread, f'Re: {subject}', f'Student {i} <s{i}@iitj.ac.in>',
+                                sent, reply))
+            continue
+        if sent_so_far and roll < reply_rate + reminder_rate:
+            subject, sender, body, _ = rng.choice(sent_so_far)
+            out.append(resource(msg_id, msg_id, f'Reminder: {subject}', sender, sent, body))
+            continue
+        kind = rng.random()
+        if kind < 0.65:
+            subject, sender, body = announcement(rng, sent)
+        elif kind < 0.8:
+            subject, sender, body = academic(rng, sent)
+        elif kind < 0.93:
+            subject, body = rng.choice(INFORMAL)
+            sender = f'Student {i} <s{i}@iitj.ac.in>'
+        else:
+            subject, body = rng.choice(SPAM)
+            sender = 'Offers <no-reply@promo.example.com>'
+        sent_so_far.append((subject, sender, body, msg_id))
+        out.append(resource(msg_id, msg_id, subject, sender, sent, body))
+    return out[::-1]
+
+
+# ── STORED RECORDS ────────────────────────────────────
+# Documents as models.py stores them, for the storage benchmarks: classified
+# emails, calendar events and notifications spread over `users` users.
+CLASSES   = list(ORGS) + ['ACADEMIC', 'INFORMAL_FOOD', 'INFORMAL_DEALS', 'SPAM', 'OTHER']
+QUADRANTS = ('Q1', 'Q2', 'Q3', 'Q4')
+
+
+def user_id(i):
+    return f'user{i:05d}'
+
+
+def stored_emails(n, users, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        sent = START + timedelta(minutes=i)
+        subject, sender, body = announcement(rng, sent) if i % 3 else academic(rng, sent)
+        yield {
+            'google_id': user_id(i % users), 'gmail_id': f'm{i:08d}', 'thread_id': f'm{i:08d}',
+            'cluster_id': f'm{i:08d}', 'subject': subject, 'sender': sender, 'body': body,
+            'date': sent.strftime('%a, %d %b %Y %H:%M:%S +0530'), 'classified': True,
+            'class': rng.choice(CLASSES), 'importance': rng.choice(('high', 'medium', 'low')),
+            'urgency': rng.choice(('high', 'low')), 'quadrant': rng.choice(QUADRANTS),
+            'colour': 'grey', 'action': 'ignore', 'summary': subject, 'is_informal': False,
+            'event_date': (sent + timedelta(days=3)).date().isoformat() if i % 2 else None,
+            'fallback': None, 'classified_by': 'gemini',
+        }
+
+
+def calendar_events(n, users, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        day = START + timedelta(days=rng.randint(0, 365))
+        yield {
+            'google_id': user_id(i % users), 'gmail_id': f'm{i:08d}', 'google_event_id': f'ev{i:08d}',
+            'title': f'Event {i}', 'event_date': day.date().isoformat(), 'event_time': '18:00',
+            'event_venue': rng.choice(list(VENUES)), 'summary': 'An event', 'attended': False,
+            'created_at': day.isoformat(),
+        }
+
+
+def notifications(n, users, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            'google_id': user_id(i % users), 'gmail_id': f'm{i:08d}', 'message': f'Notification {i}',
+            'importance': 'high', 'seen': rng.random() < 0.8,
+            'created_at': (START + timedelta(minutes=i)).isoformat(),
+        }
@@ -285,6 +285,36 @@ TRUSTED_SENDERS = [
     "swc@iitj.ac.in",
 ]
 
+# ══════════════════════════════════════════
+# VENUES — campus locations → spellings seen in mail
+# (emails/extract.py; rooms such as "LT-3" or "LHC 104" are matched by pattern)
+# ══════════════════════════════════════════
+VENUES = {
+    "Lecture Hall Complex":     ["lecture hall complex", "lhc"],
+    "SAC":                      ["student activity centre", "student activity center", "sac"],
+    "SAC Ground":               ["sac ground", "sac lawns"],
+    "Main Auditorium":          ["main auditorium", "auditorium"],
+    "Open Air Theatre":         ["open air theatre", "open air theater", "oat"],
+    "Central Library":          ["central library", "library"],
+    "Computer Centre":          ["computer centre", "computer center"],
+    "Sports Complex":           ["sports complex"],
+    "Football Ground":          ["football ground", "football field"],
+    "Cricket Ground":           ["cricket ground"],
+    "Basketball Court":         ["basketball court"],
+    "Badminton Court":          ["badminton court", "badminton hall"],
+    "Swimming Pool":            ["swimming pool"],
+    "Gymkhana":                 ["gymkhana office", "gymkhana"],
+    "Jodhpur Club":             ["jodhpur club"],
+    "Old Mess":                 ["old mess"],
+    "New Mess":                 ["new mess"],
+    "Shamiyana":                ["shamiyana"],
+    "Admin Block":              ["admin block", "administrative block"],
+    "Academic Block":           ["academic block"],
+    "Online - Zoom":            ["zoom"],
+    "Online - Google Meet":     ["google meet", "gmeet", "meet.google.com"],
+    "Online - MS Teams":        ["microsoft teams", "ms teams"],
+}
+
 # ══════════════════════════════════════════
 # INTEREST MAP — user text → club codes
 # ══════════════════════════════════════════
@@ -0,0 +1,174 @@
+# emails/cache.py
+# Process-local LRU + TTL cache for the user and preference documents that
+# nearly every request reads (models.get_user / models.get_preferences).
+#
+# Writes in models.py call invalidate(), which drops the local copy and, when
+# CACHE_INVALIDATION = 'mongo', broadcasts the key through a capped collection
+# so other worker processes drop theirs too. Without the channel each process
+# can serve a stale document for at most the TTL.
+
+import datetime
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, name, maxsize=1024, ttl=60.0):
+        self.name    = name
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data   = OrderedDict()   # key -> (expires_at, value)
+        self._lock   = threading.Lock()
+        self._epoch  = 0                 # bumped by every discard, see token()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def token(self):
+        """
+        Take before reading from the database and pass to set(): if anything
+        was invalidated meanwhile the (possibly stale) read isn't cached.
+        """
+        return self._epoch
+
+    def set(self, key, value, token=None):
+        with self._lock:
+            if token is not None and token != self._epoch:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._epoch += 1
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name, 'size': len(self._data), 'maxsize': self.maxsize,
+                'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+user_cache        = LRUCache('users', settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+preferences_cache = LRUCache('preferences', settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+CACHES = {c.name: c for c in (user_cache, preferences_cache)}
+
+
+def register(cache):
+    """Include another LRUCache in cache_stats() (e.g. the session cache)"""
+    CACHES[cache.name] = cache
+    return cache
+
+
+def cache_stats():
+    return [c.stats() for c in CACHES.values()]
+
+
+# ── CROSS-PROCESS INVALIDATION ────────────────────────
+INVALIDATION_COLLECTION = 'cache_invalidations'
+INVALIDATION_CAP_BYTES  = 1024 * 1024
+RESUME_OVERLAP          = 30      # seconds re-read before the newest message when a cursor is re-created
+SEEN_IDS                = 20000   # handled _ids remembered — more than the capped collection holds
+PROCESS_ID = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+_channel = None   # capped collection once start_invalidation_listener() has run
+
+
+def invalidate(cache, key):
+    """Drop `key` here and, with the Mongo channel running, in every other process"""
+    cache.discard(key)
+    if _channel is not None:
+        try:
+            _channel.insert_one({'cache': cache.name, 'key': key, 'origin': PROCESS_ID})
+        except Exception as e:
+            print(f"Cache invalidation broadcast failed: {e}")
+
+
+def start_invalidation_listener(db):
+    """
+    Tail a capped collection for other processes' invalidations. Called by
+    models.py when CACHE_INVALIDATION = 'mongo' and MongoDB is up.
+    """
+    global _channel
+    from bson import ObjectId
+    from pymongo import CursorType
+    if INVALIDATION_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(INVALIDATION_COLLECTION, capped=True, size=INVALIDATION_CAP_BYTES)
+        except Exception:
+            pass   # another process created it first
+    channel = db[INVALIDATION_COLLECTION]
+    # a tailable cursor on an empty capped collection dies immediately; the
+    # marker is also about where this process starts reading — older messages
+    # were for caches it didn't have yet
+    marker = channel.insert_one({'cache': None, 'key': None, 'origin': PROCESS_ID}).inserted_id
+    newest = marker.generation_time
+    seen   = OrderedDict()   # _ids already handled, to skip inside the overlap
+
+    def listen():
+        nonlocal newest
+        while True:
+            try:
+                # one cursor for as long as it lives. ObjectIds from different
+                # processes aren't ordered within a second, so a new cursor
+                # starts RESUME_OVERLAP seconds before the newest message seen
+                # and skips what it already handled — never the whole backlog
+                # (discard() invalidates in-flight reads even for uncached keys)
+                since  = ObjectId.from_datetime(newest - datetime.timedelta(seconds=RESUME_OVERLAP))
+                cursor = channel.find({'_id': {'$gte': since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        if doc['_id'] in seen:
+                            continue
+                        seen[doc['_id']] = None
+                        if len(seen) > SEEN_IDS:
+                            seen.popitem(last=False)
+                        newest = max(newest, doc['_id'].generation_time)
+                        cache  = CACHES.get(doc.get('cache'))
+                        if cache is not None and doc.get('origin') != PROCESS_ID:
+                            cache.discard(doc['key'])
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+                # messages may have been missed — start clean rather than serve stale docs
+                for cache in CACHES.values():
+                    cache.clear()
+            time.sleep(1)
+
+    threading.Thread(target=listen, name='cache-invalidation', daemon=True).start()
+    _channel = channel
@@ -1,6 +1,6 @@
 # emails/calendar_service.py
-from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from .gmail_service import get_credentials
 from datetime import datetime, timedelta
 
 # Maps quadrant colours to Google Calendar colour IDs
@@ -13,23 +13,10 @@ COLOUR_MAP = {
 
 
 def get_calendar_service(token_dict):
-    creds = Credentials(
-        token=token_dict.get('token', token_dict.get('access_token')),
-        refresh_token=token_dict.get('refresh_token'),
-        token_uri='https://oauth2.googleapis.com/token',
-        client_id=token_dict['client_id'],
-        client_secret=token_dict['client_secret'],
-    )
-    return build('calendar', 'v3', credentials=creds)
+    return build('calendar', 'v3', credentials=get_credentials(token_dict))
 
 
-def create_calendar_event(token_dict, subject, summary, event_date, colour='yellow'):
-    """
-    Create a Google Calendar event from a classified email.
-    event_date: "YYYY-MM-DD" string or None
-    """
-    service = get_calendar_service(token_dict)
-
+def build_event_body(subject, summary, event_date, colour='yellow'):
     # Parse date — fallback to tomorrow if not found
     if event_date:
         try:
@@ -60,6 +47,16 @@ def create_calendar_event(token_dict, subject, summary, event_date, colour='yell
             ],
         },
     }
+    return event
+
+
+def create_calendar_event(token_dict, subject, summary, event_date, colour='yellow'):
+    """
+    Create a Google Calendar event from a classified email.
+    event_date: "YYYY-MM-DD" string or None
+    """
+    service = get_calendar_service(token_dict)
+    event   = build_event_body(subject, summary, event_date, colour)
 
     try:
         created = service.events().insert(
@@ -69,3 +66,27 @@ def create_calendar_event(token_dict, subject, summary, event_date, colour='yell
     except Exception as e:
         print(f"Calendar error: {e}")
         return {'success': False, 'error': str(e)}
+
+
+async def create_calendar_event_async(session, subject, summary, event_date, colour='yellow'):
+    """Same as create_calendar_event over an AsyncGoogleSession"""
+    from .google_async import CALENDAR_API
+    event = build_event_body(subject, summary, event_date, colour)
+    try:
+        created = await session.post(f'{CALENDAR_API}/events', event)
+        return {'success': True, 'event_id': created.get('id'), 'link': created.get('htmlLink')}
+    except Exception as e:
+        print(f"Calendar error: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+async def update_calendar_event_async(session, event_id, subject, summary, event_date, colour='yellow'):
+    """Rewrite an event created by create_calendar_event_async, e.g. when a thread's date changes"""
+    from .google_async import CALENDAR_API
+    event = build_event_body(subject, summary, event_date, colour)
+    try:
+        updated = await session.patch(f'{CALENDAR_API}/events/{event_id}', event)
+        return {'success': True, 'event_id': updated.get('id', event_id), 'link': updated.get('htmlLink')}
+    except Exception as e:
+        print(f"Calendar error: {e}")
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,127 @@
+# emails/condense.py
+# Classifier input: the email body cut down to CLASSIFY_BODY_TOKENS tokens by
+# content instead of by position.
+#
+#   clean      quoted replies and forward headers (dedup.own_text), the
+#              signature after a sign-off or "-- " line, footer sentences
+#              (unsubscribe, disclaimers, "Sent from my…"), tracking
+#              parameters and click-tracker links, image placeholders and
+#              HTML entity residue
+#   select     if the clean body is still over budget, its first sentence
+#              plus the highest-scoring others (dates, times, venues, links
+#              in a registration context, deadlines, club / fest / academic
+#              keywords from college_data), kept in their original order
+#              with "…" where sentences were dropped
+#
+# Tokens are estimated at 4 characters each, as in benchmarks/bench_prompts.
+import html
+import re
+
+from django.conf import settings
+
+from college_data import ACADEMIC, CLUBS, FESTS
+from .dedup import own_text
+from .extract import (AMPM, DAY_MONTH, GAZETTEER, H24, ISO_DATE, MONTH_DAY, NOT_LINKS, NUMERIC,
+                      RANGE, REG_CONTEXT, REG_DOMAINS, RELATIVE, ROOM, URL, VENUE_LABEL, WEEKDAY)
+
+CHARS_PER_TOKEN = 4
+GAP             = ' … '
+
+SIGN_OFF    = re.compile(r'^\s*(?:(?:best|warm|kind|with)?\s*regards|thanks\s*(?:&|and)\s*regards|'
+                         r'(?:many\s+)?thanks(?: and regards)?|cheers|sincerely|yours\s+(?:truly|faithfully|sincerely)|'
+                         r'best(?: wishes)?)\s*[,.!]?\s*$', re.I | re.M)
+ATTRIBUTION = re.compile(r'\s*\bOn\s[^\n]{4,200}?\swrote:.*', re.S)   # the rest is quoted
+SIG_DASHES  = re.compile(r'^--\s*$|\s--\s+(?=(?:(?:best|warm|kind)\s+)?regards|thanks|cheers)', re.I | re.M)
+FOOTER      = re.compile(r'unsubscribe|view (?:this email )?in (?:your )?browser|you (?:are|were) receiving|'
+                         r'you received this|this (?:e-?mail|message) was sent|privacy policy|all rights reserved|'
+                         r'©|\bdisclaimer\b|\bconfidential\b|do not reply|manage (?:your )?preferences|'
+                         r'update your preferences|^sent from my \w+', re.I)
+TRACKING    = re.compile(r'[?&](?:utm_\w+|fbclid|gclid|mc_[ce]id|_hs\w+|trk\w*)=[^&\s]*', re.I)
+TRACKER     = re.compile(r'https?://(?:click|trk|track|links?|email)\.[^\s]+|https?://[^\s]*list-manage\.com[^\s]*',
+                         re.I)
+RESIDUE     = re.compile(r'\[(?:image|cid):[^\]]*\]|[\u200b-\u200d\ufeff\u00ad]|^[\s\-=_*~#]{3,}$', re.I | re.M)
+DUE         = re.compile(r'\b(?:deadline|last date|due (?:on|by|date)|before|no later than|closes?|closing)\b')
+SENTENCE    = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])|\n+')
+
+KEYWORDS = re.compile(r'\b(' + '|'.join(sorted(
+    {re.escape(k.lower()) for group in (CLUBS, FESTS) for entry in group.values()
+     for k in entry.get('keywords', ()) + entry.get('emails', ())} |
+    {re.escape(k.lower()) for k in ACADEMIC}, key=len, reverse=True)) + r')\b')
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+# ── CLEAN ─────────────────────────────────────────────
+def clean_body(body):
+    """The body without quotes, signature, footers, tracking and markup residue"""
+    text = ATTRIBUTION.sub('', own_text(html.unescape(body or '').replace('\xa0', ' ')))
+    dashes = SIG_DASHES.search(text)
+    if dashes:
+        text = text[:dashes.start()]
+    # a sign-off in the last third starts the signature
+    for m in SIGN_OFF.finditer(text):
+        if m.start() >= len(text) * 2 // 3:
+            text = text[:m.start()]
+            break
+    text = TRACKER.sub('', TRACKING.sub('', RESIDUE.sub('', text)))
+    # footers are dropped by sentence: HTML bodies arrive as a single line
+    lines = (' '.join(s for s in SENTENCE.split(' '.join(line.split())) if s and not FOOTER.search(s))
+             for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# ── SELECT ────────────────────────────────────────────
+def score(sentence):
+    """How much a sentence tells the classifier: event facts first, then topic words"""
+    s = sentence.lower()
+    points = 0
+    if any(p.search(s) for p in (DAY_MONTH, MONTH_DAY, ISO_DATE, NUMERIC, RELATIVE, WEEKDAY)):
+        points += 3
+    if any(p.search(s) for p in (RANGE, AMPM, H24)):
+        points += 2
+    if VENUE_LABEL.search(s) or ROOM.search(s) or GAZETTEER.search(s):
+        points += 2
+    links = [u for u in URL.findall(s) if not any(bad in u for bad in NOT_LINKS)]
+    if links and (REG_CONTEXT.search(s) or any(d in u for u in links for d in REG_DOMAINS)):
+        points += 2
+    if DUE.search(s):
+        points += 2
+    points += min(2, len(set(KEYWORDS.findall(s))))
+    return points
+
+
+def condense(body, budget=None):
+    """
+    The body for the classify prompt, at most `budget` tokens
+    (default CLASSIFY_BODY_TOKENS) after cleaning
+    """
+    budget = settings.CLASSIFY_BODY_TOKENS if budget is None else budget
+    text   = clean_body(body)
+    limit  = budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+
+    sentences = [s.strip() for s in SENTENCE.split(text) if s and s.strip()]
+    ranked = sorted(range(1, len(sentences)), key=lambda i: (-score(sentences[i]), i))
+    chosen, used = set(), 0
+    for i in [0] + ranked:
+        cost = len(sentences[i]) + len(GAP)
+        if used + cost <= limit:
+            chosen.add(i)
+            used += cost
+    if not chosen:   # one sentence longer than the whole budget
+        return sentences[0][:limit]
+
+    out, previous = [], -1
+    for i in sorted(chosen):
+        if out:
+            out.append(' ' if i == previous + 1 else GAP)
+        elif i > 0:
+            out.append(GAP.lstrip())
+        out.append(sentences[i])
+        previous = i
+    if previous < len(sentences) - 1:
+        out.append(GAP.rstrip())
+    return ''.join(out)
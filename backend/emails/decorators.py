@@ -0,0 +1,172 @@
+# emails/decorators.py
+# View decorators that work on both sync and async views.
+# Django 4.2's require_http_methods / csrf_exempt wrap with a sync function,
+# which turns an async view into one that returns an un-awaited coroutine.
+import asyncio
+import functools
+import hashlib
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.csrf import csrf_exempt as django_csrf_exempt
+from django.views.decorators.http import require_http_methods as django_require_http_methods
+
+
+def auth_required(view_func):
+    """FIX: Added functools.wraps to preserve function metadata"""
+    if asyncio.iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # session loads are blocking I/O — keep them off the event loop
+            google_id = await sync_to_async(request.session.get)('google_id')
+            if not google_id:
+                return JsonResponse({'error': 'Not authenticated'}, status=401)
+            request.google_id = google_id
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        google_id = request.session.get('google_id')
+        if not google_id:
+            return JsonResponse({'error': 'Not authenticated'}, status=401)
+        request.google_id = google_id
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def admin_required(view_func):
+    """auth_required, plus the user's email must be listed in settings.ADMIN_EMAILS"""
+    def is_admin(google_id):
+        from .models import get_user
+        user = get_user(google_id)
+        return bool(user) and (user.get('email') or '').lower() in settings.ADMIN_EMAILS
+
+    def forbidden():
+        return JsonResponse({'error': 'Admin access required'}, status=403)
+
+    if asyncio.iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            from .models import run_async
+            if not await run_async(is_admin, request.google_id):
+                return forbidden()
+            return await view_func(request, *args, **kwargs)
+        return auth_required(async_wrapper)
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_admin(request.google_id):
+            return forbidden()
+        return view_func(request, *args, **kwargs)
+    return auth_required(wrapper)
+
+
+def require_http_methods(request_method_list):
+    def decorator(view_func):
+        if not asyncio.iscoroutinefunction(view_func):
+            return django_require_http_methods(request_method_list)(view_func)
+        # reuse Django's check (405 + logging) on a no-op view
+        sync_check = django_require_http_methods(request_method_list)(lambda request: None)
+
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            not_allowed = sync_check(request)
+            if not_allowed is not None:
+                return not_allowed
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+    return decorator
+
+
+def csrf_exempt(view_func):
+    if not asyncio.iscoroutinefunction(view_func):
+        return django_csrf_exempt(view_func)
+
+    @functools.wraps(view_func)
+    async def async_wrapper(*args, **kwargs):
+        return await view_func(*args, **kwargs)
+    async_wrapper.csrf_exempt = True
+    return async_wrapper
+
+
+def etag_versioned(*scopes):
+    """
+    Conditional GET for read views, applied inside auth_required.
+
+    The ETag hashes the user's data versions for `scopes` (models.get_versions)
+    with the request path and query, so a matching If-None-Match is answered
+    with 304 after one key lookup, before the view queries anything.
+    Versions are read before the view runs: a write landing in between gives
+    new data under the old tag, which only costs the client one extra refetch.
+    """
+    def decorator(view_func):
+        def etag_for(request, versions):
+            # today's date too: the dashboard's upcoming list moves at midnight without a write
+            key = '|'.join([request.google_id, request.get_full_path(), str(versions.get('epoch', 0)),
+                            date.today().isoformat()]
+                           + [f'{scope}={versions.get(scope, 0)}' for scope in scopes])
+            return quote_etag(hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+        def not_modified(request, etag):
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match and {etag, '*'} & set(parse_etags(if_none_match)):
+                return with_etag(HttpResponseNotModified(), etag)
+            return None
+
+        def with_etag(response, etag):
+            if response.status_code in (200, 304):
+                response['ETag']          = etag
+                response['Cache-Control'] = 'private, no-cache'   # store, but always revalidate
+            return response
+
+        if asyncio.iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                from .models import run_async, get_versions
+                etag = etag_for(request, await run_async(get_versions, request.google_id))
+                return (not_modified(request, etag)
+                        or with_etag(await view_func(request, *args, **kwargs), etag))
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            from .models import get_versions
+            etag = etag_for(request, get_versions(request.google_id))
+            return not_modified(request, etag) or with_etag(view_func(request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+def with_deadline(seconds):
+    """
+    Bound the Gemini calls a view makes (gemini_client.deadline). A client can
+    shorten the budget with an X-Request-Timeout header (seconds), e.g. when
+    its own HTTP timeout is lower; it can't extend it.
+    """
+    def budget(request):
+        try:
+            requested = float(request.headers.get('X-Request-Timeout', ''))
+        except ValueError:
+            return seconds
+        return min(seconds, requested) if requested > 0 else seconds
+
+    def decorator(view_func):
+        from .gemini_client import deadline
+
+        if asyncio.iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                with deadline(budget(request)):
+                    return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with deadline(budget(request)):
+                return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
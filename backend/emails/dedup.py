@@ -0,0 +1,186 @@
+# emails/dedup.py
+# Clustering at ingest: the messages of one Gmail thread, and reminders,
+# forwards and lightly edited re-sends of one announcement, share a cluster.
+# Per fetch only one email of a cluster is classified — its newest, read
+# with the rest of the thread (thread_digest) — and the rest reuse its answer.
+#
+#   threads    a message joins the cluster of earlier messages of its thread,
+#              stored or in the same batch; only a thread's first message is
+#              matched by content
+#   shingles   word 3-shingles of the normalised subject and body (Re:/Fwd:/
+#              Reminder: prefixes, quoted lines, forward headers, URLs and
+#              numbers removed)
+#   signature  MinHash, NUM_PERM values; the share of equal values estimates
+#              the shingle sets' Jaccard similarity
+#   lookup     LSH: the signature is cut into BANDS bands of ROWS values, each
+#              hashed into a `minhash_bands` key. Emails sharing a key are
+#              candidates (indexed query), confirmed when the estimated
+#              similarity is at least DEDUP_THRESHOLD. With 20 × 3 a pair at
+#              0.5 similarity shares a band 93% of the time, at 0.7 >99.9%.
+#
+# Stored per email: minhash, minhash_bands, cluster_id (the gmail_id of the
+# cluster's first email, which points at itself).
+import re
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+
+NUM_PERM  = 60
+BANDS     = 20
+ROWS      = NUM_PERM // BANDS
+SHINGLE   = 3
+MIN_WORDS = 8                 # shorter texts are too generic to cluster
+REPLY_MIN_WORDS = 20          # a reply with fewer words of its own adds nothing to classify
+
+# multiply-shift hash family: top 32 bits of (a·x + b) mod 2^64, a odd.
+# Seeded: signatures are stored, so these must never change.
+_rng = np.random.default_rng(1)
+_A   = _rng.integers(0, 1 << 64, NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B   = _rng.integers(0, 1 << 64, NUM_PERM, dtype=np.uint64, endpoint=False)
+
+_PREFIX    = re.compile(r'^\s*((re|fw|fwd|reminder|gentle reminder|updated?|final call|last call)\s*:\s*)+',
+                        re.I)
+_FORWARDED = re.compile(r'-{2,}\s*forwarded message\s*-{2,}.*?(?:\n\s*\n|$)', re.I | re.S)
+_QUOTED    = re.compile(r'^\s*>.*$|^on .{0,200} wrote:\s*$', re.I | re.M)
+_URL       = re.compile(r'https?://\S+|www\.\S+')
+_WORD      = re.compile(r'[a-z]+')
+
+
+def normalize(subject, body):
+    """Lowercase words of subject + body without the parts resends change"""
+    subject = _PREFIX.sub('', subject or '')
+    body    = _QUOTED.sub(' ', _FORWARDED.sub(' ', body or ''))
+    return _WORD.findall(_URL.sub(' ', f'{subject}\n{body}').lower())
+
+
+def minhash(words):
+    """MinHash signature (NUM_PERM ints) of the word shingles, or None if there are too few words"""
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {' '.join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    x = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    with np.errstate(over='ignore'):   # wrapping is the mod 2^64
+        hashed = (x[:, None] * _A + _B) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.int64).tolist()
+
+
+def bands(signature):
+    """LSH keys for the index: '<band>:<crc of the band's rows>'"""
+    return [f'{b}:{zlib.crc32(repr(signature[b * ROWS:(b + 1) * ROWS]).encode()):08x}'
+            for b in range(BANDS)]
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def fingerprint_email(email):
+    """Sets minhash / minhash_bands on the email dict; returns the signature or None"""
+    signature = minhash(normalize(email.get('subject'), email.get('body')))
+    if signature is not None:
+        email['minhash']       = signature
+        email['minhash_bands'] = bands(signature)
+    return signature
+
+
+def own_text(body):
+    """The body without quoted replies and forward headers"""
+    return re.sub(r'\n\s*\n\s*', '\n\n', _QUOTED.sub('', _FORWARDED.sub('', body or ''))).strip()
+
+
+def own_words(email):
+    return len(normalize('', own_text(email.get('body'))))
+
+
+def assign_clusters(google_id, emails):
+    """
+    Set cluster_id on each new email: its thread's cluster if the thread has
+    earlier messages, else (with DEDUP_ENABLED) the cluster of a near-duplicate
+    among the user's stored emails from the last DEDUP_WINDOW_DAYS and earlier
+    emails of the same batch. Oldest first, so the original heads the cluster.
+    Returns how many emails joined an existing cluster.
+    """
+    from .models import find_cluster_candidates, find_thread_clusters
+    thread_ids = {e['thread_id'] for e in emails if e.get('thread_id')}
+    threads = find_thread_clusters(google_id, thread_ids) if thread_ids else {}
+
+    signatures, known = {}, []
+    if settings.DEDUP_ENABLED:
+        signatures = {e['gmail_id']: fingerprint_email(e) for e in emails
+                      if not threads.get(e.get('thread_id'))}
+        keys = {k for e in emails for k in e.get('minhash_bands', ())}
+        since = (datetime.utcnow() - timedelta(days=settings.DEDUP_WINDOW_DAYS)).isoformat()
+        known = find_cluster_candidates(google_id, keys, since) if keys else []
+
+    # band key -> [(signature, cluster_id)]; re-fetched emails are matched
+    # as part of the batch, not against their own stored copy
+    index = {}
+    for stored in known:
+        if stored['gmail_id'] in signatures:
+            continue
+        entry = (stored['minhash'], stored.get('cluster_id') or stored['gmail_id'])
+        for key in stored.get('minhash_bands', ()):
+            index.setdefault(key, []).append(entry)
+
+    joined = 0
+    for email in reversed(emails):   # Gmail lists newest first
+        thread    = email.get('thread_id')
+        signature = signatures.get(email['gmail_id'])
+        match     = threads.get(thread)
+        if match is None and signature is not None:
+            for key in email['minhash_bands']:
+                for other, cluster_id in index.get(key, ()):
+                    if similarity(signature, other) >= settings.DEDUP_THRESHOLD:
+                        match = cluster_id
+                        break
+                if match:
+                    break
+        email['cluster_id'] = match or email['gmail_id']
+        joined += email['cluster_id'] != email['gmail_id']
+        if thread:
+            threads.setdefault(thread, email['cluster_id'])
+        if signature is not None:
+            for key in email['minhash_bands']:
+                index.setdefault(key, []).append((signature, email['cluster_id']))
+    return joined
+
+
+def thread_digest(emails, first=None):
+    """
+    What to classify for a cluster's new emails (newest first): the newest,
+    with a body made of the own text of every new email in its thread, newest
+    first, then the body of `first` (the thread's stored first email, if
+    any). An update is read before what it updates, and a short reply with
+    the announcement it answers.
+    """
+    newest = emails[0]
+    thread = newest.get('thread_id')
+    parts  = [own_text(e.get('body')) for e in emails
+              if e is newest or (thread and e.get('thread_id') == thread)]
+    if first and thread and first.get('thread_id') == thread:
+        parts.append(own_text(first.get('body')))
+    return dict(newest, body='\n\n'.join(dict.fromkeys(p for p in parts if p)))
+
+
+def adds_to_thread(email, first):
+    """Whether a new email is a reply in `first`'s thread with something of its own to say"""
+    return bool(email.get('thread_id')) and email['thread_id'] == first.get('thread_id') \
+        and own_words(email) >= REPLY_MIN_WORDS
+
+
+# fields copied from the representative's classification
+REUSED_FIELDS = (
+    'class', 'importance', 'urgency', 'quadrant', 'colour', 'action', 'summary',
+    'event_date', 'event_time', 'event_venue', 'registration_link', 'organizer',
+    'is_informal', 'fallback', 'classified_by',
+)
+
+
+def reused_classification(representative_id, representative):
+    """A duplicate's classification: the representative's, marked duplicate_of"""
+    classification = {f: representative.get(f) for f in REUSED_FIELDS}
+    classification['duplicate_of'] = representative_id
+    return classification
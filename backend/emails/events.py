@@ -0,0 +1,166 @@
+# emails/events.py
+# In-process pub/sub for Server-Sent Events.
+#
+# models.create_notification and the fetch pipeline publish per-user events;
+# the SSE view in views.py subscribes. Every user keeps a short history so a
+# reconnecting EventSource can replay what it missed via Last-Event-ID.
+#
+# Events only reach subscribers in the same process. With several workers,
+# run one ASGI process per host or pin users to a worker; a client that
+# reconnects somewhere else receives a "resync" and reloads the REST endpoint.
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+SSE_HISTORY       = 100     # events kept per user for Last-Event-ID replay
+SSE_QUEUE_MAX     = 500     # undelivered events before a slow client is resynced
+SSE_HEARTBEAT     = 15      # seconds between keep-alive comments
+SSE_RETRY_MS      = 3000    # reconnect delay suggested to EventSource
+SSE_MAX_STREAM    = 300     # seconds before the server ends a stream (client reconnects)
+
+# Ids are per user and start above the boot time in ms, so ids from an earlier
+# process are always older than anything this process has published.
+BOOT_ID = int(time.time() * 1000)
+
+
+class Subscription:
+    """
+    One open stream. Uses an asyncio.Queue when created inside an event loop
+    (ASGI) and a thread queue otherwise (WSGI / runserver).
+    """
+
+    def __init__(self, google_id, loop=None):
+        self.google_id  = google_id
+        self.loop       = loop
+        self.queue      = asyncio.Queue(SSE_QUEUE_MAX) if loop else queue.Queue(SSE_QUEUE_MAX)
+        self.overflowed = False
+
+    def push(self, event):
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            self.overflowed = True   # loop is gone — stream is dead
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            self.overflowed = True
+
+    async def next_async(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def next(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    def __init__(self, history=SSE_HISTORY):
+        self._lock        = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._history     = defaultdict(lambda: deque(maxlen=history))
+        self._last_id     = defaultdict(lambda: BOOT_ID)
+
+    def publish(self, google_id, event_type, data):
+        with self._lock:
+            self._last_id[google_id] += 1
+            event = (self._last_id[google_id], event_type, data)
+            self._history[google_id].append(event)
+            subscribers = list(self._subscribers.get(google_id, ()))
+        for sub in subscribers:
+            sub.push(event)
+        return event[0]
+
+    def subscribe(self, google_id, last_event_id=None, loop=None):
+        """Register a stream; queue anything newer than last_event_id first"""
+        sub = Subscription(google_id, loop)
+        with self._lock:
+            history = self._history.get(google_id, ())
+            if last_event_id is not None:
+                oldest = history[0][0] if history else self._last_id[google_id] + 1
+                if last_event_id < oldest - 1:
+                    sub._put((None, 'resync', {}))
+                for event in history:
+                    if event[0] > last_event_id:
+                        sub._put(event)
+            self._subscribers[google_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.google_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.google_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+broker = EventBroker()
+
+
+def publish(google_id, event_type, data):
+    """Fire-and-forget publish — never lets a push failure break a write"""
+    try:
+        return broker.publish(google_id, event_type, data)
+    except Exception as e:
+        print(f"Event publish error: {e}")
+        return None
+
+
+# ── SSE STREAMS ───────────────────────────────────────
+def format_sse(event):
+    event_id, event_type, data = event
+    message = f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+    return message if event_id is None else f"id: {event_id}\n{message}"
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def stream_events(sub):
+    """Async generator for ASGI: idle streams cost one coroutine and a queue"""
+    deadline = time.monotonic() + SSE_MAX_STREAM
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while time.monotonic() < deadline and not sub.overflowed:
+            event = await sub.next_async(SSE_HEARTBEAT)
+            yield format_sse(event) if event else ": heartbeat\n\n"
+        if sub.overflowed:
+            yield format_sse((None, 'resync', {}))
+    finally:
+        broker.unsubscribe(sub)
+
+
+def stream_events_sync(sub):
+    """Blocking generator for WSGI dev servers — holds a worker thread per stream"""
+    deadline = time.monotonic() + SSE_MAX_STREAM
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while time.monotonic() < deadline and not sub.overflowed:
+            event = sub.next(SSE_HEARTBEAT)
+            yield format_sse(event) if event else ": heartbeat\n\n"
+        if sub.overflowed:
+            yield format_sse((None, 'resync', {}))
+    finally:
+        broker.unsubscribe(sub)
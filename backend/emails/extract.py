@@ -0,0 +1,269 @@
+# emails/extract.py
+# Rule-based event fields — event_date, event_time, event_venue and
+# registration_link — from an email's subject and body. No API calls, a
+# handful of precompiled patterns per email.
+#
+#   dates   ISO, day-first numeric (15/03/2026), "15th March", "March 15",
+#           today / tomorrow and weekday names, all resolved against the day
+#           the email was received (its Date header). A date without a year
+#           is the first one on or after RECENT_PAST days before that day.
+#   times   "5 PM", "5:30pm", "17:00", "1700 hrs", "5-7 PM", noon
+#   venue   a "Venue: ..." line, then room codes (LT-3, LHC 104, Room 12),
+#           then the college_data.VENUES gazetteer
+#   link    the first URL in a registration context (register, RSVP, form…)
+#           or on a form / event-platform domain
+#
+# A date or time right after "before", "by", "deadline"… is a deadline; it is
+# used only when the email mentions no other. Explicit dates win over
+# relative ones.
+#
+# Fills the event fields of local-model answers (local_model) and is sent to
+# Gemini as hints (gemini_service.build_classify_prompt).
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+sys.path.insert(0, os.path.join(settings.BASE_DIR))
+from college_data import VENUES
+
+RECENT_PAST = 60   # days; "15 March" in mail received on 20 March means this year's
+
+EVENT_FIELDS = ('event_date', 'event_time', 'event_venue', 'registration_link')
+
+MONTHS   = {m: i for i, m in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+_MONTH = (r'(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?')
+_ORD   = r'(st|nd|rd|th)?'
+
+DAY_MONTH = re.compile(rf'\b(\d{{1,2}}){_ORD}\s*(?:of\s+)?{_MONTH}(?:,?\s*(\d{{4}}))?\b')
+DAY_RANGE = re.compile(rf'\b(\d{{1,2}}){_ORD}\s*(?:-|–|to|&|and)\s*\d{{1,2}}{_ORD}\s*(?:of\s+)?{_MONTH}'
+                       rf'(?:,?\s*(\d{{4}}))?\b')
+MONTH_DAY = re.compile(rf'\b{_MONTH}\s+(\d{{1,2}}){_ORD}\b(?:,?\s*(\d{{4}}))?')
+ISO_DATE  = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+NUMERIC   = re.compile(r'\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b')
+RELATIVE  = re.compile(r'\b(today|tonight|tomorrow|day after tomorrow)\b')
+WEEKDAY   = re.compile(rf'\b(?:(this|next|coming)\s+)?({"|".join(WEEKDAYS)})\b')
+
+AMPM   = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?\s?m\b\.?')
+RANGE  = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*(?:-|–|to)\s*(\d{1,2})(?:[:.]\d{2})?\s*([ap])\.?\s?m\b')
+H24    = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)\b(?!\s*[ap]\.?\s?m\b)|\b([01]\d|2[0-3])\.?([0-5]\d)\s*hrs?\b')
+NOON   = re.compile(r'\b(noon|midday|midnight)\b')
+
+DEADLINE = re.compile(r'(?:\b(?:before|by|till|until|no later than)\s+(?:the\s+)?'
+                      r'|\b(?:deadline|last date|due|closes?|closing)\W+(?:\w+\W+){0,3})$')
+
+VENUE_LABEL = re.compile(r'\b(?:venue|location|place|where)\s*[:\-–]\s*([^\n;|]{2,80}?)\s*(?:\.\s|[\n;|]|\.?$)')
+LABEL_TAIL  = re.compile(r'\s+(?:time|timing|date|when|on)\s*[:\-].*$')
+ROOM        = re.compile(r'\b(lt|lhc|room|hall|lab)\s*[-#]?\s*(\d{1,3}[a-z]?)\b')
+_ALIASES    = {alias: name for name, aliases in VENUES.items() for alias in aliases}
+GAZETTEER   = re.compile(r'\b(' + '|'.join(re.escape(a) for a in sorted(_ALIASES, key=len, reverse=True))
+                         + r')\b')
+
+URL         = re.compile(r'https?://[^\s<>"\'()\[\]]+|\b(?:forms\.gle|bit\.ly|tinyurl\.com)/[^\s<>"\'()\[\]]+')
+REG_CONTEXT = re.compile(r'\b(regist\w*|rsvp|sign\s?up|apply|enrol\w*|form|fill|book\w*|tickets?|pass(?:es)?)\b')
+REG_DOMAINS = ('forms.gle', 'docs.google.com/forms', 'forms.office.com', 'unstop.com', 'devfolio.co',
+               'lu.ma', 'eventbrite.', 'typeform.com', 'tally.so', 'konfhub.com', 'townscript.com')
+NOT_LINKS   = ('unsubscribe', 'meet.google.com', 'zoom.us', 'teams.microsoft', 'privacy',
+               '.png', '.jpg', '.jpeg', '.gif')
+
+# header lines of forwarded / quoted mail carry dates that aren't the event's
+HEADER_LINE = re.compile(r'^\s*(?:(?:from|sent|to|cc|subject)\s*:|date\s*:\s*(?:mon|tue|wed|thu|fri|sat|sun)\w*,).*$',
+                         re.I | re.M)
+
+
+def received_date(email):
+    """Day the email arrived: its Date header, else fetched_at, else today"""
+    try:
+        return parsedate_to_datetime(email.get('date') or '').date()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(email.get('fetched_at') or '').date()
+    except ValueError:
+        return date.today()
+
+
+def _in_deadline(text, start):
+    return DEADLINE.search(text[max(0, start - 40):start]) is not None
+
+
+def _full_year(year):
+    year = int(year)
+    return year + 2000 if year < 100 else year
+
+
+def _day(year, month, day, received):
+    """date() or None; a missing year is inferred from `received`"""
+    try:
+        if year is not None:
+            return date(_full_year(year), month, day)
+        found = date(received.year, month, day)
+        if found < received - timedelta(days=RECENT_PAST):
+            found = date(received.year + 1, month, day)
+        return found
+    except ValueError:
+        return None
+
+
+# ── DATES ─────────────────────────────────────────────
+def _explicit_dates(text, received):
+    for m in DAY_RANGE.finditer(text):   # "12 to 15 February" starts on the 12th
+        day, ordinal, _, month, year = m.groups()
+        yield m.start(), _day(year, MONTHS[month[:3]], int(day), received)
+    for m in DAY_MONTH.finditer(text):
+        day, ordinal, month, year = m.groups()
+        if month == 'may' and not (ordinal or year):   # "3 may apply"
+            continue
+        yield m.start(), _day(year, MONTHS[month[:3]], int(day), received)
+    for m in MONTH_DAY.finditer(text):
+        month, day, ordinal, year = m.groups()
+        yield m.start(), _day(year, MONTHS[month[:3]], int(day), received)
+    for m in ISO_DATE.finditer(text):
+        yield m.start(), _day(m.group(1), int(m.group(2)), int(m.group(3)), received)
+    for m in NUMERIC.finditer(text):
+        yield m.start(), _day(m.group(3), int(m.group(2)), int(m.group(1)), received)
+
+
+def _relative_dates(text, received):
+    for m in RELATIVE.finditer(text):
+        word = m.group(1)
+        days = 2 if word == 'day after tomorrow' else 1 if word == 'tomorrow' else 0
+        yield m.start(), received + timedelta(days=days)
+    for m in WEEKDAY.finditer(text):
+        target = WEEKDAYS.index(m.group(2))
+        if m.group(1) == 'next':   # the one in next calendar week
+            ahead = 7 - received.weekday() + target
+        else:
+            ahead = (target - received.weekday()) % 7
+        yield m.start(), received + timedelta(days=ahead)
+
+
+def _pick(candidates, text):
+    """Earliest candidate outside a deadline phrase, else the earliest one"""
+    candidates = sorted((start, value) for start, value in candidates if value is not None)
+    for start, value in candidates:
+        if not _in_deadline(text, start):
+            return value
+    return candidates[0][1] if candidates else None
+
+
+def extract_date(text, received):
+    found = _pick(_explicit_dates(text, received), text) or _pick(_relative_dates(text, received), text)
+    return found.isoformat() if found else None
+
+
+# ── TIMES ─────────────────────────────────────────────
+def _hhmm(hour, minute, meridiem=None):
+    if meridiem == 'p' and hour < 12:
+        hour += 12
+    elif meridiem == 'a' and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f'{hour:02d}:{minute:02d}'
+
+
+def _times(text):
+    taken = []   # spans already used by a longer pattern
+
+    def free(m):
+        if any(s < m.end() and m.start() < e for s, e in taken):
+            return False
+        taken.append(m.span())
+        return True
+
+    for m in RANGE.finditer(text):
+        if free(m):
+            start, end, meridiem = int(m.group(1)), int(m.group(3)), m.group(4)
+            if start > end and end != 12:   # "11-1 pm" starts in the morning
+                meridiem = 'a' if meridiem == 'p' else 'p'
+            yield m.start(), _hhmm(start, int(m.group(2) or 0), meridiem)
+    for m in AMPM.finditer(text):
+        if free(m):
+            yield m.start(), _hhmm(int(m.group(1)), int(m.group(2) or 0), m.group(3))
+    for m in H24.finditer(text):
+        if free(m):
+            hour, minute = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+            yield m.start(), _hhmm(int(hour), int(minute))
+    for m in NOON.finditer(text):
+        if free(m):
+            yield m.start(), '00:00' if m.group(1) == 'midnight' else '12:00'
+
+
+def extract_time(text):
+    return _pick(_times(text), text)
+
+
+# ── VENUE ─────────────────────────────────────────────
+def _room(m):
+    kind, number = m.group(1), m.group(2).upper()
+    if kind == 'lt':
+        return f'LT-{number}'
+    if kind == 'lhc':
+        return f'LHC {number}'
+    return f'{kind.title()} {number}'
+
+
+def _venue_in(text):
+    """Room (with the building right after it, if any), else gazetteer place, else None"""
+    room = ROOM.search(text)
+    if room:
+        building = GAZETTEER.match(text, room.end() + 2) or GAZETTEER.match(text, room.end() + 1)
+        name = _room(room)
+        if building and _ALIASES[building.group(1)] != name and building.group(1) not in ('lhc', 'lt'):
+            name += ', ' + _ALIASES[building.group(1)]
+        return name
+    place = GAZETTEER.search(text)
+    return _ALIASES[place.group(1)] if place else None
+
+
+def extract_venue(text, original):
+    label = VENUE_LABEL.search(text)
+    if label:
+        value = LABEL_TAIL.sub('', label.group(1))
+        # keep the sender's spelling when the label holds no known place
+        return _venue_in(value) or original[label.start(1):label.start(1) + len(value)].strip(' ,.')
+    return _venue_in(text)
+
+
+# ── REGISTRATION LINK ─────────────────────────────────
+def extract_link(text, original):
+    for m in URL.finditer(original):
+        url = m.group(0).rstrip('.,;:!?*')
+        lower = url.lower()
+        if any(bad in lower for bad in NOT_LINKS):
+            continue
+        before = text[max(0, m.start() - 60):m.start()]
+        if any(d in lower for d in REG_DOMAINS) or REG_CONTEXT.search(before):
+            return url if '://' in url else 'https://' + url
+    return None
+
+
+# ── ENTRY POINT ───────────────────────────────────────
+def extract_events(email):
+    """{event_date, event_time, event_venue, registration_link}, None where nothing was found"""
+    original = HEADER_LINE.sub(' ', f"{email.get('subject') or ''}\n{email.get('body') or ''}")
+    text     = original.lower()
+    if len(text) != len(original):   # offsets must carry over between the two
+        original = text
+    received = received_date(email)
+    return {
+        'event_date':        extract_date(text, received),
+        'event_time':        extract_time(text),
+        'event_venue':       extract_venue(text, original),
+        'registration_link': extract_link(text, original),
+    }
+
+
+def format_hints(fields):
+    """One prompt line with what extract_events() found, or '' if nothing"""
+    found = [f'{k}={v}' for k, v in fields.items() if v]
+    return f"- Rule-based extraction (verify, may be wrong or incomplete): {', '.join(found)}\n" \
+        if found else ''
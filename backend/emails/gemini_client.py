@@ -0,0 +1,287 @@
+# emails/gemini_client.py
+# Every Gemini request in gemini_service goes through generate() /
+# generate_async(), which put four guards in front of the API:
+#
+#   user budget      the daily call / token budget of the user the call is
+#                    made for (emails/usage.py, which also records every call)
+#   deadline         a contextvar set by the HTTP view (decorators.with_deadline);
+#                    each request's timeout is capped by the time left, and no
+#                    request starts once it has passed
+#   circuit breaker  GEMINI_BREAKER_FAILURES consecutive overload failures
+#                    (timeouts, 429, 5xx) open it; while open, calls fail
+#                    immediately. After GEMINI_BREAKER_RESET seconds one probe
+#                    is let through — success closes it, failure re-opens it
+#   AIMD limiter     process-wide cap on in-flight requests: +1 per limit's
+#                    worth of successes, halved on an overload failure
+#
+# Calls that are refused or fail raise GeminiUnavailable with a reason;
+# gemini_service turns that into the local fallback classification, flagged
+# so the email is re-classified later.
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+from . import usage
+
+# monotonic time the current request must be answered by, None for no deadline
+DEADLINE = contextvars.ContextVar('gemini_deadline', default=None)
+
+MIN_CALL_TIME = 1.0   # don't start a request with less than this left
+POLL_INTERVAL = 0.05  # async waiters re-check the limiter this often
+
+TIMEOUT_ERRORS  = (asyncio.TimeoutError, TimeoutError, google_exceptions.DeadlineExceeded)
+OVERLOAD_ERRORS = TIMEOUT_ERRORS + (
+    google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError, google_exceptions.GatewayTimeout,
+    google_exceptions.TooManyRequests,
+)
+
+
+class GeminiUnavailable(Exception):
+    """
+    The call was refused or failed; `reason` says why (over_budget,
+    circuit_open, deadline, overloaded; backend_unavailable from llm_backends)
+    """
+
+    def __init__(self, reason, detail=''):
+        super().__init__(f'{reason}: {detail}' if detail else reason)
+        self.reason = reason
+
+
+# ── DEADLINES ─────────────────────────────────────────
+@contextmanager
+def deadline(seconds):
+    """Bound every Gemini call made inside the block (and tasks it spawns) to `seconds` from now"""
+    at = time.monotonic() + seconds
+    current = DEADLINE.get()
+    token = DEADLINE.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        DEADLINE.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, None if there is none"""
+    at = DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+def call_timeout():
+    left = remaining()
+    if left is None:
+        return settings.GEMINI_TIMEOUT
+    if left < MIN_CALL_TIME:
+        raise GeminiUnavailable('deadline', f'{max(left, 0):.1f}s left')
+    return min(settings.GEMINI_TIMEOUT, left)
+
+
+# ── CIRCUIT BREAKER ───────────────────────────────────
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout     = reset_timeout
+        self.state     = self.CLOSED
+        self.failures  = 0          # consecutive overload failures
+        self.opened_at = 0.0
+        self.probing   = False
+        self.rejected  = self.opened = 0
+        self._lock     = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state, self.probing = self.HALF_OPEN, False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True   # exactly one probe
+                return True
+            self.rejected += 1
+            return False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == self.OPEN and \
+                time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self.probing = self.CLOSED, 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state, self.opened_at, self.probing = self.OPEN, time.monotonic(), False
+
+    def release(self):
+        """The call ended without telling us anything about Gemini's health"""
+        with self._lock:
+            self.probing = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures,
+                    'times_opened': self.opened, 'rejected': self.rejected}
+
+
+# ── AIMD LIMITER ──────────────────────────────────────
+class AIMDLimiter:
+    def __init__(self, initial, maximum, minimum=1):
+        self.minimum  = minimum
+        self.maximum  = maximum
+        self.limit    = float(min(max(initial, minimum), maximum))
+        self.inflight = 0
+        self.peak     = 0
+        self._epoch   = 0           # bumped on every decrease
+        self._cond    = threading.Condition()
+
+    def try_acquire(self):
+        """Take a slot if one is free; returns an epoch token for release(), else None"""
+        with self._cond:
+            if self.inflight >= int(self.limit):
+                return None
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            return self._epoch
+
+    def acquire(self, timeout):
+        with self._cond:
+            end = time.monotonic() + timeout
+            while self.inflight >= int(self.limit):
+                left = end - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            return self._epoch
+
+    async def acquire_async(self, timeout):
+        end = time.monotonic() + timeout
+        while True:
+            token = self.try_acquire()
+            if token is not None or time.monotonic() >= end:
+                return token
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def release(self, token, outcome):
+        """outcome: 'success' (additive increase), 'overload' (multiplicative decrease) or None"""
+        with self._cond:
+            self.inflight -= 1
+            if outcome == 'success':
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == 'overload' and token == self._epoch:
+                # only the first of a burst of in-flight failures halves the limit
+                self.limit = max(self.minimum, self.limit / 2)
+                self._epoch += 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'limit': round(self.limit, 2), 'inflight': self.inflight,
+                    'peak_inflight': self.peak, 'max': self.maximum}
+
+
+breaker = CircuitBreaker(settings.GEMINI_BREAKER_FAILURES, settings.GEMINI_BREAKER_RESET)
+limiter = AIMDLimiter(max(settings.GEMINI_CONCURRENCY, settings.GEMINI_MAX_INFLIGHT // 2),
+                      settings.GEMINI_MAX_INFLIGHT)
+
+
+def stats():
+    return {'breaker': breaker.stats(), 'limiter': limiter.stats(),
+            'timeout': settings.GEMINI_TIMEOUT}
+
+
+# ── CALLS ─────────────────────────────────────────────
+def _settle(token, outcome):
+    limiter.release(token, outcome)
+    if outcome == 'success':
+        breaker.record_success()
+    elif outcome == 'overload':
+        breaker.record_failure()
+    else:
+        breaker.release()
+
+
+def _admit():
+    timeout = call_timeout()
+    if not breaker.allow():
+        raise GeminiUnavailable('circuit_open')
+    return timeout
+
+
+def _slot_unavailable():
+    breaker.release()
+    return GeminiUnavailable('deadline', 'no free Gemini slot in time')
+
+
+def _failure(error, timeout):
+    """(limiter/breaker outcome, GeminiUnavailable) for an overload-type error"""
+    if isinstance(error, TIMEOUT_ERRORS) and timeout < settings.GEMINI_TIMEOUT:
+        # cut short by the caller's deadline, not Gemini being slow
+        return None, GeminiUnavailable('deadline', f'no answer within {timeout:.1f}s')
+    return 'overload', GeminiUnavailable('overloaded', str(error) or type(error).__name__)
+
+
+def generate(model, contents, operation='other', **kwargs):
+    """
+    model.generate_content(contents, **kwargs) behind the user's budget, the
+    deadline, breaker and limiter; recorded in the usage ledger under `operation`
+    """
+    google_id = usage.USER.get()
+    over = usage.over_budget(google_id, operation)
+    if over:
+        raise GeminiUnavailable('over_budget', over)
+    token = limiter.acquire(_admit())
+    if token is None:
+        raise _slot_unavailable()
+    outcome = response = None
+    started = time.monotonic()
+    try:
+        timeout  = call_timeout()
+        response = model.generate_content(contents, request_options={'timeout': timeout}, **kwargs)
+        outcome = 'success'
+        return response
+    except OVERLOAD_ERRORS as e:
+        outcome, error = _failure(e, timeout)
+        raise error from e
+    finally:
+        _settle(token, outcome)
+        usage.record(google_id, operation, contents, response, time.monotonic() - started)
+
+
+async def generate_async(model, contents, operation='other', **kwargs):
+    """generate() for async callers"""
+    google_id = usage.USER.get()
+    over = await usage.over_budget_async(google_id, operation)
+    if over:
+        raise GeminiUnavailable('over_budget', over)
+    token = await limiter.acquire_async(_admit())
+    if token is None:
+        raise _slot_unavailable()
+    outcome = response = None
+    started = time.monotonic()
+    try:
+        timeout  = call_timeout()
+        response = await asyncio.wait_for(
+            model.generate_content_async(contents, request_options={'timeout': timeout}, **kwargs),
+            timeout)
+        outcome = 'success'
+        return response
+    except OVERLOAD_ERRORS as e:
+        outcome, error = _failure(e, timeout)
+        raise error from e
+    finally:
+        _settle(token, outcome)
+        await usage.record_async(google_id, operation, contents, response, time.monotonic() - started)
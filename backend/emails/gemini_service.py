@@ -4,22 +4,95 @@
 
 import google.generativeai as genai
 from django.conf import settings
+from functools import lru_cache
+import asyncio
+import datetime
 import json
-import re
 import sys
 import os
+import threading
+import time
 
 sys.path.insert(0, os.path.join(settings.BASE_DIR))
 from college_data import CLUBS, FESTS, ACADEMIC, INTEREST_MAP, TRUSTED_SENDERS
+from .gemini_client import GeminiUnavailable, breaker, remaining
+from .llm_backends import Prompt, backend_for
+from .condense import clean_body, condense
+from .extract import extract_events, format_hints, received_date
+from .local_model import local_classification
+from .structured import Field, Schema, json_generation_config, parse_response, parse_stats
 
 genai.configure(api_key=settings.GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+model = genai.GenerativeModel(settings.GEMINI_MODEL)
 
-ALL_CLASSES = list(CLUBS.keys()) + list(FESTS.keys()) + [
+ALL_CODES   = list(CLUBS.keys()) + list(FESTS.keys())
+ALL_CLASSES = ALL_CODES + [
     "ACADEMIC", "INFORMAL_FOOD", "INFORMAL_DEALS", "SPAM", "OTHER"
 ]
 
 
+# ════════════════════════════════════════════════════════
+# PROMPT PREFIXES
+# Every prompt is <static prefix> + <dynamic tail>. The prefixes are built
+# once at import; with context caching on they are uploaded to Gemini once
+# per TTL and each request sends only the tail.
+# ════════════════════════════════════════════════════════
+class PromptPrefix:
+    """
+    A static prompt prefix. model() returns (model, prefix_text): either a
+    model bound to a Gemini cached-content copy of the prefix (prefix_text is
+    then '') or the plain model plus the text to prepend.
+    """
+
+    def __init__(self, name, text):
+        self.name  = name
+        self.text  = text
+        self._lock = threading.Lock()
+        self._cached_model = None
+        self._expires_at   = 0.0
+        self._retry_at     = 0.0 if settings.GEMINI_CONTEXT_CACHE else float('inf')
+
+    def model(self):
+        cached = self._cached_model
+        if cached is not None and time.monotonic() < self._expires_at:
+            return cached, ''
+        cached = self._refresh()
+        return (cached, '') if cached is not None else (model, self.text)
+
+    async def model_async(self):
+        """model() without blocking the event loop when the cache needs (re)creating"""
+        if self._cached_model is not None and time.monotonic() < self._expires_at:
+            return self._cached_model, ''
+        if time.monotonic() < self._retry_at:
+            return model, self.text
+        return await asyncio.to_thread(self.model)
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._cached_model is not None and now < self._expires_at:
+                return self._cached_model
+            self._cached_model = None
+            if now < self._retry_at:
+                return None
+            ttl = settings.GEMINI_CONTEXT_CACHE_TTL
+            try:
+                content = genai.caching.CachedContent.create(
+                    model=settings.GEMINI_MODEL,
+                    display_name=f'mailmind-{self.name}',
+                    contents=[self.text],
+                    ttl=datetime.timedelta(seconds=ttl),
+                )
+                self._cached_model = genai.GenerativeModel.from_cached_content(cached_content=content)
+                self._expires_at   = now + ttl * 0.9   # recreate before Gemini drops it
+            except Exception as e:
+                # e.g. prefix below the model's minimum cacheable size, or an
+                # unversioned model name — fall back to sending the prefix
+                print(f"Gemini context cache unavailable for {self.name}: {e}")
+                self._retry_at = now + ttl
+            return self._cached_model
+
+
 # ════════════════════════════════════════════════════════
 # MODEL 1 — PREFERENCE INTERPRETER
 # Input:  "I like AI, interested in tech fests"
@@ -62,21 +135,12 @@ IMPORTANT RULES:
 """
 
 
-def interpret_preferences(user_text: str) -> dict:
-    """
-    Model 1 — maps user's interest text to IITJ club priority weights
-    Returns: { "RAID": "high", "IGNUS": "medium", "DRAMATICS": "ignore", ... }
-    """
-    context = build_college_context()
-    all_codes = list(CLUBS.keys()) + list(FESTS.keys())
+COLLEGE_CONTEXT = build_college_context()
 
-    prompt = f"""
-{context}
+INTERPRET_PREFIX = PromptPrefix('interpret', f"""
+{COLLEGE_CONTEXT}
 
-The user described their interests:
-"{user_text}"
-
-Map their interests to ALL clubs and fests listed above.
+Map the user's interests (given at the end) to ALL clubs and fests listed above.
 Return ONLY a valid JSON object. Include every single club and fest code.
 Use exactly these values: "high", "medium", "low", "ignore"
 
@@ -86,32 +150,45 @@ Rules:
 - "low"    = include but deprioritise
 - "ignore" = skip entirely — don't show emails from this
 
-All codes to include: {json.dumps(all_codes)}
+All codes to include: {json.dumps(ALL_CODES)}
 
 Return ONLY JSON, no explanation, no markdown backticks.
+""")
+
+
+def build_interpret_prompt(user_text: str) -> str:
+    """The dynamic tail of the interpret prompt (INTERPRET_PREFIX goes before it)"""
+    return f"""
+The user described their interests:
+"{user_text}"
 """
 
-    try:
-        response = model.generate_content(prompt)
-        text     = response.text.strip()
-        text     = re.sub(r'```json|```', '', text).strip()
-        profile  = json.loads(text)
-
-        # Make sure all clubs are present — default missing ones to "low"
-        for code in all_codes:
-            if code not in profile:
-                club = CLUBS.get(code, {})
-                if club.get('default_priority') == 'ignore':
-                    profile[code] = 'ignore'
-                else:
-                    profile[code] = 'low'
-
-        return profile
 
+def interpret_prompt(user_text: str) -> Prompt:
+    return Prompt('interpret', INTERPRET_PREFIX, build_interpret_prompt(user_text),
+                  PROFILE_SCHEMA, PROFILE_CONFIG, {'user_text': user_text})
+
+
+def interpret_preferences(user_text: str) -> dict:
+    """
+    Model 1 — maps user's interest text to IITJ club priority weights
+    Returns: { "RAID": "high", "IGNUS": "medium", "DRAMATICS": "ignore", ... }
+    """
+    try:
+        text = backend_for('interpret').complete(interpret_prompt(user_text))
     except Exception as e:
         print(f"Gemini preference error: {e}")
+        parse_stats.record('interpret', 'failed')
         # Fallback — return all as low
-        return {code: 'low' for code in all_codes}
+        return {code: 'low' for code in ALL_CODES}
+
+    # Missing or invalid codes get their default ("low", or "ignore" for
+    # clubs with default_priority ignore); the rest of the answer is kept
+    profile = parse_response('interpret', PROFILE_SCHEMA, text)
+    if profile is None:
+        print(f"Gemini preference error: no JSON in response {text[:200]!r}")
+        return {code: 'low' for code in ALL_CODES}
+    return profile
 
 
 # ════════════════════════════════════════════════════════
@@ -120,34 +197,9 @@ Return ONLY JSON, no explanation, no markdown backticks.
 # Output: class, importance, urgency, quadrant, colour,
 #         action, summary, event_date, is_informal
 # ════════════════════════════════════════════════════════
-def classify_email(email_data: dict, priority_profile: dict, sender: str = '') -> dict:
-    """
-    Classify a single email using Gemini.
-    Returns structured classification dict.
-    """
-    subject = email_data.get('subject', '')
-    body    = email_data.get('body', '')[:1000]   # cap body for token efficiency
-
-    # Check if from trusted sender — boost importance
-    is_trusted = any(trusted in sender for trusted in TRUSTED_SENDERS)
-
-    # Build priority context string for Gemini
-    high_priority   = [k for k, v in priority_profile.items() if v == 'high']
-    medium_priority = [k for k, v in priority_profile.items() if v == 'medium']
-    ignore_list     = [k for k, v in priority_profile.items() if v == 'ignore']
-
-    prompt = f"""
+CLASSIFY_PREFIX = PromptPrefix('classify', f"""
 You are classifying an email for an IIT Jodhpur (IITJ) student.
-
-USER'S PRIORITY PREFERENCES:
-- HIGH priority clubs/fests: {', '.join(high_priority) or 'none'}
-- MEDIUM priority: {', '.join(medium_priority) or 'none'}
-- IGNORE these completely: {', '.join(ignore_list) or 'none'}
-- Trusted sender (official IITJ): {'YES — boost importance' if is_trusted else 'no'}
-
-EMAIL TO CLASSIFY:
-Subject: {subject}
-Body: {body}
+The user's priority preferences and the email follow at the end.
 
 CLASSIFICATION RULES:
 1. importance = how much THIS USER cares based on their preferences
@@ -163,7 +215,7 @@ CLASSIFICATION RULES:
    - "ignore"          → Q4, spam, promotional
 
 EVENT EXTRACTION RULES — extract ONLY if the email mentions a specific event:
-- event_date: Extract the event date as "YYYY-MM-DD". Use 2026 as the year if not specified. If no date found, return null.
+- event_date: Extract the event date as "YYYY-MM-DD". If the year is not specified, use the first such date on or after the email's Received date ("this Friday", "tomorrow" are relative to it too). If no date found, return null.
 - event_time: Extract the exact start time as "HH:MM" in 24-hour format (e.g., "17:00" for 5 PM). If no time found, return null.
 - event_venue: Extract the venue/location name (e.g., "LT-3", "MNIT Jaipur", "SAC Ground", "Online - Zoom"). Return null if not found.
 - registration_link: Extract any registration/signup URL mentioned. Return null if none.
@@ -189,38 +241,132 @@ Return ONLY this JSON (no markdown, no explanation):
 }}
 
 colour must be: "red" for Q1, "yellow" for Q2, "blue" for Q3, "grey" for Q4
+""")
+
+
+def profile_key(priority_profile: dict) -> tuple:
+    return tuple(sorted(priority_profile.items()))
+
+
+@lru_cache(maxsize=256)
+def _profile_segment(key: tuple) -> str:
+    high_priority   = [k for k, v in key if v == 'high']
+    medium_priority = [k for k, v in key if v == 'medium']
+    ignore_list     = [k for k, v in key if v == 'ignore']
+    return f"""
+USER'S PRIORITY PREFERENCES:
+- HIGH priority clubs/fests: {', '.join(high_priority) or 'none'}
+- MEDIUM priority: {', '.join(medium_priority) or 'none'}
+- IGNORE these completely: {', '.join(ignore_list) or 'none'}
 """
 
+
+def profile_segment(priority_profile: dict) -> str:
+    """Priority-preferences block of the classify prompt, memoized per profile"""
+    return _profile_segment(profile_key(priority_profile or {}))
+
+
+def build_classify_prompt(email_data: dict, priority_profile: dict, sender: str = '') -> str:
+    """The dynamic tail of the classify prompt (CLASSIFY_PREFIX goes before it)"""
+    subject = email_data.get('subject', '')
+    body    = condense(email_data.get('body', ''))   # cleaned, best sentences within CLASSIFY_BODY_TOKENS
+
+    # Check if from trusted sender — boost importance
+    is_trusted = any(trusted in sender for trusted in TRUSTED_SENDERS)
+    received   = received_date(email_data)
+    # rules see the whole clean body, not just the condensed part
+    hints      = format_hints(extract_events(dict(email_data, body=clean_body(email_data.get('body')))))
+
+    return f"""{profile_segment(priority_profile)}- Trusted sender (official IITJ): {'YES — boost importance' if is_trusted else 'no'}
+- Received: {received.isoformat()} ({received.strftime('%A')})
+{hints}
+EMAIL TO CLASSIFY:
+Subject: {subject}
+Body: {body}
+"""
+
+
+def classify_prompt(email_data: dict, priority_profile: dict, sender: str = '') -> Prompt:
+    return Prompt('classify', CLASSIFY_PREFIX, build_classify_prompt(email_data, priority_profile, sender),
+                  CLASSIFICATION_SCHEMA, CLASSIFICATION_CONFIG,
+                  {'email_data': email_data, 'priority_profile': priority_profile, 'sender': sender})
+
+
+def parse_classification(text: str, classified_by: str = 'gemini') -> dict:
+    """
+    Classification from a model response. Invalid or missing fields are
+    repaired or defaulted one by one; only a response with no JSON object at
+    all falls back to get_fallback_classification().
+    """
+    result = parse_response('classify', CLASSIFICATION_SCHEMA, text)
+    if result is None:
+        print(f"Gemini classify error: no JSON in response {text[:200]!r}")
+        return get_fallback_classification('unparseable')
+    # colour is a function of quadrant — trust the quadrant
+    result['colour']        = QUADRANT_COLOURS[result['quadrant']]
+    result['fallback']      = None
+    result['classified_by'] = classified_by
+    return result
+
+
+def local_answer(email_data: dict, priority_profile: dict, sender: str = ''):
+    """The local model's classification when it is confident enough, else None"""
+    classification = local_classification(email_data, priority_profile, sender)
+    if classification is not None:
+        parse_stats.record('classify', 'local')
+    return classification
+
+
+def classify_email(email_data: dict, priority_profile: dict, sender: str = '',
+                   local: bool = True) -> dict:
+    """
+    Classify a single email with the LLM_CLASSIFY_BACKEND model (Gemini by
+    default), or the local model when it is confident (local=False skips it).
+    Returns structured classification dict.
+    """
+    classification = local and local_answer(email_data, priority_profile, sender)
+    if classification:
+        return classification
+    backend = backend_for('classify')
     try:
-        response = model.generate_content(prompt)
-        text     = response.text.strip()
-        text     = re.sub(r'```json|```', '', text).strip()
-        result   = json.loads(text)
-
-        # Validate required fields
-        required = ['class', 'importance', 'urgency', 'quadrant',
-                    'colour', 'action', 'summary', 'event_date', 'is_informal']
-        for field in required:
-            if field not in result:
-                result[field] = get_default(field)
-        # Optional rich fields — default to None if missing
-        for field in ['event_time', 'event_venue', 'registration_link', 'organizer']:
-            result.setdefault(field, None)
-
-        return result
+        text = backend.complete(classify_prompt(email_data, priority_profile, sender))
+    except GeminiUnavailable as e:
+        parse_stats.record('classify', 'failed')
+        return get_fallback_classification(e.reason)
+    except Exception as e:
+        print(f"Gemini classify error: {e}")
+        parse_stats.record('classify', 'failed')
+        return get_fallback_classification()
+    return parse_classification(text, backend.name)
+
 
+async def classify_email_async(email_data: dict, priority_profile: dict, sender: str = '',
+                               local: bool = True) -> dict:
+    """classify_email without holding a thread while the model answers"""
+    classification = local and local_answer(email_data, priority_profile, sender)
+    if classification:
+        return classification
+    backend = backend_for('classify')
+    try:
+        text = await backend.complete_async(classify_prompt(email_data, priority_profile, sender))
+    except GeminiUnavailable as e:
+        parse_stats.record('classify', 'failed')
+        return get_fallback_classification(e.reason)
     except Exception as e:
         print(f"Gemini classify error: {e}")
+        parse_stats.record('classify', 'failed')
         return get_fallback_classification()
+    return parse_classification(text, backend.name)
 
 
-def classify_all_emails(emails: list, priority_profile: dict) -> list:
+def classify_all_emails(emails: list, priority_profile: dict, on_progress=None) -> list:
     """
     Classify a batch of emails.
     Returns list of (gmail_id, classification) tuples.
+    on_progress(done, total) is called after each email, e.g. to push SSE progress.
     """
     results = []
-    for email in emails:
+    for done, email in enumerate(emails, 1):
         if email.get('classified'):
             continue    # skip already classified
 
@@ -230,14 +376,61 @@ def classify_all_emails(emails: list, priority_profile: dict) -> list:
             sender=email.get('sender', '')
         )
         results.append((email['gmail_id'], classification))
+        if on_progress:
+            on_progress(done, len(emails))
 
         # Small delay to avoid Gemini rate limits on free tier
-        import time
-        time.sleep(0.5)
+        if classification.get('classified_by') == 'gemini':
+            import time
+            time.sleep(0.5)
 
     return results
 
 
+async def classify_all_emails_async(emails: list, priority_profile: dict, on_progress=None,
+                                    concurrency: int = None, budget=None) -> list:
+    """
+    classify_all_emails for async callers. Up to GEMINI_CONCURRENCY requests
+    are in flight at once instead of one every 0.5 s. `budget` is an optional
+    quota.TokenBucket (one token per request) shared with other users; the
+    wait for it is cut short by the request deadline, and skipped while the
+    circuit breaker is open (those emails fail fast anyway) or when the
+    classify backend isn't Gemini.
+    """
+    semaphore  = asyncio.Semaphore(concurrency or settings.GEMINI_CONCURRENCY)
+    uses_quota = backend_for('classify').uses_quota
+    pending    = [e for e in emails if not e.get('classified')]
+    done       = 0
+
+    async def classify_one(email):
+        nonlocal done
+        async with semaphore:
+            # a confident local answer costs no Gemini quota
+            classification = local_answer(email, priority_profile, email.get('sender', ''))
+            taken = False
+            if classification is None and budget and uses_quota and not breaker.is_open():
+                try:
+                    await asyncio.wait_for(budget.acquire(), remaining())
+                    taken = True
+                except asyncio.TimeoutError:
+                    classification = get_fallback_classification('deadline')
+            if classification is None:
+                classification = await classify_email_async(
+                    email_data=email,
+                    priority_profile=priority_profile,
+                    sender=email.get('sender', ''),
+                    local=False
+                )
+                if taken and classification.get('fallback') == 'over_budget':
+                    budget.refund()   # refused before it reached Gemini
+        done += 1
+        if on_progress:
+            on_progress(done, len(pending))
+        return email['gmail_id'], classification
+
+    return list(await asyncio.gather(*(classify_one(e) for e in pending)))
+
+
 # ── HELPERS ───────────────────────────────────────────
 def get_default(field):
     defaults = {
@@ -258,7 +451,12 @@ def get_default(field):
     return defaults.get(field)
 
 
-def get_fallback_classification():
+def get_fallback_classification(reason='error'):
+    """
+    Placeholder stored when Gemini gave no usable answer. `fallback` records
+    why (over_budget, circuit_open, deadline, overloaded, backend_unavailable,
+    unparseable, error) and marks the email for re-classification.
+    """
     return {
         'class':             'OTHER',
         'importance':        'low',
@@ -273,4 +471,36 @@ def get_fallback_classification():
         'registration_link': None,
         'organizer':         None,
         'is_informal':       False,
+        'fallback':          reason,
     }
+
+
+# ── STRUCTURED OUTPUT ─────────────────────────────────
+# Compiled once; also sent to Gemini as response_schema
+QUADRANT_COLOURS = {'Q1': 'red', 'Q2': 'yellow', 'Q3': 'blue', 'Q4': 'grey'}
+LEVELS           = ('high', 'medium', 'low')
+
+CLASSIFICATION_SCHEMA = Schema('classification', [
+    Field('class',             'enum',   get_default('class'),      tuple(ALL_CLASSES)),
+    Field('importance',        'enum',   get_default('importance'), LEVELS),
+    Field('urgency',           'enum',   get_default('urgency'),    LEVELS),
+    Field('quadrant',          'enum',   get_default('quadrant'),   tuple(QUADRANT_COLOURS)),
+    Field('colour',            'enum',   get_default('colour'),     tuple(QUADRANT_COLOURS.values())),
+    Field('action',            'enum',   get_default('action'),     ('notify', 'add_to_calendar', 'ignore')),
+    Field('summary',           'string', get_default('summary')),
+    Field('event_date',        'date',   nullable=True),
+    Field('event_time',        'time',   nullable=True),
+    Field('event_venue',       'string', nullable=True),
+    Field('registration_link', 'url',    nullable=True),
+    Field('organizer',         'string', nullable=True),
+    Field('is_informal',       'bool',   get_default('is_informal')),
+])
+
+PROFILE_SCHEMA = Schema('profile', [
+    Field(code, 'enum', 'ignore' if CLUBS.get(code, {}).get('default_priority') == 'ignore' else 'low',
+          LEVELS + ('ignore',))
+    for code in ALL_CODES
+])
+
+CLASSIFICATION_CONFIG = json_generation_config(CLASSIFICATION_SCHEMA)
+PROFILE_CONFIG        = json_generation_config(PROFILE_SCHEMA)
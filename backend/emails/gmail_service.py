@@ -2,42 +2,25 @@
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from datetime import datetime
+from html.parser import HTMLParser
 import base64
+import codecs
+import os
 import re
 
 
-def get_gmail_service(token_dict):
-    creds = Credentials(
+def get_credentials(token_dict):
+    return Credentials(
         token=token_dict.get('token', token_dict.get('access_token')),
         refresh_token=token_dict.get('refresh_token'),
         token_uri='https://oauth2.googleapis.com/token',
-        client_id=token_dict['client_id'],
-        client_secret=token_dict['client_secret'],
+        client_id=token_dict.get('client_id', os.getenv('GOOGLE_CLIENT_ID')),
+        client_secret=token_dict.get('client_secret', os.getenv('GOOGLE_CLIENT_SECRET')),
     )
-    return build('gmail', 'v1', credentials=creds)
-
 
-def fetch_emails(token_dict, max_results=50):
-    service  = get_gmail_service(token_dict)
-    result   = service.users().messages().list(
-        userId='me', maxResults=max_results, labelIds=['INBOX']
-    ).execute()
-    messages = result.get('messages', [])
 
-    emails_list = []
-    for msg in messages:
-        try:
-            full_msg = service.users().messages().get(
-                userId='me', id=msg['id'], format='full'
-            ).execute()
-            parsed = parse_email(full_msg)
-            if parsed:
-                emails_list.append(parsed)
-        except Exception as e:
-            print(f"Error fetching {msg['id']}: {e}")
-            continue
-
-    return emails_list
+def get_gmail_service(token_dict):
+    return build('gmail', 'v1', credentials=get_credentials(token_dict))
 
 
 def parse_email(msg):
@@ -50,8 +33,9 @@ def parse_email(msg):
 
     return {
         'gmail_id':    msg['id'],
+        'thread_id':   msg.get('threadId'),
         'subject':     subject,
-        'body':        body[:2000],
+        'body':        body[:BODY_CHAR_LIMIT],
         'sender':      sender_email,
         'sender_full': sender,
         'date':        date,
@@ -61,32 +45,131 @@ def parse_email(msg):
     }
 
 
-def extract_body(payload):
-    body = ''
-    if 'body' in payload and payload['body'].get('data'):
-        body = decode_base64(payload['body']['data'])
-    elif 'parts' in payload:
-        for part in payload['parts']:
-            mime = part.get('mimeType', '')
-            if mime == 'text/plain' and part['body'].get('data'):
-                body = decode_base64(part['body']['data'])
-                break
-            elif mime == 'text/html' and not body and part['body'].get('data'):
-                body = strip_html(decode_base64(part['body']['data']))
-            elif mime.startswith('multipart'):
-                body = extract_body(part)
-                if body:
+# ── BODY EXTRACTION ───────────────────────────────────
+# Bodies are decoded and tokenized incrementally and we stop as soon as we
+# have BODY_CHAR_LIMIT characters, so a 5 MB newsletter costs the same as a
+# short notice. Attachments are never decoded.
+BODY_CHAR_LIMIT = 2000          # what we store / feed to the classifier
+HTML_BYTE_CAP   = 256 * 1024    # give up on markup-heavy HTML after this much input
+DECODE_CHUNK    = 8192          # base64 chars per step — must be a multiple of 4
+
+
+def extract_body(payload, limit=BODY_CHAR_LIMIT):
+    """Prefer text/plain anywhere in the MIME tree, fall back to text/html"""
+    plain, html = find_text_parts(payload)
+    if plain is not None:
+        return read_plain(plain, limit).strip()
+    if html is not None:
+        return read_html(html, limit).strip()
+    return ''
+
+
+def find_text_parts(payload):
+    """Depth-first walk returning the first (text/plain, text/html) parts with inline data"""
+    plain = html = None
+    stack = [payload]
+    while stack and plain is None:
+        part = stack.pop()
+        if is_attachment(part):
+            continue
+        mime = part.get('mimeType', '')
+        if part.get('parts'):
+            stack.extend(reversed(part['parts']))
+        elif part.get('body', {}).get('data'):
+            if mime == 'text/html':
+                html = html or part
+            elif mime == 'text/plain' or not mime:
+                plain = part
+    return plain, html
+
+
+def is_attachment(part):
+    if part.get('filename') or part.get('body', {}).get('attachmentId'):
+        return True
+    for h in part.get('headers', []):
+        if h['name'].lower() == 'content-disposition' and h['value'].lower().startswith('attachment'):
+            return True
+    return False
+
+
+def part_charset(part):
+    for h in part.get('headers', []):
+        if h['name'].lower() == 'content-type':
+            match = re.search(r'charset="?([\w.-]+)', h['value'], re.IGNORECASE)
+            if match:
+                try:
+                    return codecs.lookup(match.group(1)).name
+                except LookupError:
                     break
-    return body.strip()
+    return 'utf-8'
+
+
+def iter_decoded(data, charset='utf-8', chunk_size=DECODE_CHUNK):
+    """Yield text from base64url data a chunk at a time"""
+    decoder = codecs.getincrementaldecoder(charset)(errors='ignore')
+    for start in range(0, len(data), chunk_size):
+        piece = data[start:start + chunk_size]
+        try:
+            raw = base64.urlsafe_b64decode(piece + '=' * (-len(piece) % 4))
+        except Exception:
+            return
+        yield decoder.decode(raw)
+    yield decoder.decode(b'', final=True)
+
+
+def read_plain(part, limit):
+    chunks, length = [], 0
+    for text in iter_decoded(part['body']['data'], part_charset(part)):
+        chunks.append(text)
+        length += len(text)
+        if length >= limit:
+            break
+    return ''.join(chunks)[:limit]
+
+
+def read_html(part, limit):
+    parser = HTMLTextExtractor(limit)
+    fed = 0
+    for text in iter_decoded(part['body']['data'], part_charset(part)):
+        parser.feed(text)
+        fed += len(text)
+        if parser.done or fed >= HTML_BYTE_CAP:
+            break
+    parser.close()
+    return parser.text()
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Incremental HTML → text that stops collecting once it has `limit` chars"""
+    SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript'}
+
+    def __init__(self, limit=BODY_CHAR_LIMIT):
+        super().__init__(convert_charrefs=True)
+        self.limit  = limit
+        self.parts  = []
+        self.length = 0
+        self.skip   = 0
+        self.done   = False
 
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip += 1
 
-def decode_base64(data):
-    try:
-        return base64.urlsafe_b64decode(data + '==').decode('utf-8', errors='ignore')
-    except Exception:
-        return ''
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self.skip:
+            self.skip -= 1
 
+    def handle_data(self, data):
+        if self.done or self.skip:
+            return
+        words = data.split()
+        if not words:
+            return
+        chunk = ' '.join(words)
+        self.parts.append(chunk)
+        self.length += len(chunk) + 1
+        if self.length >= self.limit:
+            self.done = True
 
-def strip_html(html):
-    clean = re.sub(r'<[^>]+>', ' ', html)
-    return re.sub(r'\s+', ' ', clean).strip()
+    def text(self):
+        return ' '.join(self.parts)[:self.limit]
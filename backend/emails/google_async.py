@@ -0,0 +1,78 @@
+# emails/google_async.py
+# Minimal async client for the Gmail + Calendar REST APIs.
+# googleapiclient blocks a thread per call; this uses one shared httpx
+# connection pool per event loop, so hundreds of requests can be in flight.
+import asyncio
+import weakref
+
+import httpx
+from google.auth.transport.requests import Request
+
+from .gmail_service import get_credentials
+
+GMAIL_API    = 'https://gmail.googleapis.com/gmail/v1/users/me'
+CALENDAR_API = 'https://www.googleapis.com/calendar/v3/calendars/primary'
+
+HTTP_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+HTTP_LIMITS  = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+
+_clients = weakref.WeakKeyDictionary()   # event loop → httpx.AsyncClient
+
+
+class GoogleAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f'{status}: {message[:200]}')
+        self.status = status
+
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+        _clients[loop] = client
+    return client
+
+
+class AsyncGoogleSession:
+    """
+    One user's OAuth credentials; refreshes the access token on 401. With
+    google_id the new token is written back to the user doc (and into
+    token_dict), so later sessions start with it instead of refreshing again.
+    """
+
+    def __init__(self, token_dict, google_id=None):
+        self.token_dict  = token_dict
+        self.google_id   = google_id
+        self.credentials = get_credentials(token_dict)
+
+    async def refresh(self):
+        # google-auth's refresh is sync; it's rare enough to run in a thread
+        await asyncio.to_thread(self.credentials.refresh, Request())
+        self.token_dict['token'] = self.credentials.token
+        if self.google_id:
+            from .models import update_user_token
+            await asyncio.to_thread(update_user_token, self.google_id, self.credentials.token)
+
+    async def request(self, method, url, **kwargs):
+        if not self.credentials.token:
+            await self.refresh()
+        client = get_http_client()
+        for attempt in range(2):
+            headers  = {'Authorization': f'Bearer {self.credentials.token}'}
+            response = await client.request(method, url, headers=headers, **kwargs)
+            if response.status_code == 401 and attempt == 0 and self.credentials.refresh_token:
+                await self.refresh()
+                continue
+            if response.status_code >= 400:
+                raise GoogleAPIError(response.status_code, response.text)
+            return response.json() if response.content else {}
+
+    async def get(self, url, **params):
+        return await self.request('GET', url, params=params)
+
+    async def post(self, url, body):
+        return await self.request('POST', url, json=body)
+
+    async def patch(self, url, body):
+        return await self.request('PATCH', url, json=body)
@@ -0,0 +1,308 @@
+# emails/ingestion.py
+# One Gmail ingestion pipeline: list → dedup → fetch → parse → bulk store
+#
+# A *source* lists message ids and returns raw Gmail message resources.
+# Listing also records each message's threadId; a thread with at least
+# THREAD_GET_MIN new messages is fetched with one threads.get instead of a
+# messages.get per message (same quota at two messages, fewer calls).
+# A *sink* says which ids are already stored and bulk-stores parsed emails.
+# Phase_2.run_email_pipeline and the benchmarks use ingest(); the async
+# fetch view (pipeline.run_fetch) uses ingest_async() with the same sinks.
+
+import asyncio
+import json
+import time
+
+from .gmail_service import get_gmail_service, parse_email
+
+GMAIL_PAGE_SIZE   = 500   # messages.list hard limit per page
+GMAIL_BATCH_SIZE  = 50    # Gmail recommends <= 50 calls per batch request
+GMAIL_CONCURRENCY = 10    # in-flight messages.get per user for the async source
+THREAD_GET_MIN    = 2     # new messages in one thread worth a threads.get
+
+
+def plan_fetch(ids, thread_of):
+    """
+    ([thread_id, ...] to fetch whole, [gmail_id, ...] to fetch one by one).
+    thread_of maps gmail_id → threadId as listed; unknown ids go one by one.
+    """
+    by_thread = {}
+    for gmail_id in ids:
+        by_thread.setdefault(thread_of.get(gmail_id), []).append(gmail_id)
+    singles = by_thread.pop(None, [])
+    threads = []
+    for thread_id, members in by_thread.items():
+        if len(members) >= THREAD_GET_MIN:
+            threads.append(thread_id)
+        else:
+            singles.extend(members)
+    return threads, singles
+
+
+# ── SOURCES ───────────────────────────────────────────
+class GmailSource:
+    """Live Gmail inbox — ids via messages.list, bodies via batched messages.get"""
+
+    def __init__(self, token_dict, label_ids=('INBOX',)):
+        self.service   = get_gmail_service(token_dict)
+        self.label_ids = list(label_ids)
+        self.thread_of = {}   # gmail_id → threadId, filled by list_ids
+
+    def list_ids(self, max_results):
+        ids, page_token = [], None
+        while len(ids) < max_results:
+            params = {'userId': 'me', 'labelIds': self.label_ids,
+                      'maxResults': min(GMAIL_PAGE_SIZE, max_results - len(ids))}
+            if page_token:
+                params['pageToken'] = page_token
+            result = self.service.users().messages().list(**params).execute()
+            for m in result.get('messages', []):
+                ids.append(m['id'])
+                self.thread_of[m['id']] = m.get('threadId')
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+        return ids[:max_results]
+
+    def fetch(self, ids):
+        fetched = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Error fetching {request_id}: {exception}")
+            elif request_id.startswith('thread:'):
+                # the whole thread; messages not asked for are dropped below
+                for msg in response.get('messages', []):
+                    fetched[msg['id']] = msg
+            else:
+                fetched[request_id] = response
+
+        threads, singles = plan_fetch(ids, self.thread_of)
+        users = self.service.users()
+        calls = [(users.threads().get(userId='me', id=t, format='full'), f'thread:{t}')
+                 for t in threads]
+        calls += [(users.messages().get(userId='me', id=i, format='full'), i) for i in singles]
+        for start in range(0, len(calls), GMAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for request, request_id in calls[start:start + GMAIL_BATCH_SIZE]:
+                batch.add(request, request_id=request_id)
+            batch.execute()
+        return [fetched[i] for i in ids if i in fetched]
+
+
+class AsyncGmailSource:
+    """Live Gmail inbox over async HTTP — for ingest_async()"""
+
+    def __init__(self, token_dict, label_ids=('INBOX',), concurrency=GMAIL_CONCURRENCY,
+                 budget=None, google_id=None):
+        from .google_async import AsyncGoogleSession
+        self.session   = AsyncGoogleSession(token_dict, google_id)
+        self.label_ids = list(label_ids)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.budget    = budget   # optional quota.TokenBucket in Gmail quota units
+        self.thread_of = {}       # gmail_id → threadId, filled by list_ids
+
+    async def spend(self, call):
+        if self.budget:
+            from .quota import GMAIL_UNITS
+            await self.budget.acquire(GMAIL_UNITS[call])
+
+    async def list_ids(self, max_results):
+        from .google_async import GMAIL_API
+        ids, page_token = [], None
+        while len(ids) < max_results:
+            params = {'labelIds': self.label_ids,
+                      'maxResults': min(GMAIL_PAGE_SIZE, max_results - len(ids))}
+            if page_token:
+                params['pageToken'] = page_token
+            await self.spend('list')
+            result = await self.session.get(f'{GMAIL_API}/messages', **params)
+            for m in result.get('messages', []):
+                ids.append(m['id'])
+                self.thread_of[m['id']] = m.get('threadId')
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+        return ids[:max_results]
+
+    async def fetch(self, ids):
+        from .google_async import GMAIL_API
+
+        async def fetch_one(call, path):
+            async with self.semaphore:
+                await self.spend(call)
+                try:
+                    return await self.session.get(f'{GMAIL_API}/{path}', format='full')
+                except Exception as e:
+                    print(f"Error fetching {path}: {e}")
+                    return None
+
+        threads, singles = plan_fetch(ids, self.thread_of)
+        results = await asyncio.gather(*(fetch_one('thread', f'threads/{t}') for t in threads),
+                                       *(fetch_one('get', f'messages/{i}') for i in singles))
+        fetched = {}
+        for result in results[:len(threads)]:
+            for msg in (result or {}).get('messages', []):
+                fetched[msg['id']] = msg
+        fetched.update((m['id'], m) for m in results[len(threads):] if m)
+        return [fetched[i] for i in ids if i in fetched]
+
+
+class FixtureSource:
+    """Recorded mailbox (a JSON list of Gmail message resources), newest first"""
+
+    def __init__(self, path_or_messages, latency=0.0):
+        if isinstance(path_or_messages, str):
+            with open(path_or_messages) as f:
+                path_or_messages = json.load(f)
+        self.messages  = {m['id']: m for m in path_or_messages}
+        self.order     = [m['id'] for m in path_or_messages]
+        self.thread_of = {m['id']: m.get('threadId') for m in path_or_messages}
+        self.latency   = latency   # simulated seconds per API round trip
+
+    def list_ids(self, max_results):
+        time.sleep(self.latency)
+        return self.order[:max_results]
+
+    def fetch(self, ids):
+        # one simulated round trip per batch of calls, like GmailSource
+        threads, singles = plan_fetch(ids, self.thread_of)
+        time.sleep(self.latency * -(-(len(threads) + len(singles)) // GMAIL_BATCH_SIZE))
+        return [self.messages[i] for i in ids if i in self.messages]
+
+
+# ── SINKS ─────────────────────────────────────────────
+class ModelsSink:
+    """Stores into emails_col via models.py (Mongo or fallback file storage)"""
+
+    def __init__(self, google_id):
+        self.google_id = google_id
+
+    def existing_ids(self, ids):
+        from .models import get_existing_gmail_ids
+        # Stored-but-unclassified emails are fetched again so a failed
+        # classification gets retried on the next fetch
+        return get_existing_gmail_ids(self.google_id, ids, classified_only=True)
+
+    def store(self, emails):
+        from .dedup import assign_clusters
+        from .models import save_emails_bulk
+        # sets cluster_id on each email before it is stored (emails/dedup.py)
+        assign_clusters(self.google_id, emails)
+        return save_emails_bulk(self.google_id, emails)
+
+
+class CollectionSink:
+    """Stores straight into a pymongo collection keyed by `user_key` (Phase 2 schema)"""
+
+    PLACEHOLDERS = {
+        "classified": False, "class": None, "importance": None, "urgency": None,
+        "quadrant": None, "colour": None, "action": None, "summary": None,
+        "event_date": None,
+    }
+
+    def __init__(self, collection, user_id, user_key='user_id'):
+        self.collection = collection
+        self.user_id    = user_id
+        self.user_key   = user_key
+
+    def existing_ids(self, ids):
+        cursor = self.collection.find(
+            {self.user_key: self.user_id, "gmail_id": {"$in": list(ids)}},
+            {"gmail_id": 1, "_id": 0}
+        )
+        return {doc["gmail_id"] for doc in cursor}
+
+    def store(self, emails):
+        if not emails:
+            return 0
+        docs = [{self.user_key: self.user_id, **email, **self.PLACEHOLDERS} for email in emails]
+        self.collection.insert_many(docs, ordered=False)
+        return len(docs)
+
+
+# ── PIPELINE ──────────────────────────────────────────
+def ingest(source, sink, max_results=50):
+    """
+    Run list → dedup → fetch → parse → bulk store.
+    Returns {'listed', 'skipped', 'stored', 'emails', 'timings'}; `emails`
+    holds the parsed emails that still need classification.
+    """
+    timings = {}
+
+    t = time.perf_counter()
+    ids = source.list_ids(max_results)
+    timings['list'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    known   = sink.existing_ids(ids) if ids else set()
+    new_ids = [i for i in ids if i not in known]
+    timings['dedup'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    messages = source.fetch(new_ids) if new_ids else []
+    timings['fetch'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    emails = parse_all(messages)
+    timings['parse'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    stored = sink.store(emails)
+    timings['store'] = time.perf_counter() - t
+
+    return {
+        'listed':  len(ids),
+        'skipped': len(ids) - len(new_ids),
+        'stored':  stored,
+        'emails':  emails,
+        'timings': timings,
+    }
+
+
+async def ingest_async(source, sink, max_results=50):
+    """
+    ingest() for async views: the source is awaited (AsyncGmailSource) and
+    the blocking sink calls run via models.run_async.
+    """
+    from .models import run_async
+    timings = {}
+
+    t = time.perf_counter()
+    ids = await source.list_ids(max_results)
+    timings['list'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    known   = await run_async(sink.existing_ids, ids) if ids else set()
+    new_ids = [i for i in ids if i not in known]
+    timings['dedup'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    messages = await source.fetch(new_ids) if new_ids else []
+    timings['fetch'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    emails = parse_all(messages)
+    timings['parse'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    stored = await run_async(sink.store, emails)
+    timings['store'] = time.perf_counter() - t
+
+    return {
+        'listed':  len(ids),
+        'skipped': len(ids) - len(new_ids),
+        'stored':  stored,
+        'emails':  emails,
+        'timings': timings,
+    }
+
+
+def parse_all(messages):
+    emails = []
+    for msg in messages:
+        try:
+            emails.append(parse_email(msg))
+        except Exception as e:
+            print(f"Error parsing {msg.get('id')}: {e}")
+    return emails
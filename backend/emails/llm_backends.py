@@ -0,0 +1,177 @@
+# emails/llm_backends.py
+# Where the preference interpreter and the classifier send their prompts.
+# LLM_INTERPRET_BACKEND and LLM_CLASSIFY_BACKEND pick one per operation, so
+# high-volume classification can run locally while interpretation stays remote.
+#
+#   gemini  the Gemini API through gemini_client (deadline, breaker, limiter,
+#           user budgets, usage ledger); the static prefix goes as cached
+#           content when context caching is on
+#   local   a small quantized GGUF model on the CPU via llama-cpp-python
+#           (optional: pip install llama-cpp-python, LLM_LOCAL_MODEL_PATH).
+#           Loaded on first use, one completion at a time per process in a
+#           worker thread, output held to the operation's JSON schema. The
+#           prefix is the system message, so llama.cpp reuses its evaluated
+#           tokens from the previous call of the same operation.
+#   stub    deterministic answers computed from the request's inputs with the
+#           rules in extract.py / ranking.py — no network, no model; for tests
+#           and benchmarks, with LLM_STUB_LATENCY seconds of simulated latency
+#
+# Every backend returns response text, which gemini_service parses the same
+# way whichever backend wrote it. A backend that can't answer raises
+# GeminiUnavailable, so callers fall back exactly as when Gemini is down.
+import asyncio
+import dataclasses
+import datetime
+import json
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from college_data import CLUBS, FESTS, INTEREST_MAP
+from .gemini_client import GeminiUnavailable, call_timeout, generate, generate_async
+
+try:
+    import llama_cpp
+except ImportError:
+    llama_cpp = None
+
+
+@dataclasses.dataclass(frozen=True)
+class Prompt:
+    operation: str          # 'interpret' or 'classify'
+    prefix:    object       # gemini_service.PromptPrefix — the static part
+    tail:      str          # the per-request part
+    schema:    object       # structured.Schema the answer must match
+    config:    dict         # Gemini generation_config
+    inputs:    dict         # what the prompt was built from, for the stub
+
+
+# ── GEMINI ────────────────────────────────────────────
+class GeminiBackend:
+    name       = 'gemini'
+    uses_quota = True       # draws on the shared GEMINI_REQUESTS_PER_MIN bucket
+
+    def complete(self, prompt):
+        gemini, prefix = prompt.prefix.model()
+        return generate(gemini, prefix + prompt.tail, prompt.operation,
+                        generation_config=prompt.config).text
+
+    async def complete_async(self, prompt):
+        gemini, prefix = await prompt.prefix.model_async()
+        response = await generate_async(gemini, prefix + prompt.tail, prompt.operation,
+                                        generation_config=prompt.config)
+        return response.text
+
+
+# ── LOCAL ─────────────────────────────────────────────
+class LocalBackend:
+    name       = 'local_llm'
+    uses_quota = False
+
+    def __init__(self):
+        self._llm  = None
+        self._lock = threading.Lock()   # a llama.cpp context runs one completion at a time
+
+    def _model(self):
+        if self._llm is None:
+            if llama_cpp is None:
+                raise GeminiUnavailable('backend_unavailable', 'llama-cpp-python is not installed')
+            path = settings.LLM_LOCAL_MODEL_PATH
+            if not os.path.exists(path):
+                raise GeminiUnavailable('backend_unavailable', f'no model file at {path}')
+            self._llm = llama_cpp.Llama(model_path=path, n_ctx=settings.LLM_LOCAL_CONTEXT,
+                                        n_threads=settings.LLM_LOCAL_THREADS or None, verbose=False)
+        return self._llm
+
+    def complete(self, prompt):
+        call_timeout()   # no completion starts once the request deadline has passed
+        with self._lock:
+            response = self._model().create_chat_completion(
+                messages=[{'role': 'system', 'content': prompt.prefix.text},
+                          {'role': 'user', 'content': prompt.tail}],
+                response_format={'type': 'json_object', 'schema': prompt.schema.json_schema()},
+                temperature=0, max_tokens=settings.LLM_LOCAL_MAX_TOKENS)
+        return response['choices'][0]['message']['content']
+
+    async def complete_async(self, prompt):
+        return await asyncio.to_thread(self.complete, prompt)
+
+
+# ── STUB ──────────────────────────────────────────────
+ORGANISATIONS = {**CLUBS, **FESTS}
+URGENT_DAYS   = 2   # an event within this many days of receipt is urgent
+CLASS_KEYWORDS = {code: re.compile(r'\b(' + '|'.join(re.escape(k.lower()) for k in entry['keywords']) + r')\b')
+                  for code, entry in ORGANISATIONS.items() if entry.get('keywords')}
+
+
+def stub_interpret(user_text):
+    """high for every club an INTEREST_MAP phrase in the text points at, the default for the rest"""
+    text  = user_text.lower()
+    liked = {code for phrase, codes in INTEREST_MAP.items()
+             if re.search(r'\b' + re.escape(phrase.lower()) + r'\b', text) for code in codes}
+    return {code: 'high' if code in liked else
+            'ignore' if entry.get('default_priority') == 'ignore' else 'low'
+            for code, entry in ORGANISATIONS.items()}
+
+
+def stub_classify(email_data, priority_profile, sender=''):
+    """The club whose keywords the email mentions most, events from the rules, ranked by ranking.rank"""
+    from .condense import clean_body
+    from .extract import extract_events, received_date
+    from .ranking import rank
+
+    body     = clean_body(email_data.get('body'))
+    text     = f"{email_data.get('subject', '')}\n{body}".lower()
+    hits     = {code: len(pattern.findall(text)) for code, pattern in CLASS_KEYWORDS.items()}
+    cls      = max(hits, key=hits.get) if any(hits.values()) else 'OTHER'
+    events   = extract_events(dict(email_data, body=body))
+    soon     = (received_date(email_data) + datetime.timedelta(days=URGENT_DAYS)).isoformat()
+    urgency  = 'high' if events['event_date'] and events['event_date'] <= soon else 'low'
+    ranked   = rank([{'class': cls, 'urgency': urgency, 'sender': sender, 'importance': 'low',
+                      'event_date': events['event_date']}], priority_profile or {})
+    summary  = ' '.join((email_data.get('subject') or body).split())[:200]
+    return dict({k: str(v[0]) for k, v in ranked.items()}, **{
+        'class':       cls,
+        'urgency':     urgency,
+        'summary':     summary or 'No summary available',
+        **events,
+        'organizer':   ORGANISATIONS.get(cls, {}).get('full_name'),
+        'is_informal': False,
+    })
+
+
+class StubBackend:
+    name       = 'stub'
+    uses_quota = False
+    ANSWERS    = {'interpret': stub_interpret, 'classify': stub_classify}
+
+    def complete(self, prompt):
+        time.sleep(settings.LLM_STUB_LATENCY)
+        return self.answer(prompt)
+
+    async def complete_async(self, prompt):
+        await asyncio.sleep(settings.LLM_STUB_LATENCY)
+        return self.answer(prompt)
+
+    def answer(self, prompt):
+        return json.dumps(self.ANSWERS[prompt.operation](**prompt.inputs))
+
+
+# ── SELECTION ─────────────────────────────────────────
+BACKENDS  = {'gemini': GeminiBackend, 'local': LocalBackend, 'stub': StubBackend}
+_backends = {}
+
+
+def backend_for(operation):
+    """The backend configured for `operation` (LLM_<OPERATION>_BACKEND), one instance per name"""
+    name = getattr(settings, f'LLM_{operation.upper()}_BACKEND', 'gemini')
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"LLM_{operation.upper()}_BACKEND={name!r}; expected one of {', '.join(BACKENDS)}")
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
@@ -0,0 +1,291 @@
+# emails/local_model.py
+# Local class / is_informal classifier trained on the labels Gemini already
+# produced (manage.py train_local_model). CPU-only NumPy, no extra packages.
+#
+#   features  hashed word unigrams + bigrams of subject and body (subject words
+#             also tagged separately) plus the sender's domain, into
+#             N_FEATURES buckets; sublinear TF × IDF, L2-normalised
+#   model     multinomial logistic regression over the classes seen in
+#             training, plus a logistic head for is_informal, trained with
+#             minibatch Adagrad
+#
+# gemini_service asks predict() first; a prediction at or above
+# LOCAL_MODEL_THRESHOLD replaces the Gemini call for mail the user doesn't rank
+# high (see local_classification) — routine notices, deals, spam. Their event
+# fields come from the rules in extract.py.
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+N_FEATURES = 1 << 16
+BIAS       = 0                  # feature 0 is always on, so no document is empty
+BODY_CHARS = 2000
+TOKEN      = re.compile(r'[a-z0-9][a-z0-9\'&+-]*')
+
+RELOAD_CHECK = 30               # seconds between model-file mtime checks
+
+
+# ── FEATURES ──────────────────────────────────────────
+def _bucket(token):
+    return 1 + zlib.crc32(token.encode()) % (N_FEATURES - 1)
+
+
+def tokens(subject, body, sender=''):
+    subject_words = TOKEN.findall((subject or '').lower())
+    body_words    = TOKEN.findall((body or '')[:BODY_CHARS].lower())
+    words = subject_words + body_words
+    out = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    out += ['s:' + w for w in subject_words]
+    domain = (sender or '').rpartition('@')[2].strip(' >').lower()
+    if domain:
+        out.append('from:' + domain)
+    return out
+
+
+def term_counts(subject, body, sender=''):
+    """{bucket: sublinear tf}, including the bias bucket"""
+    counts = {}
+    for token in tokens(subject, body, sender):
+        b = _bucket(token)
+        counts[b] = counts.get(b, 0) + 1
+    tf = {b: 1.0 + np.log(c) for b, c in counts.items()}
+    tf[BIAS] = 1.0
+    return tf
+
+
+def vectorize(docs, idf):
+    """CSR arrays (indptr, indices, data) for [(subject, body, sender), ...]"""
+    indptr, indices, data = [0], [], []
+    for subject, body, sender in docs:
+        tf = term_counts(subject, body, sender)
+        idx = np.fromiter(tf.keys(), dtype=np.int32, count=len(tf))
+        val = np.fromiter(tf.values(), dtype=np.float32, count=len(tf)) * idf[idx]
+        bias = idx == BIAS
+        norm = np.linalg.norm(val[~bias]) or 1.0
+        val[~bias] /= norm
+        indices.append(idx)
+        data.append(val)
+        indptr.append(indptr[-1] + len(idx))
+    return (np.asarray(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.zeros(0, np.int32),
+            np.concatenate(data) if data else np.zeros(0, np.float32))
+
+
+def fit_idf(docs):
+    df = np.zeros(N_FEATURES, dtype=np.float64)
+    for subject, body, sender in docs:
+        df[list(term_counts(subject, body, sender))] += 1
+    idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+    idf[BIAS] = 1.0
+    return idf.astype(np.float32)
+
+
+def _rows(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _scores(weights, indptr, indices, data):
+    """X @ weights for CSR X — every row has the bias, so reduceat never sees an empty segment"""
+    return np.add.reduceat(weights[indices] * data[:, None], indptr[:-1], axis=0)
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+# ── MODEL ─────────────────────────────────────────────
+class LocalModel:
+    def __init__(self, classes, idf, weights, informal_weights, meta=None):
+        self.classes          = list(classes)
+        self.idf              = idf
+        self.weights          = weights             # N_FEATURES × classes
+        self.informal_weights = informal_weights    # N_FEATURES × 1
+        self.meta             = meta or {}
+
+    @classmethod
+    def train(cls, docs, labels, informal, epochs=15, batch_size=128, lr=0.5, l2=1e-6, seed=0):
+        """docs: [(subject, body, sender)], labels: [class], informal: [bool]"""
+        classes = sorted(set(labels))
+        index   = {c: i for i, c in enumerate(classes)}
+        y       = np.array([index[c] for c in labels])
+        yi      = np.asarray(informal, dtype=np.float32)
+        idf     = fit_idf(docs)
+
+        rng   = np.random.default_rng(seed)
+        order = rng.permutation(len(docs))
+        indptr, indices, data = vectorize([docs[i] for i in order], idf)
+        y, yi = y[order], yi[order]
+
+        # one matrix for both heads: class logits, then the informal logit
+        n_out   = len(classes) + 1
+        weights = np.zeros((N_FEATURES, n_out), dtype=np.float32)
+        accum   = np.full((N_FEATURES, n_out), 1e-8, dtype=np.float32)   # Adagrad
+        for _ in range(epochs):
+            for start in range(0, len(docs), batch_size):
+                stop = min(start + batch_size, len(docs))
+                lo, hi = indptr[start], indptr[stop]
+                b_indptr  = indptr[start:stop + 1] - lo
+                b_indices = indices[lo:hi]
+                b_data    = data[lo:hi]
+
+                z = _scores(weights, b_indptr, b_indices, b_data)
+                grad_out = np.empty_like(z)
+                grad_out[:, :-1] = _softmax(z[:, :-1])
+                grad_out[np.arange(stop - start), y[start:stop]] -= 1.0
+                grad_out[:, -1]  = _sigmoid(z[:, -1]) - yi[start:stop]
+                grad_out /= stop - start
+
+                feats, inverse = np.unique(b_indices, return_inverse=True)
+                grad = np.zeros((len(feats), n_out), dtype=np.float32)
+                np.add.at(grad, inverse, b_data[:, None] * grad_out[_rows(b_indptr)])
+                grad += l2 * weights[feats]
+                accum[feats]   += grad ** 2
+                weights[feats] -= lr * grad / np.sqrt(accum[feats])
+
+        return cls(classes, idf, weights[:, :-1].copy(), weights[:, -1:].copy())
+
+    def predict_proba(self, docs):
+        """(class probabilities n × classes, informal probabilities n)"""
+        indptr, indices, data = vectorize(docs, self.idf)
+        return (_softmax(_scores(self.weights, indptr, indices, data)),
+                _sigmoid(_scores(self.informal_weights, indptr, indices, data)[:, 0]))
+
+    def predict(self, subject, body, sender=''):
+        """(class, confidence, is_informal) for one email"""
+        proba, informal = self.predict_proba([(subject, body, sender)])
+        best = int(proba[0].argmax())
+        return self.classes[best], float(proba[0, best]), bool(informal[0] >= 0.5)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, classes=np.array(self.classes), idf=self.idf,
+                            weights=self.weights, informal_weights=self.informal_weights,
+                            meta=np.array(json.dumps(self.meta)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls([str(c) for c in f['classes']], f['idf'], f['weights'],
+                       f['informal_weights'], json.loads(str(f['meta'])))
+
+
+# ── EVALUATION ────────────────────────────────────────
+def evaluate(model, docs, labels, informal, threshold):
+    """Held-out report: accuracy, precision/coverage at `threshold`, per-class precision/recall"""
+    proba, informal_p = model.predict_proba(docs)
+    best       = proba.argmax(axis=1)
+    confidence = proba[np.arange(len(docs)), best]
+    predicted  = np.array(model.classes)[best]
+    truth      = np.array(labels)
+    correct    = predicted == truth
+    confident  = confidence >= threshold
+
+    per_class = {}
+    for c in sorted(set(labels) | set(predicted[confident])):
+        chosen = confident & (predicted == c)
+        actual = truth == c
+        per_class[c] = {
+            'support':   int(actual.sum()),
+            'precision': float((chosen & actual).sum() / chosen.sum()) if chosen.any() else None,
+            'recall':    float((chosen & actual).sum() / actual.sum()) if actual.any() else None,
+        }
+    return {
+        'held_out':           len(docs),
+        'accuracy':           float(correct.mean()) if len(docs) else 0.0,
+        'threshold':          threshold,
+        'coverage':           float(confident.mean()) if len(docs) else 0.0,
+        'precision':          float(correct[confident].mean()) if confident.any() else None,
+        'informal_accuracy':  float(((informal_p >= 0.5) == np.asarray(informal, bool)).mean())
+                              if len(docs) else 0.0,
+        'per_class':          per_class,
+    }
+
+
+def is_held_out(gmail_id, fraction):
+    """Deterministic split, so re-training keeps the same emails aside"""
+    return zlib.crc32(str(gmail_id).encode()) % 1000 < fraction * 1000
+
+
+# ── SERVING ───────────────────────────────────────────
+_lock    = threading.Lock()
+_loaded  = None      # (mtime, LocalModel)
+_checked = None    # monotonic time of the last mtime check
+
+
+def get_model():
+    """The trained model, reloaded when the file changes; None if there is none"""
+    global _loaded, _checked
+    if not settings.LOCAL_MODEL_ENABLED:
+        return None
+    now = time.monotonic()
+    if _checked is not None and now - _checked < RELOAD_CHECK:
+        return _loaded[1] if _loaded else None
+    with _lock:
+        _checked = now
+        try:
+            mtime = os.stat(settings.LOCAL_MODEL_PATH).st_mtime_ns
+        except OSError:
+            _loaded = None
+            return None
+        if _loaded is None or _loaded[0] != mtime:
+            try:
+                _loaded = (mtime, LocalModel.load(settings.LOCAL_MODEL_PATH))
+            except Exception as e:
+                print(f"Local model load failed: {e}")
+                _loaded = None
+        return _loaded[1] if _loaded else None
+
+
+def local_classification(email_data, priority_profile, sender=''):
+    """
+    A full classification dict from the local model, or None when Gemini
+    should be asked: no model, confidence below LOCAL_MODEL_THRESHOLD, or an
+    email this user would rank high (those need Gemini's urgency and summary).
+    """
+    model = get_model()
+    if model is None:
+        return None
+    subject = email_data.get('subject', '')
+    body    = email_data.get('body', '')
+    cls, confidence, is_informal = model.predict(subject, body, sender)
+    if confidence < settings.LOCAL_MODEL_THRESHOLD:
+        return None
+
+    from .condense import clean_body
+    from .extract import EVENT_FIELDS, extract_events
+    from .ranking import rank
+    # the rules fill the event fields Gemini would have; spam gets none
+    events = extract_events(dict(email_data, body=clean_body(body))) if cls != 'SPAM' \
+        else dict.fromkeys(EVENT_FIELDS)
+    email  = {'class': cls, 'urgency': 'low', 'sender': sender, 'importance': 'low',
+              'event_date': events['event_date']}
+    ranked = {k: str(v[0]) for k, v in rank([email], priority_profile or {}).items()}
+    if ranked['importance'] == 'high':
+        return None
+
+    summary = ' '.join((body or subject or '').split())
+    return dict(ranked, **{
+        'class':             cls,
+        'urgency':           'low',
+        'summary':           summary[:200] + ('…' if len(summary) > 200 else ''),
+        **events,
+        'organizer':         None,
+        'is_informal':       is_informal,
+        'fallback':          None,
+        'classified_by':     'local',
+        'confidence':        round(confidence, 4),
+    })
@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from emails.models import run_async, list_users, get_user, get_preferences
+from emails.pipeline import run_fetch
+from emails.quota import GMAIL_BUDGET, GEMINI_BUDGET
+from emails.reclassify import run_batch as reclassify_batch
+
+BACKOFF         = 2.0      # interval multiplier after a quiet poll
+INACTIVE_FACTOR = 4        # inactive users never poll faster than min_interval * this
+USER_REFRESH    = 300      # seconds between re-reading users_col for new sign-ups
+
+
+class UserSchedule:
+    def __init__(self, google_id, interval):
+        self.google_id = google_id
+        self.interval  = interval
+        self.failures  = 0
+
+
+class Poller:
+    """
+    Polls every user's inbox on an adaptive interval.
+
+    - users sit in a heap ordered by next due time; ties go first-come-first-served
+    - a user is only rescheduled when their job finishes, so no user ever holds
+      more than one worker and a huge inbox can't monopolise the pool
+    - Gmail and Gemini calls draw from the process-wide quota buckets
+    - every reclassify_interval seconds, fallback-classified emails are retried
+      with whatever Gemini quota the polls leave spare (emails/reclassify.py)
+    """
+
+    def __init__(self, workers, min_interval, max_interval, active_days, max_results, stdout,
+                 reclassify_interval=0):
+        self.workers      = workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.active_days  = active_days
+        self.max_results  = max_results
+        self.stdout       = stdout
+        self.reclassify_interval = reclassify_interval
+        self.schedules    = {}
+        self.heap         = []
+        self.seq          = itertools.count()
+
+    # ── scheduling ────────────────────────────────────
+    def push(self, google_id, delay):
+        heapq.heappush(self.heap, (time.monotonic() + delay, next(self.seq), google_id))
+
+    async def load_users(self):
+        for user in await run_async(list_users):
+            gid = user['google_id']
+            if gid not in self.schedules:
+                self.schedules[gid] = UserSchedule(gid, self.floor(user))
+                # spread the first round out instead of stampeding on start-up
+                self.push(gid, random.uniform(0, min(self.min_interval, 30)))
+
+    def is_active(self, user):
+        try:
+            last_login = datetime.fromisoformat(user.get('last_login') or '')
+        except ValueError:
+            return False
+        return datetime.utcnow() - last_login < timedelta(days=self.active_days)
+
+    def floor(self, user):
+        return self.min_interval if self.is_active(user) else min(
+            self.max_interval, self.min_interval * INACTIVE_FACTOR)
+
+    def next_interval(self, sched, user, fetched):
+        floor = self.floor(user or {})
+        if fetched:
+            interval = sched.interval / BACKOFF          # mail is flowing — come back sooner
+        else:
+            interval = sched.interval * BACKOFF          # quiet inbox — back off
+        interval = min(self.max_interval, max(floor, interval))
+        return interval * random.uniform(0.9, 1.1)   # jitter keeps users from syncing up
+
+    # ── work ──────────────────────────────────────────
+    async def poll_user(self, google_id):
+        sched = self.schedules[google_id]
+        user, prefs = await asyncio.gather(run_async(get_user, google_id),
+                                           run_async(get_preferences, google_id))
+        fetched = 0
+        try:
+            if user and user.get('token') and prefs:
+                summary = await run_fetch(google_id, user, prefs, max_results=self.max_results,
+                                          gmail_budget=GMAIL_BUDGET, gemini_budget=GEMINI_BUDGET)
+                fetched = summary['fetched']
+                sched.failures = 0
+                if fetched:
+                    self.stdout.write(f'{google_id}: {fetched} new, '
+                                      f'{summary["notifications"]} notifications')
+            sched.interval = self.next_interval(sched, user, fetched)
+        except Exception as e:
+            sched.failures += 1
+            sched.interval = min(self.max_interval, sched.interval * BACKOFF ** sched.failures)
+            self.stdout.write(f'{google_id}: poll failed ({e}); retry in {sched.interval:.0f}s')
+        return sched.interval
+
+    async def reclassify(self):
+        try:
+            result = await reclassify_batch(budget=GEMINI_BUDGET)
+            if result.get('claimed'):
+                self.stdout.write(f're-classification: {result["reclassified"]} of '
+                                  f'{result["claimed"]} queued emails classified')
+        except Exception as e:
+            self.stdout.write(f're-classification batch failed ({e})')
+
+    async def worker(self, queue, once):
+        while True:
+            google_id = await queue.get()
+            try:
+                delay = await self.poll_user(google_id)
+                if not once:
+                    self.push(google_id, delay)
+            finally:
+                queue.task_done()
+
+    async def run(self, once=False):
+        queue = asyncio.Queue()
+        tasks = [asyncio.create_task(self.worker(queue, once)) for _ in range(self.workers)]
+        await self.load_users()
+        if once:
+            self.heap = [(0, next(self.seq), gid) for gid in self.schedules]
+        last_refresh = last_reclassify = time.monotonic()
+        reclassifying = None
+
+        try:
+            while True:
+                now = time.monotonic()
+                if not once and now - last_refresh > USER_REFRESH:
+                    await self.load_users()
+                    last_refresh = now
+                if (not once and self.reclassify_interval
+                        and now - last_reclassify > self.reclassify_interval
+                        and (reclassifying is None or reclassifying.done())):
+                    reclassifying = asyncio.create_task(self.reclassify())
+                    last_reclassify = now
+                while self.heap and (once or self.heap[0][0] <= now):
+                    _, _, google_id = heapq.heappop(self.heap)
+                    queue.put_nowait(google_id)
+                if once:
+                    await queue.join()
+                    return
+                wait = self.heap[0][0] - now if self.heap else 1.0
+                await asyncio.sleep(max(0.05, min(wait, 1.0)))
+        finally:
+            for task in tasks + ([reclassifying] if reclassifying else []):
+                task.cancel()
+
+
+class Command(BaseCommand):
+    help = 'Poll every user\'s Gmail in the background so the dashboard never waits on Gmail/Gemini'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Concurrent user polls (default: 8)')
+        parser.add_argument('--min-interval', type=float, default=120,
+                            help='Fastest poll interval for active users, seconds (default: 120)')
+        parser.add_argument('--max-interval', type=float, default=3600,
+                            help='Slowest poll interval for quiet inboxes, seconds (default: 3600)')
+        parser.add_argument('--active-days', type=float, default=3,
+                            help='Users who logged in within this many days poll fastest (default: 3)')
+        parser.add_argument('--max-results', type=int, default=30,
+                            help='Messages listed per poll (default: 30)')
+        parser.add_argument('--once', action='store_true',
+                            help='Poll every user once and exit (for cron)')
+        parser.add_argument('--reclassify-interval', type=float, default=60,
+                            help='Seconds between batches retrying fallback-classified emails; '
+                                 '0 disables (default: 60)')
+
+    def handle(self, *args, **options):
+        poller = Poller(
+            workers=options['workers'],
+            min_interval=options['min_interval'],
+            max_interval=options['max_interval'],
+            active_days=options['active_days'],
+            max_results=options['max_results'],
+            stdout=self.stdout,
+            reclassify_interval=options['reclassify_interval'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Polling mailboxes with {options["workers"]} workers'
+            + (' (single pass)' if options['once'] else '')))
+        try:
+            asyncio.run(poller.run(once=options['once']))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✅ Polled {len(poller.schedules)} users'))
@@ -0,0 +1,49 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from emails.models import run_async, enqueue_unqueued_fallbacks, reclassify_queue_stats
+from emails.quota import GEMINI_BUDGET
+from emails.reclassify import run_batch
+
+
+class Command(BaseCommand):
+    help = 'Retry Gemini classification for emails stored with the fallback classification'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=None,
+                            help='Emails per batch (default: RECLASSIFY_BATCH)')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds between batches (default: 60)')
+        parser.add_argument('--once', action='store_true',
+                            help='Run batches until nothing is due, then exit (for cron)')
+        parser.add_argument('--backfill', action='store_true',
+                            help='First queue fallback-classified emails stored before the queue existed')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print the queue counts and exit')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f'Queued {enqueue_unqueued_fallbacks()} fallback-classified emails')
+        if options['stats']:
+            self.stdout.write(str(reclassify_queue_stats()))
+            return
+        try:
+            asyncio.run(self.run(options['batch'], options['interval'], options['once']))
+        except KeyboardInterrupt:
+            pass
+
+    async def run(self, batch, interval, once):
+        while True:
+            result = await run_batch(batch, budget=GEMINI_BUDGET)
+            if result.get('claimed'):
+                self.stdout.write(f'{result["claimed"]} retried: {result["reclassified"]} reclassified, '
+                                  f'{result["failed"]} failed, {result["dropped"]} dropped')
+            if once and not result.get('claimed'):
+                stats = await run_async(reclassify_queue_stats)
+                self.stdout.write(self.style.SUCCESS(
+                    f'✅ Nothing due ({result.get("skipped", "queue empty")}); '
+                    f'{stats["pending"]} pending, {stats["exhausted"]} exhausted'))
+                return
+            if not result.get('claimed'):
+                await asyncio.sleep(interval)
@@ -0,0 +1,75 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emails.local_model import LocalModel, evaluate, is_held_out
+from emails.models import iter_labelled_emails
+
+
+class Command(BaseCommand):
+    help = 'Train the local classifier on stored Gemini classifications and report held-out accuracy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holdout', type=float, default=0.2,
+                            help='Share of emails kept aside for evaluation (default: 0.2)')
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='Confidence to report precision/coverage at (default: LOCAL_MODEL_THRESHOLD)')
+        parser.add_argument('--epochs', type=int, default=15)
+        parser.add_argument('--min-labels', type=int, default=200,
+                            help='Refuse to train on fewer labelled emails (default: 200)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Evaluate only; keep the current model file')
+        parser.add_argument('--output', default=None,
+                            help='Model file (default: LOCAL_MODEL_PATH)')
+
+    def handle(self, *args, **options):
+        threshold = options['threshold'] or settings.LOCAL_MODEL_THRESHOLD
+        emails = [e for e in iter_labelled_emails() if e.get('class')]
+        if len(emails) < options['min_labels']:
+            raise CommandError(f'Only {len(emails)} labelled emails; need {options["min_labels"]}')
+
+        def split(rows):
+            return ([(e.get('subject', ''), e.get('body', ''), e.get('sender', '')) for e in rows],
+                    [e['class'] for e in rows],
+                    [bool(e.get('is_informal')) for e in rows])
+
+        test  = [e for e in emails if is_held_out(e['gmail_id'], options['holdout'])]
+        train = [e for e in emails if not is_held_out(e['gmail_id'], options['holdout'])]
+        self.stdout.write(f'{len(emails)} labelled emails: {len(train)} train, {len(test)} held out')
+
+        report = None
+        if test:
+            started = time.perf_counter()
+            model = LocalModel.train(*split(train), epochs=options['epochs'])
+            self.stdout.write(f'Trained in {time.perf_counter() - started:.1f}s')
+            docs, labels, informal = split(test)
+            started = time.perf_counter()
+            report = evaluate(model, docs, labels, informal, threshold)
+            report['ms_per_email'] = (time.perf_counter() - started) * 1000 / len(test)
+            self.print_report(report)
+
+        if options['dry_run']:
+            return
+        # the saved model learns from every label, held-out ones included
+        model = LocalModel.train(*split(emails), epochs=options['epochs'])
+        model.meta = {'trained_at': datetime.datetime.utcnow().isoformat(),
+                      'labels': len(emails), 'holdout': report}
+        path = options['output'] or settings.LOCAL_MODEL_PATH
+        model.save(path)
+        self.stdout.write(self.style.SUCCESS(f'✅ Saved {len(model.classes)}-class model to {path}'))
+
+    def print_report(self, report):
+        def pct(value):
+            return '—' if value is None else f'{value:.1%}'
+
+        self.stdout.write(f'Accuracy {pct(report["accuracy"])}, '
+                          f'informal {pct(report["informal_accuracy"])}, '
+                          f'{report["ms_per_email"]:.2f} ms/email')
+        self.stdout.write(f'At confidence ≥ {report["threshold"]}: precision {pct(report["precision"])}, '
+                          f'coverage {pct(report["coverage"])} (share of emails that skip Gemini)')
+        self.stdout.write(f'{"class":<22}{"support":>8}{"precision":>11}{"recall":>9}')
+        for cls, row in report['per_class'].items():
+            self.stdout.write(f'{cls:<22}{row["support"]:>8}{pct(row["precision"]):>11}'
+                              f'{pct(row["recall"]):>9}')
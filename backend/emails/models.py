@@ -1,11 +1,23 @@
 # emails/models.py — FIXED + EXTENDED + FALLBACK
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from datetime import datetime
+from asgiref.sync import sync_to_async
+from pymongo import MongoClient, ReturnDocument, UpdateMany, UpdateOne, ASCENDING, DESCENDING
+from datetime import date, datetime
+import copy
+import heapq
 import os
+import time
 
+from django.conf import settings
+
+from .cache import invalidate, preferences_cache, start_invalidation_listener, user_cache
+from .events import BOOT_ID, publish
 # Import persistent storage
 from .storage import (get_users, get_emails, get_preferences, get_notifications, get_calendar,
-                      save_users, save_emails, save_preferences, save_notifications, save_calendar)
+                      get_dashboards, get_reclassify_queue, get_usage, save_users, save_emails,
+                      save_notifications, save_calendar, save_dashboards, save_reclassify_queue,
+                      save_usage)
+# models.save_preferences below shadows the storage function of the same name
+from .storage import save_preferences as persist_preferences
 
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
 try:
@@ -18,8 +30,14 @@ try:
     preferences_col    = db['preferences']
     notifications_col  = db['notifications']
     calendar_col       = db['calendar_events']   # NEW
+    dashboards_col     = db['dashboards']
+    versions_col       = db['data_versions']
+    reclassify_col     = db['reclassify_queue']
+    usage_col          = db['gemini_usage']
     MONGO_AVAILABLE = True
     print("✅ MongoDB connected successfully")
+    if settings.CACHE_INVALIDATION == 'mongo':
+        start_invalidation_listener(db)
 except Exception as e:
     print(f"MongoDB connection failed: {e}")
     print("Using fallback persistent file storage for testing")
@@ -30,6 +48,51 @@ except Exception as e:
     preferences_col = get_preferences()
     notifications_col = get_notifications()
     calendar_col = get_calendar()
+    dashboards_col = get_dashboards()
+    versions_col = {}   # google_id -> {scope: n}; per process, hence BOOT_ID as epoch
+    reclassify_col = get_reclassify_queue()
+    usage_col = get_usage()
+
+
+# ── ASYNC ACCESS ──────────────────────────────────────
+def run_async(func, *args, **kwargs):
+    """
+    Await any function in this module from an async view. pymongo is
+    thread-safe, so Mongo calls run on the thread pool in parallel; the
+    fallback lists are not, so those calls stay on Django's single sync thread.
+    """
+    return sync_to_async(func, thread_sensitive=not MONGO_AVAILABLE)(*args, **kwargs)
+
+
+# ── DATA VERSIONS ─────────────────────────────────────
+# Every write below bumps a per-user counter for the data it touched; read
+# endpoints turn the counters into an ETag (decorators.etag_versioned) and
+# answer If-None-Match with a 304 without running their queries.
+VERSION_SCOPES = ('emails', 'calendar', 'preferences', 'notifications')
+
+
+def bump_version(google_id, *scopes):
+    if MONGO_AVAILABLE:
+        versions_col.update_one(
+            {"google_id": google_id},
+            {"$inc": {scope: 1 for scope in scopes},
+             # a wiped/recreated doc restarts at 0, so the epoch keeps old ETags from matching
+             "$setOnInsert": {"epoch": int(datetime.utcnow().timestamp() * 1000)}},
+            upsert=True
+        )
+    else:
+        versions = versions_col.setdefault(google_id, {})
+        for scope in scopes:
+            versions[scope] = versions.get(scope, 0) + 1
+
+
+def get_versions(google_id):
+    """{'epoch': ..., scope: n, ...} — one key lookup"""
+    if MONGO_AVAILABLE:
+        versions = versions_col.find_one({"google_id": google_id}, {"_id": 0, "google_id": 0})
+        return versions or {"epoch": 0}
+    else:
+        return dict(versions_col.get(google_id, {}), epoch=BOOT_ID)
 
 
 # ── USERS ─────────────────────────────────────────────
@@ -41,6 +104,7 @@ def create_user(google_id, email, name, roll_no, picture, token_dict):
                 {"google_id": google_id},
                 {"$set": {"token": token_dict, "last_login": datetime.utcnow().isoformat()}}
             )
+            invalidate(user_cache, google_id)
             return str(existing['_id'])
         result = users_col.insert_one({
             "google_id":  google_id, "email": email, "name": name,
@@ -48,6 +112,7 @@ def create_user(google_id, email, name, roll_no, picture, token_dict):
             "created_at": datetime.utcnow().isoformat(),
             "last_login": datetime.utcnow().isoformat(),
         })
+        invalidate(user_cache, google_id)
         return str(result.inserted_id)
     else:
         # Fallback: simple in-memory storage
@@ -59,17 +124,67 @@ def create_user(google_id, email, name, roll_no, picture, token_dict):
         }
         users_col.append(user)
         save_users()
+        invalidate(user_cache, google_id)
         return str(len(users_col) - 1)
 
 
 def get_user(google_id):
+    # Cached (emails/cache.py). Mongo callers get their own copy, as find_one
+    # always did; fallback callers get the stored dict itself, as before.
+    user = user_cache.get(google_id)
+    if user is not None:
+        return copy.deepcopy(user) if MONGO_AVAILABLE else user
+    token = user_cache.token()
+    if MONGO_AVAILABLE:
+        user = users_col.find_one({"google_id": google_id})
+    else:
+        user = next((u for u in users_col if u.get("google_id") == google_id), None)
+    if user is not None:
+        user_cache.set(google_id, copy.deepcopy(user) if MONGO_AVAILABLE else user, token)
+    return user
+
+
+def list_users():
+    """Every user with the fields the background poller schedules on"""
+    fields = ("google_id", "last_login")
+    if MONGO_AVAILABLE:
+        return list(users_col.find({}, dict(dict.fromkeys(fields, 1), _id=0)))
+    else:
+        return [{f: u.get(f) for f in fields} for u in users_col if u.get("google_id")]
+
+
+def set_calendar_sync_token(google_id, sync_token):
+    """Store the Google Calendar nextSyncToken so the next sync is incremental"""
     if MONGO_AVAILABLE:
-        return users_col.find_one({"google_id": google_id})
+        users_col.update_one(
+            {"google_id": google_id},
+            {"$set": {"calendar_sync_token": sync_token}}
+        )
+        invalidate(user_cache, google_id)
     else:
+        # the cached dict is this same object, so nothing to invalidate here
         for user in users_col:
             if user.get("google_id") == google_id:
-                return user
-        return None
+                user["calendar_sync_token"] = sync_token
+                save_users()
+                break
+
+
+def update_user_token(google_id, access_token):
+    """Store an access token refreshed by google_async.AsyncGoogleSession"""
+    if MONGO_AVAILABLE:
+        users_col.update_one(
+            {"google_id": google_id},
+            {"$set": {"token.token": access_token}}
+        )
+        invalidate(user_cache, google_id)
+    else:
+        # the cached dict is this same object, so nothing to invalidate here
+        for user in users_col:
+            if user.get("google_id") == google_id:
+                user.setdefault("token", {})["token"] = access_token
+                save_users()
+                break
 
 
 # ── PREFERENCES ───────────────────────────────────────
@@ -89,6 +204,7 @@ def save_preferences(google_id, raw_text, priority_profile,
             }},
             upsert=True
         )
+        invalidate(preferences_cache, google_id)
     else:
         # Fallback: in-memory storage
         for pref in preferences_col:
@@ -101,7 +217,8 @@ def save_preferences(google_id, raw_text, priority_profile,
                     "manual_absences": kwargs.get("manual_absences", pref.get("manual_absences", {})),
                     "updated_at": datetime.utcnow().isoformat(),
                 })
-                save_preferences()
+                persist_preferences()
+                bump_version(google_id, 'preferences')
                 return
         preferences_col.append({
             "google_id": google_id,
@@ -112,17 +229,23 @@ def save_preferences(google_id, raw_text, priority_profile,
             "manual_absences": kwargs.get("manual_absences", {}),
             "updated_at": datetime.utcnow().isoformat(),
         })
-        save_preferences()
+        persist_preferences()
+    bump_version(google_id, 'preferences')
 
 
 def get_preferences(google_id):
+    # Cached like get_user; a missing document is not cached
+    prefs = preferences_cache.get(google_id)
+    if prefs is not None:
+        return copy.deepcopy(prefs) if MONGO_AVAILABLE else prefs
+    token = preferences_cache.token()
     if MONGO_AVAILABLE:
-        return preferences_col.find_one({"google_id": google_id})
+        prefs = preferences_col.find_one({"google_id": google_id})
     else:
-        for pref in preferences_col:
-            if pref.get("google_id") == google_id:
-                return pref
-        return None
+        prefs = next((p for p in preferences_col if p.get("google_id") == google_id), None)
+    if prefs is not None:
+        preferences_cache.set(google_id, copy.deepcopy(prefs) if MONGO_AVAILABLE else prefs, token)
+    return prefs
 
 
 # ── EMAILS ────────────────────────────────────────────
@@ -135,6 +258,7 @@ def save_email(google_id, email_data):
         if existing:
             return str(existing['_id'])
         result = emails_col.insert_one(email_data)
+        bump_version(google_id, 'emails')
         return str(result.inserted_id)
     else:
         # Fallback: in-memory storage
@@ -144,38 +268,263 @@ def save_email(google_id, email_data):
                 return str(emails_col.index(email))
         emails_col.append(email_data)
         save_emails()
+        bump_version(google_id, 'emails')
         return str(len(emails_col) - 1)
 
 
+def get_existing_gmail_ids(google_id, gmail_ids, classified_only=False):
+    """Which of these gmail_ids are already stored for the user — one query"""
+    if MONGO_AVAILABLE:
+        query = {"google_id": google_id, "gmail_id": {"$in": list(gmail_ids)}}
+        if classified_only:
+            query["classified"] = True
+        return {e['gmail_id'] for e in emails_col.find(query, {"gmail_id": 1, "_id": 0})}
+    else:
+        wanted = set(gmail_ids)
+        return {e['gmail_id'] for e in emails_col
+                if e.get('google_id') == google_id and e.get('gmail_id') in wanted
+                and (e.get('classified') or not classified_only)}
+
+
+def save_emails_bulk(google_id, emails):
+    """Insert many emails at once, skipping ones already stored. Returns new count."""
+    if not emails:
+        return 0
+    if MONGO_AVAILABLE:
+        ops = []
+        for email_data in emails:
+            email_data['google_id'] = google_id
+            ops.append(UpdateOne(
+                {"google_id": google_id, "gmail_id": email_data['gmail_id']},
+                {"$setOnInsert": email_data},
+                upsert=True
+            ))
+        result = emails_col.bulk_write(ops, ordered=False)
+        if result.upserted_count:
+            bump_version(google_id, 'emails')
+        return result.upserted_count
+    else:
+        # Fallback: one pass to find what's stored, one file rewrite
+        stored = {e.get('gmail_id') for e in emails_col if e.get('google_id') == google_id}
+        added  = 0
+        for email_data in emails:
+            if email_data['gmail_id'] in stored:
+                continue
+            email_data['google_id'] = google_id
+            emails_col.append(email_data)
+            stored.add(email_data['gmail_id'])
+            added += 1
+        if added:
+            save_emails()
+            bump_version(google_id, 'emails')
+        return added
+
+
 def update_email_classification(google_id, gmail_id, classification):
     if MONGO_AVAILABLE:
         classification['classified']    = True
         classification['classified_at'] = datetime.utcnow().isoformat()
-        emails_col.update_one(
+        # Old card fields come back with the write, so the dashboard can move
+        # the email between buckets without another read
+        before = emails_col.find_one_and_update(
             {"google_id": google_id, "gmail_id": gmail_id},
-            {"$set": classification}
+            {"$set": classification},
+            projection=card_projection(EMAIL_CARD_FIELDS + ('classified', 'fallback')),
+            return_document=ReturnDocument.BEFORE
         )
+        if before:
+            dashboard_email_classified(google_id, before, dict(before, **classification))
+            bump_version(google_id, 'emails')
+            track_fallback(google_id, gmail_id, before, classification)
     else:
         # Fallback: in-memory storage
         for email in emails_col:
             if email.get('google_id') == google_id and email.get('gmail_id') == gmail_id:
+                before = dict(email)
                 email.update(classification)
                 email['classified'] = True
                 email['classified_at'] = datetime.utcnow().isoformat()
                 save_emails()
+                dashboard_email_classified(google_id, before, email)
+                bump_version(google_id, 'emails')
+                track_fallback(google_id, gmail_id, before, classification)
                 break
 
 
+def track_fallback(google_id, gmail_id, before, classification):
+    """
+    Queue a fallback classification for retry; a real one replacing a fallback
+    leaves the queue. A duplicate isn't queued: its representative's retry
+    carries over to it (reclassify.retry_user_emails).
+    """
+    if classification.get('fallback'):
+        if not classification.get('duplicate_of'):
+            enqueue_reclassify(google_id, gmail_id, classification['fallback'])
+    elif before.get('fallback'):
+        dequeue_reclassify(google_id, gmail_id)
+
+
+def iter_labelled_emails():
+    """
+    Every user's emails with a model classification — training data for
+    emails/local_model.py. Fallback, locally classified and stub-classified
+    emails are skipped.
+    """
+    fields = ('gmail_id', 'subject', 'body', 'sender', 'class', 'is_informal')
+    if MONGO_AVAILABLE:
+        query = {"classified": True, "fallback": {"$in": [None]},
+                 "classified_by": {"$nin": ["local", "stub"]}, "summary": {"$ne": FALLBACK_SUMMARY}}
+        yield from emails_col.find(query, card_projection(fields))
+    else:
+        for e in emails_col:
+            if e.get('classified') and not e.get('fallback') and e.get('classified_by') not in ('local', 'stub') \
+                    and e.get('summary') != FALLBACK_SUMMARY:
+                yield {f: e.get(f) for f in fields}
+
+
+def find_cluster_candidates(google_id, band_keys, since):
+    """Fingerprinted emails fetched since `since` sharing an LSH band with band_keys (emails/dedup.py)"""
+    fields = ('gmail_id', 'minhash', 'minhash_bands', 'cluster_id')
+    if MONGO_AVAILABLE:
+        return list(emails_col.find(
+            {"google_id": google_id, "minhash_bands": {"$in": list(band_keys)},
+             "fetched_at": {"$gte": since}},
+            card_projection(fields)))
+    else:
+        wanted = set(band_keys)
+        return [{f: e.get(f) for f in fields} for e in emails_col
+                if e.get('google_id') == google_id and e.get('minhash')
+                and e.get('fetched_at', '') >= since and wanted.intersection(e['minhash_bands'])]
+
+
+def find_thread_clusters(google_id, thread_ids):
+    """{thread_id: cluster_id} for the user's stored emails in these Gmail threads (emails/dedup.py)"""
+    if MONGO_AVAILABLE:
+        emails = emails_col.find({"google_id": google_id, "thread_id": {"$in": list(thread_ids)}},
+                                 card_projection(('gmail_id', 'thread_id', 'cluster_id')))
+    else:
+        wanted = set(thread_ids)
+        emails = (e for e in emails_col
+                  if e.get('google_id') == google_id and e.get('thread_id') in wanted)
+    clusters = {}
+    for e in emails:
+        clusters.setdefault(e['thread_id'], e.get('cluster_id') or e['gmail_id'])
+    return clusters
+
+
+def get_cluster_emails(google_id, cluster_ids):
+    """Full stored emails of these clusters (emails/dedup.py), their first emails included"""
+    if MONGO_AVAILABLE:
+        ids = list(cluster_ids)
+        return list(emails_col.find({"google_id": google_id,
+                                     "$or": [{"cluster_id": {"$in": ids}}, {"gmail_id": {"$in": ids}}]},
+                                    {"_id": 0}))
+    else:
+        wanted = set(cluster_ids)
+        return [e for e in emails_col if e.get('google_id') == google_id
+                and (e.get('cluster_id') in wanted or e.get('gmail_id') in wanted)]
+
+
+def get_emails_by_ids(google_id, gmail_ids):
+    """Full stored emails for these gmail_ids, in no particular order"""
+    if MONGO_AVAILABLE:
+        return list(emails_col.find({"google_id": google_id, "gmail_id": {"$in": list(gmail_ids)}},
+                                    {"_id": 0}))
+    else:
+        wanted = set(gmail_ids)
+        return [e for e in emails_col
+                if e.get('google_id') == google_id and e.get('gmail_id') in wanted]
+
+
+def get_fallback_duplicates(google_id, gmail_ids):
+    """{gmail_id: [duplicate gmail_id, ...]} — emails still holding a fallback reused from these"""
+    if MONGO_AVAILABLE:
+        found = emails_col.find({"google_id": google_id, "duplicate_of": {"$in": list(gmail_ids)},
+                                 "fallback": {"$nin": [None]}}, {"gmail_id": 1, "duplicate_of": 1, "_id": 0})
+    else:
+        wanted = set(gmail_ids)
+        found  = [e for e in emails_col if e.get('google_id') == google_id
+                  and e.get('duplicate_of') in wanted and e.get('fallback')]
+    duplicates = {}
+    for e in found:
+        duplicates.setdefault(e['duplicate_of'], []).append(e['gmail_id'])
+    return duplicates
+
+
+def get_classified_emails(google_id, fields):
+    """Only `fields` of every classified email — for batch jobs such as ranking.rescore_emails"""
+    if MONGO_AVAILABLE:
+        return list(emails_col.find({"google_id": google_id, "classified": True},
+                                    card_projection(fields)))
+    else:
+        return [{f: e.get(f) for f in fields} for e in emails_col
+                if e.get('google_id') == google_id and e.get('classified')]
+
+
+def set_email_fields_bulk(google_id, groups):
+    """
+    groups: [(fields_to_set, [gmail_id, ...]), ...]. One UpdateMany per distinct
+    update on Mongo, one file rewrite on the fallback; the dashboard snapshot is
+    rebuilt afterwards since any number of emails may have changed bucket.
+    """
+    if not groups:
+        return
+    if MONGO_AVAILABLE:
+        emails_col.bulk_write([
+            UpdateMany({"google_id": google_id, "gmail_id": {"$in": ids}}, {"$set": fields})
+            for fields, ids in groups
+        ], ordered=False)
+    else:
+        updates = {gmail_id: fields for fields, ids in groups for gmail_id in ids}
+        for email in emails_col:
+            if email.get('google_id') == google_id and email.get('gmail_id') in updates:
+                email.update(updates[email['gmail_id']])
+        save_emails()
+    rebuild_dashboard(google_id)
+    bump_version(google_id, 'emails')
+
+
+EMAIL_LIST_OMIT   = ('body', 'minhash', 'minhash_bands')     # large; only the classifier / dedup read them
+EMAIL_LIST_ALWAYS = ('gmail_id', 'quadrant', 'is_informal')  # list views group by these
+
+
+def email_list_projection(fields):
+    """
+    Mongo projection for a list query. fields=None means every field except
+    EMAIL_LIST_OMIT, '*' means everything, otherwise a tuple of field names.
+    """
+    if fields == '*':
+        return None
+    if fields is None:
+        return dict.fromkeys(EMAIL_LIST_OMIT, 0)
+    projection = dict.fromkeys(EMAIL_LIST_ALWAYS + tuple(fields), 1)
+    projection.setdefault('_id', 0)
+    return projection
+
+
+def project_email(email, fields):
+    """email_list_projection() for the fallback lists"""
+    if fields == '*':
+        return email
+    if fields is None:
+        return {k: v for k, v in email.items() if k not in EMAIL_LIST_OMIT}
+    return {k: email[k] for k in EMAIL_LIST_ALWAYS + tuple(fields) if k in email}
+
+
 def get_emails(google_id, quadrant=None, class_filter=None,
-               is_informal=False, limit=50):
+               is_informal=False, limit=50, fields=None, collapse=False):
     if MONGO_AVAILABLE:
         query = {"google_id": google_id, "classified": True}
         if quadrant:    query["quadrant"]    = quadrant
         if class_filter: query["class"]     = class_filter
         if is_informal: query["is_informal"] = True
-        emails = list(emails_col.find(query).sort("date", DESCENDING).limit(limit))
+        if collapse:
+            return get_collapsed_emails(query, limit, fields)
+        emails = list(emails_col.find(query, email_list_projection(fields))
+                      .sort("date", DESCENDING).limit(limit))
         for e in emails:
-            e['_id'] = str(e['_id'])
+            if '_id' in e:
+                e['_id'] = str(e['_id'])
         return emails
     else:
         # Fallback: in-memory storage
@@ -187,10 +536,54 @@ def get_emails(google_id, quadrant=None, class_filter=None,
         if is_informal:
             emails = [e for e in emails if e.get('is_informal')]
         emails.sort(key=lambda x: x.get('date', ''), reverse=True)
-        return emails[:limit]
+        if collapse:
+            return collapse_clusters(emails, limit, fields)
+        return [project_email(e, fields) for e in emails[:limit]]
+
 
+# Collapsed lists show the newest email of each cluster — a Gmail thread and
+# its near-duplicates (emails/dedup.py) — with `duplicates` (how many emails
+# it stands for) and `cluster_ids` (all of them, newest first)
+CLUSTER_KEY = {"$ifNull": ["$cluster_id", "$gmail_id"]}
 
-def search_emails(google_id, query_text, limit=20):
+
+def get_collapsed_emails(query, limit, fields):
+    projection = email_list_projection(fields)
+    stages = [{"$match": query}, {"$sort": {"date": DESCENDING}}]
+    if projection:
+        if any(projection.values()):   # inclusion: the grouping needs these too
+            projection = dict(projection, cluster_id=1, date=1)
+        stages.append({"$project": projection})
+    stages += [
+        {"$group": {"_id": CLUSTER_KEY, "email": {"$first": "$$ROOT"},
+                    "duplicates": {"$sum": 1}, "cluster_ids": {"$push": "$gmail_id"}}},
+        {"$sort": {"email.date": DESCENDING}},
+        {"$limit": limit},
+    ]
+    emails = []
+    for group in emails_col.aggregate(stages):
+        email = dict(group['email'], duplicates=group['duplicates'],
+                     cluster_ids=group['cluster_ids'])
+        if '_id' in email:
+            email['_id'] = str(email['_id'])
+        emails.append(email)
+    return emails
+
+
+def collapse_clusters(emails, limit, fields):
+    """get_collapsed_emails() for the fallback lists; `emails` sorted newest first"""
+    clusters = {}
+    for e in emails:
+        key = e.get('cluster_id') or e.get('gmail_id')
+        if key in clusters:
+            clusters[key]['cluster_ids'].append(e['gmail_id'])
+            clusters[key]['duplicates'] += 1
+        elif len(clusters) < limit:
+            clusters[key] = dict(project_email(e, fields), duplicates=1, cluster_ids=[e['gmail_id']])
+    return list(clusters.values())
+
+
+def search_emails(google_id, query_text, limit=20, fields=None):
     if MONGO_AVAILABLE:
         import re
         pattern = re.compile(query_text, re.IGNORECASE)
@@ -200,9 +593,10 @@ def search_emails(google_id, query_text, limit=20):
                 {"subject": {"$regex": pattern}}, {"summary": {"$regex": pattern}},
                 {"class":   {"$regex": pattern}}, {"sender":  {"$regex": pattern}},
             ]
-        }).sort("date", DESCENDING).limit(limit))
+        }, email_list_projection(fields)).sort("date", DESCENDING).limit(limit))
         for r in results:
-            r['_id'] = str(r['_id'])
+            if '_id' in r:
+                r['_id'] = str(r['_id'])
         return results
     else:
         # Fallback: in-memory storage
@@ -218,7 +612,7 @@ def search_emails(google_id, query_text, limit=20):
                 pattern.search(email.get('sender', ''))):
                 results.append(email)
         results.sort(key=lambda x: x.get('date', ''), reverse=True)
-        return results[:limit]
+        return [project_email(e, fields) for e in results[:limit]]
 
 
 # ── CALENDAR EVENTS (NEW) ─────────────────────────────
@@ -233,8 +627,12 @@ def save_calendar_event(google_id, event_data):
                 {"$set": event_data},
                 upsert=True
             )
+            replaced = result.matched_count > 0
         else:
             result = calendar_col.insert_one(event_data)
+            replaced = False
+        dashboard_event_saved(google_id, event_data, replaced)
+        bump_version(google_id, 'calendar')
         return True
     else:
         # Fallback: in-memory storage with persistence
@@ -262,22 +660,133 @@ def save_calendar_event(google_id, event_data):
                     event_data['attended'] = event.get('attended', False)
                     calendar_col[i] = event_data
                     save_calendar()  # Persist changes
+                    dashboard_event_saved(google_id, event_data, replaced=True)
+                    bump_version(google_id, 'calendar')
                     return True
 
         calendar_col.append(event_data)
         save_calendar()  # Persist changes
+        dashboard_event_saved(google_id, event_data, replaced=False)
+        bump_version(google_id, 'calendar')
         return True
 
 
+def find_calendar_event(google_id, gmail_id):
+    """The event saved for this email (or cluster, see pipeline.apply_classifications), or None"""
+    if MONGO_AVAILABLE:
+        return calendar_col.find_one({"google_id": google_id, "gmail_id": gmail_id}, {"_id": 0})
+    else:
+        return next((e for e in calendar_col
+                     if e.get('google_id') == google_id and e.get('gmail_id') == gmail_id), None)
+
+
+def save_calendar_events_bulk(google_id, events):
+    """
+    Upsert many Google Calendar events in a single write, keyed by google_event_id.
+    Used by the calendar sync so one sync is one round trip / one file rewrite.
+    """
+    if not events:
+        return 0
+    now = datetime.utcnow().isoformat()
+    if MONGO_AVAILABLE:
+        ops = []
+        for event in events:
+            event = dict(event, google_id=google_id)
+            event.pop('attended', None)   # never clobber attendance on re-sync
+            ops.append(UpdateOne(
+                {"google_id": google_id, "google_event_id": event['google_event_id']},
+                {"$set": event, "$setOnInsert": {"attended": False, "created_at": now}},
+                upsert=True
+            ))
+        calendar_col.bulk_write(ops, ordered=False)
+        refresh_dashboard_upcoming(google_id)
+        bump_version(google_id, 'calendar')
+        return len(ops)
+    else:
+        # Fallback: index this user's events once instead of scanning per event
+        index = {e.get('google_event_id'): i for i, e in enumerate(calendar_col)
+                 if e.get('google_id') == google_id and e.get('google_event_id')}
+        for event in events:
+            event_data = dict(event, google_id=google_id, created_at=now)
+            i = index.get(event_data['google_event_id'])
+            if i is not None:
+                # PRESERVE ATTENDED STATUS IF IT EXISTS
+                event_data['attended'] = calendar_col[i].get('attended', False)
+                calendar_col[i] = event_data
+            else:
+                event_data.setdefault('attended', False)
+                index[event_data['google_event_id']] = len(calendar_col)
+                calendar_col.append(event_data)
+        save_calendar()  # Persist changes once for the whole batch
+        refresh_dashboard_upcoming(google_id)
+        bump_version(google_id, 'calendar')
+        return len(events)
+
+
+def delete_calendar_events(google_id, google_event_ids):
+    """Remove events that were cancelled/deleted in Google Calendar"""
+    if not google_event_ids:
+        return 0
+    if MONGO_AVAILABLE:
+        result = calendar_col.delete_many({
+            "google_id": google_id, "google_event_id": {"$in": list(google_event_ids)}
+        })
+        deleted = result.deleted_count
+    else:
+        ids  = set(google_event_ids)
+        kept = [e for e in calendar_col
+                if not (e.get('google_id') == google_id and e.get('google_event_id') in ids)]
+        deleted = len(calendar_col) - len(kept)
+        if deleted:
+            calendar_col[:] = kept   # mutate in place — storage holds the same list
+            save_calendar()
+    if deleted:
+        refresh_dashboard_upcoming(google_id)
+        bump_version(google_id, 'calendar')
+    return deleted
+
+
+def prune_calendar_events(google_id, listed_ids, since):
+    """
+    After a full calendar listing from `since` (a YYYY-MM-DD date): remove the
+    user's Google events dated in that window that it didn't include —
+    deleted in Google while no sync token covered them. Earlier events were
+    outside the listing, so they stay; so do manual events and events never
+    pushed to Google.
+    """
+    listed = list(listed_ids)
+    if MONGO_AVAILABLE:
+        result = calendar_col.delete_many({
+            "google_id": google_id, "manual": {"$ne": True}, "event_date": {"$gte": since},
+            "google_event_id": {"$nin": listed, "$exists": True, "$ne": None},
+        })
+        deleted = result.deleted_count
+    else:
+        listed = set(listed)
+        kept = [e for e in calendar_col
+                if not (e.get('google_id') == google_id and not e.get('manual')
+                        and (e.get('event_date') or '') >= since
+                        and e.get('google_event_id') and e['google_event_id'] not in listed)]
+        deleted = len(calendar_col) - len(kept)
+        if deleted:
+            calendar_col[:] = kept   # mutate in place — storage holds the same list
+            save_calendar()
+    if deleted:
+        refresh_dashboard_upcoming(google_id)
+        bump_version(google_id, 'calendar')
+    return deleted
+
+
 def update_event_attendance(google_id, event_id, attended):
     """Toggle attendance for a specific event"""
-    if calendar_table is not None:
+    if MONGO_AVAILABLE:
         try:
             from bson import ObjectId
-            calendar_table.update_one(
+            calendar_col.update_one(
                 {"google_id": google_id, "_id": ObjectId(event_id)},
                 {"$set": {"attended": attended}}
             )
+            bump_version(google_id, 'calendar')
             return True
         except Exception:
             return False
@@ -289,12 +798,14 @@ def update_event_attendance(google_id, event_id, attended):
                 if calendar_col[idx].get('google_id') == google_id:
                     calendar_col[idx]['attended'] = attended
                     save_calendar()
+                    bump_version(google_id, 'calendar')
                     return True
             # Search by google_event_id or gmail_id if not index
             for event in calendar_col:
                 if (event.get('google_event_id') == event_id or event.get('gmail_id') == event_id) and event.get('google_id') == google_id:
                     event['attended'] = attended
                     save_calendar()
+                    bump_version(google_id, 'calendar')
                     return True
             return False
         except Exception:
@@ -324,20 +835,21 @@ def get_calendar_events(google_id, month=None, year=None):
 
 # ── NOTIFICATIONS ─────────────────────────────────────
 def create_notification(google_id, gmail_id, message, importance):
+    notification = {
+        "google_id":  google_id, "gmail_id":   gmail_id,
+        "message":    message,   "importance": importance,
+        "seen": False, "created_at": datetime.utcnow().isoformat(),
+    }
     if MONGO_AVAILABLE:
-        notifications_col.insert_one({
-            "google_id":  google_id, "gmail_id":   gmail_id,
-            "message":    message,   "importance": importance,
-            "seen": False, "created_at": datetime.utcnow().isoformat(),
-        })
+        notifications_col.insert_one(notification)
+        notification['_id'] = str(notification['_id'])
     else:
         # Fallback: in-memory storage
-        notifications_col.append({
-            "google_id": google_id, "gmail_id": gmail_id,
-            "message": message, "importance": importance,
-            "seen": False, "created_at": datetime.utcnow().isoformat(),
-        })
+        notifications_col.append(notification)
         save_notifications()
+    dashboard_adjust_unseen(google_id, 1)
+    bump_version(google_id, 'notifications')
+    publish(google_id, 'notification', dict(notification))   # push to open SSE streams
 
 
 def get_unseen_notifications(google_id):
@@ -362,11 +874,414 @@ def mark_notifications_seen(google_id):
             {"$set": {"seen": True}}
         )
     else:
-        # Fallback: in-memory storage
+        # Fallback: in-memory storage, one file rewrite however many were unseen
+        changed = False
         for notif in notifications_col:
             if notif.get('google_id') == google_id and not notif.get('seen'):
                 notif['seen'] = True
-                save_notifications()
+                changed = True
+        if changed:
+            save_notifications()
+    dashboard_adjust_unseen(google_id, None)
+    bump_version(google_id, 'notifications')
+    publish(google_id, 'notifications_seen', {})
+
+
+# ── RE-CLASSIFICATION QUEUE ───────────────────────────
+# One entry per email that got the fallback classification (Gemini down,
+# deadline hit, unparseable answer). emails/reclassify.py retries due entries
+# in background batches; a successful retry goes through
+# update_email_classification, which removes the entry. After
+# RECLASSIFY_MAX_ATTEMPTS failed retries an entry is kept as 'exhausted'.
+FALLBACK_SUMMARY = 'Could not classify this email'   # gemini_service.get_fallback_classification
+
+
+def enqueue_reclassify(google_id, gmail_id, reason):
+    now = time.time()
+    if MONGO_AVAILABLE:
+        reclassify_col.update_one(
+            {"google_id": google_id, "gmail_id": gmail_id},
+            {"$set": {"reason": reason},
+             "$setOnInsert": {"status": "pending", "attempts": 0, "due_at": now,
+                              "queued_at": datetime.utcnow().isoformat()}},
+            upsert=True
+        )
+    else:
+        for entry in reclassify_col:
+            if entry.get('google_id') == google_id and entry.get('gmail_id') == gmail_id:
+                entry['reason'] = reason
+                break
+        else:
+            reclassify_col.append({
+                "google_id": google_id, "gmail_id": gmail_id, "reason": reason,
+                "status": "pending", "attempts": 0, "due_at": now,
+                "queued_at": datetime.utcnow().isoformat(),
+            })
+        save_reclassify_queue()
+
+
+def dequeue_reclassify(google_id, gmail_id):
+    if MONGO_AVAILABLE:
+        reclassify_col.delete_one({"google_id": google_id, "gmail_id": gmail_id})
+    else:
+        before = len(reclassify_col)
+        reclassify_col[:] = [e for e in reclassify_col
+                             if not (e.get('google_id') == google_id and e.get('gmail_id') == gmail_id)]
+        if len(reclassify_col) != before:
+            save_reclassify_queue()
+
+
+def claim_reclassify_batch(limit, lease):
+    """
+    Up to `limit` due pending entries, oldest due first. Each is leased for
+    `lease` seconds (due_at pushed forward) so other workers skip it.
+    """
+    now = time.time()
+    if MONGO_AVAILABLE:
+        due = reclassify_col.find({"status": "pending", "due_at": {"$lte": now}}) \
+                            .sort("due_at", ASCENDING).limit(limit)
+        claimed = []
+        for entry in due:
+            # compare-and-set: another worker may have leased it since the find
+            result = reclassify_col.update_one(
+                {"_id": entry["_id"], "due_at": entry["due_at"]},
+                {"$set": {"due_at": now + lease}}
+            )
+            if result.modified_count:
+                entry.pop("_id")
+                claimed.append(dict(entry, due_at=now + lease))
+        return claimed
+    else:
+        due = sorted((e for e in reclassify_col
+                      if e.get('status') == 'pending' and e.get('due_at', 0) <= now),
+                     key=lambda e: e['due_at'])[:limit]
+        for entry in due:
+            entry['due_at'] = now + lease
+        if due:
+            save_reclassify_queue()
+        return [dict(e) for e in due]
+
+
+def reclassify_attempt_failed(google_id, gmail_id, reason):
+    """Count a failed retry: back off exponentially, give up after RECLASSIFY_MAX_ATTEMPTS"""
+    def update(entry):
+        attempts = entry.get('attempts', 0) + 1
+        return {"attempts": attempts, "reason": reason,
+                "status": "exhausted" if attempts >= settings.RECLASSIFY_MAX_ATTEMPTS else "pending",
+                "due_at": time.time() + settings.RECLASSIFY_BACKOFF * 2 ** (attempts - 1),
+                "last_attempt_at": datetime.utcnow().isoformat()}
+
+    if MONGO_AVAILABLE:
+        entry = reclassify_col.find_one({"google_id": google_id, "gmail_id": gmail_id},
+                                        {"attempts": 1})
+        if entry:
+            reclassify_col.update_one({"_id": entry["_id"]}, {"$set": update(entry)})
+    else:
+        for entry in reclassify_col:
+            if entry.get('google_id') == google_id and entry.get('gmail_id') == gmail_id:
+                entry.update(update(entry))
+                save_reclassify_queue()
+                break
+
+
+def enqueue_unqueued_fallbacks():
+    """
+    Queue fallback-classified emails that aren't queued yet — ones stored
+    before the queue existed carry only the fallback summary. Duplicates are
+    left to their representative (track_fallback). Returns how many.
+    """
+    query = {"classified": True, "duplicate_of": {"$in": [None]},
+             "$or": [{"fallback": {"$nin": [None]}}, {"summary": FALLBACK_SUMMARY}]}
+    if MONGO_AVAILABLE:
+        queued = {(e['google_id'], e['gmail_id'])
+                  for e in reclassify_col.find({}, {"google_id": 1, "gmail_id": 1})}
+        candidates = emails_col.find(query, {"google_id": 1, "gmail_id": 1, "fallback": 1})
+    else:
+        queued = {(e.get('google_id'), e.get('gmail_id')) for e in reclassify_col}
+        candidates = [e for e in emails_col if e.get('classified') and not e.get('duplicate_of')
+                      and (e.get('fallback') or e.get('summary') == FALLBACK_SUMMARY)]
+    added = 0
+    for email in candidates:
+        key = (email.get('google_id'), email.get('gmail_id'))
+        if key not in queued:
+            enqueue_reclassify(key[0], key[1], email.get('fallback') or 'unknown')
+            queued.add(key)
+            added += 1
+    return added
+
+
+def reclassify_queue_stats():
+    """{'pending': n, 'exhausted': n, 'due': n, 'reasons': {reason: n}}"""
+    now = time.time()
+    if MONGO_AVAILABLE:
+        entries = reclassify_col.find({}, {"_id": 0, "status": 1, "reason": 1, "due_at": 1})
+    else:
+        entries = list(reclassify_col)
+    stats = {'pending': 0, 'exhausted': 0, 'due': 0, 'reasons': {}}
+    for entry in entries:
+        status = entry.get('status', 'pending')
+        stats[status] = stats.get(status, 0) + 1
+        if status == 'pending' and entry.get('due_at', 0) <= now:
+            stats['due'] += 1
+        reason = entry.get('reason') or 'unknown'
+        stats['reasons'][reason] = stats['reasons'].get(reason, 0) + 1
+    return stats
+
+
+# ── GEMINI USAGE LEDGER ───────────────────────────────
+# One document per user, UTC day and operation (interpret, classify) with
+# counters: calls, failed, refused (over the daily budget), input_tokens,
+# output_tokens, latency_ms. Written by emails/usage.py after every call.
+USAGE_COUNTERS = ('calls', 'failed', 'refused', 'input_tokens', 'output_tokens', 'latency_ms')
+
+
+def record_gemini_usage(google_id, day, operation, **counts):
+    if MONGO_AVAILABLE:
+        usage_col.update_one(
+            {"google_id": google_id, "day": day, "operation": operation},
+            {"$inc": counts},
+            upsert=True
+        )
+    else:
+        for entry in usage_col:
+            if entry.get('google_id') == google_id and entry.get('day') == day \
+                    and entry.get('operation') == operation:
+                break
+        else:
+            entry = {"google_id": google_id, "day": day, "operation": operation,
+                     **dict.fromkeys(USAGE_COUNTERS, 0)}
+            usage_col.append(entry)
+        for counter, n in counts.items():
+            entry[counter] = entry.get(counter, 0) + n
+        save_usage()
+
+
+def get_gemini_usage(google_id=None, since=None):
+    """Ledger rows, optionally for one user and from day `since` (YYYY-MM-DD) on"""
+    query = {}
+    if google_id is not None:
+        query["google_id"] = google_id
+    if since:
+        query["day"] = {"$gte": since}
+    if MONGO_AVAILABLE:
+        return list(usage_col.find(query, {"_id": 0}))
+    else:
+        return [dict(e) for e in usage_col
+                if (google_id is None or e.get('google_id') == google_id)
+                and (not since or e.get('day', '') >= since)]
+
+
+# ── DASHBOARD SNAPSHOT ────────────────────────────────
+# One document per user with what the dashboard's first paint needs: quadrant
+# counts, the newest few emails per quadrant, upcoming events and the unseen
+# notification count. The writers above keep it current incrementally, so
+# get_dashboard() is a single key lookup. A snapshot is only rebuilt from
+# scratch when it is missing or has gone short (a reclassified email left a
+# bucket, or an upcoming event is now in the past).
+DASHBOARD_BUCKETS  = ('Q1', 'Q2', 'Q3', 'Q4', 'informal')
+DASHBOARD_TOP_N    = 5     # emails kept per bucket
+DASHBOARD_UPCOMING = 10    # upcoming calendar events kept
+
+EMAIL_CARD_FIELDS = ('gmail_id', 'subject', 'sender', 'date', 'summary', 'class', 'quadrant',
+                     'colour', 'importance', 'urgency', 'action', 'event_date', 'is_informal')
+EVENT_CARD_FIELDS = ('gmail_id', 'google_event_id', 'title', 'event_date', 'event_time',
+                     'event_venue', 'colour', 'quadrant', 'class', 'manual')
+
+
+def card_projection(fields):
+    return dict(dict.fromkeys(fields, 1), _id=0)
+
+
+def email_bucket(email):
+    if email.get('is_informal'):
+        return 'informal'
+    quadrant = email.get('quadrant')
+    return quadrant if quadrant in DASHBOARD_BUCKETS else 'Q4'
+
+
+def email_card(email):
+    return {f: email.get(f) for f in EMAIL_CARD_FIELDS}
+
+
+def event_card(event):
+    return {f: event.get(f) for f in EVENT_CARD_FIELDS}
+
+
+def event_sort_key(event):
+    return (event.get('event_date') or '', event.get('event_time') or '')
+
+
+def upcoming_events(google_id):
+    today = date.today().isoformat()
+    if MONGO_AVAILABLE:
+        return list(calendar_col.find(
+            {"google_id": google_id, "event_date": {"$gte": today}},
+            card_projection(EVENT_CARD_FIELDS)
+        ).sort([("event_date", ASCENDING), ("event_time", ASCENDING)]).limit(DASHBOARD_UPCOMING))
+    else:
+        events = [event_card(e) for e in calendar_col
+                  if e.get('google_id') == google_id and (e.get('event_date') or '') >= today]
+        return heapq.nsmallest(DASHBOARD_UPCOMING, events, key=event_sort_key)
+
+
+def find_dashboard(google_id):
+    """Fallback only: the stored snapshot dict, or None"""
+    for snapshot in dashboards_col:
+        if snapshot.get('google_id') == google_id:
+            return snapshot
+    return None
+
+
+def rebuild_dashboard(google_id):
+    """Recompute the whole snapshot from the emails/calendar/notifications collections"""
+    if MONGO_AVAILABLE:
+        emails = emails_col.find({"google_id": google_id, "classified": True},
+                                 card_projection(EMAIL_CARD_FIELDS))
+        unseen = notifications_col.count_documents({"google_id": google_id, "seen": False})
+    else:
+        emails = (e for e in emails_col if e.get('google_id') == google_id and e.get('classified'))
+        unseen = sum(1 for n in notifications_col
+                     if n.get('google_id') == google_id and not n.get('seen'))
+
+    counts  = dict.fromkeys(DASHBOARD_BUCKETS, 0)
+    buckets = {b: [] for b in DASHBOARD_BUCKETS}
+    for email in emails:
+        bucket = email_bucket(email)
+        counts[bucket] += 1
+        buckets[bucket].append(email_card(email))
+
+    snapshot = {
+        "google_id":            google_id,
+        "counts":               counts,
+        "top":                  {b: heapq.nlargest(DASHBOARD_TOP_N, cards, key=lambda c: c.get('date') or '')
+                                 for b, cards in buckets.items()},
+        "upcoming":             upcoming_events(google_id),
+        "unseen_notifications": unseen,
+        "updated_at":           datetime.utcnow().isoformat(),
+    }
+    if MONGO_AVAILABLE:
+        dashboards_col.replace_one({"google_id": google_id}, snapshot, upsert=True)
+        snapshot.pop('_id', None)
+    else:
+        existing = find_dashboard(google_id)
+        if existing is not None:
+            existing.clear()
+            existing.update(snapshot)
+            snapshot = existing
+        else:
+            dashboards_col.append(snapshot)
+        save_dashboards()
+    return snapshot
+
+
+def dashboard_is_stale(snapshot):
+    for bucket in DASHBOARD_BUCKETS:
+        shown = len(snapshot['top'].get(bucket, []))
+        if shown < min(snapshot['counts'].get(bucket, 0), DASHBOARD_TOP_N):
+            return True
+    upcoming = snapshot['upcoming']
+    return bool(upcoming) and (upcoming[0].get('event_date') or '') < date.today().isoformat()
+
+
+def get_dashboard(google_id):
+    if MONGO_AVAILABLE:
+        snapshot = dashboards_col.find_one({"google_id": google_id}, {"_id": 0})
+    else:
+        snapshot = find_dashboard(google_id)
+    if snapshot is None or dashboard_is_stale(snapshot):
+        return rebuild_dashboard(google_id)
+    return snapshot
+
+
+# Incremental updates. A user without a snapshot is left alone — the first
+# get_dashboard() builds it from scratch, so partial snapshots never exist.
+def dashboard_email_classified(google_id, before, after):
+    old  = email_bucket(before) if before.get('classified') else None
+    new  = email_bucket(after)
+    card = email_card(after)
+    if MONGO_AVAILABLE:
+        if old:
+            dashboards_col.update_one(
+                {"google_id": google_id},
+                {"$pull": {f"top.{old}": {"gmail_id": card['gmail_id']}},
+                 "$inc":  {f"counts.{old}": -1}}
+            )
+        # $push with $sort/$slice keeps the top-N atomic under concurrent classifies
+        dashboards_col.update_one(
+            {"google_id": google_id},
+            {"$push": {f"top.{new}": {"$each": [card], "$sort": {"date": -1},
+                                      "$slice": DASHBOARD_TOP_N}},
+             "$inc":  {f"counts.{new}": 1},
+             "$set":  {"updated_at": datetime.utcnow().isoformat()}}
+        )
+    else:
+        snapshot = find_dashboard(google_id)
+        if snapshot is None:
+            return
+        if old:
+            snapshot['counts'][old] -= 1
+            snapshot['top'][old] = [c for c in snapshot['top'][old]
+                                    if c['gmail_id'] != card['gmail_id']]
+        snapshot['counts'][new] += 1
+        snapshot['top'][new] = heapq.nlargest(DASHBOARD_TOP_N, snapshot['top'][new] + [card],
+                                              key=lambda c: c.get('date') or '')
+        snapshot['updated_at'] = datetime.utcnow().isoformat()
+        save_dashboards()
+
+
+def dashboard_event_saved(google_id, event, replaced):
+    if replaced:
+        # The old copy may have been in the list; re-query rather than guess
+        refresh_dashboard_upcoming(google_id)
+        return
+    if (event.get('event_date') or '') < date.today().isoformat():
+        return
+    card = event_card(event)
+    if MONGO_AVAILABLE:
+        dashboards_col.update_one(
+            {"google_id": google_id},
+            {"$push": {"upcoming": {"$each": [card], "$sort": {"event_date": 1, "event_time": 1},
+                                    "$slice": DASHBOARD_UPCOMING}},
+             "$set":  {"updated_at": datetime.utcnow().isoformat()}}
+        )
+    else:
+        snapshot = find_dashboard(google_id)
+        if snapshot is None:
+            return
+        snapshot['upcoming'] = heapq.nsmallest(DASHBOARD_UPCOMING, snapshot['upcoming'] + [card],
+                                               key=event_sort_key)
+        snapshot['updated_at'] = datetime.utcnow().isoformat()
+        save_dashboards()
+
+
+def refresh_dashboard_upcoming(google_id):
+    if MONGO_AVAILABLE:
+        dashboards_col.update_one(
+            {"google_id": google_id},
+            {"$set": {"upcoming": upcoming_events(google_id),
+                      "updated_at": datetime.utcnow().isoformat()}}
+        )
+    else:
+        snapshot = find_dashboard(google_id)
+        if snapshot is None:
+            return
+        snapshot['upcoming']   = upcoming_events(google_id)
+        snapshot['updated_at'] = datetime.utcnow().isoformat()
+        save_dashboards()
+
+
+def dashboard_adjust_unseen(google_id, delta):
+    """delta=None resets the count (all notifications marked seen)"""
+    if MONGO_AVAILABLE:
+        update = ({"$set": {"unseen_notifications": 0}} if delta is None
+                  else {"$inc": {"unseen_notifications": delta}})
+        dashboards_col.update_one({"google_id": google_id}, update)
+    else:
+        snapshot = find_dashboard(google_id)
+        if snapshot is None:
+            return
+        snapshot['unseen_notifications'] = 0 if delta is None else snapshot['unseen_notifications'] + delta
+        save_dashboards()
 
 
 # ── SEED SAMPLE DATA (for testing without real Gmail) ─
@@ -410,6 +1325,8 @@ def seed_sample_data(google_id):
             calendar_col.append(event)
     if not MONGO_AVAILABLE:
         save_calendar()
+    refresh_dashboard_upcoming(google_id)
+    bump_version(google_id, 'calendar')
     return len(sample_events)
 
 
@@ -420,9 +1337,25 @@ def create_indexes():
         emails_col.create_index(
             [("google_id", ASCENDING), ("gmail_id", ASCENDING)], unique=True)
         emails_col.create_index([("google_id", ASCENDING), ("quadrant", ASCENDING)])
+        emails_col.create_index([("google_id", ASCENDING), ("minhash_bands", ASCENDING)],
+                                partialFilterExpression={"minhash_bands": {"$exists": True}})
+        emails_col.create_index([("google_id", ASCENDING), ("thread_id", ASCENDING)],
+                                partialFilterExpression={"thread_id": {"$exists": True}})
+        emails_col.create_index([("google_id", ASCENDING), ("cluster_id", ASCENDING)],
+                                partialFilterExpression={"cluster_id": {"$exists": True}})
         preferences_col.create_index("google_id", unique=True)
         notifications_col.create_index([("google_id", ASCENDING), ("seen", ASCENDING)])
         calendar_col.create_index([("google_id", ASCENDING), ("event_date", ASCENDING)])
+        calendar_col.create_index([("google_id", ASCENDING), ("google_event_id", ASCENDING)])
+        calendar_col.create_index([("google_id", ASCENDING), ("gmail_id", ASCENDING)])
+        dashboards_col.create_index("google_id", unique=True)
+        versions_col.create_index("google_id", unique=True)
+        reclassify_col.create_index(
+            [("google_id", ASCENDING), ("gmail_id", ASCENDING)], unique=True)
+        reclassify_col.create_index([("status", ASCENDING), ("due_at", ASCENDING)])
+        usage_col.create_index(
+            [("google_id", ASCENDING), ("day", ASCENDING), ("operation", ASCENDING)], unique=True)
+        usage_col.create_index("day")
         print("Indexes created.")
     else:
         print("Using in-memory storage - no indexes needed")
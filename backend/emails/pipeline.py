@@ -0,0 +1,171 @@
+# emails/pipeline.py
+# Fetch → classify → calendar/notifications for one user, fully async.
+# Used by views.fetch_and_classify; Gmail, Gemini and Calendar calls are
+# awaited and models.py calls run via run_async, so a single process can
+# keep many users' fetches in flight without a thread each.
+import asyncio
+
+from .calendar_service import create_calendar_event_async, update_calendar_event_async
+from .dedup import adds_to_thread, reused_classification, thread_digest
+from .events import publish
+from .gemini_service import classify_all_emails_async
+from .google_async import AsyncGoogleSession
+from .ingestion import ingest_async, AsyncGmailSource, ModelsSink
+from . import usage
+from .models import (
+    run_async, update_email_classification, save_calendar_event, create_notification,
+    get_cluster_emails, find_calendar_event,
+)
+
+
+class GmailFetchError(Exception):
+    pass
+
+
+async def run_fetch(google_id, user, prefs, max_results=30, gmail_budget=None, gemini_budget=None):
+    """
+    Returns the summary dict the fetch endpoint responds with.
+    The budgets are optional quota.TokenBucket objects (the poller passes the
+    process-wide ones). Gemini calls count against the user's daily budget
+    (emails/usage.py).
+    """
+    with usage.attribute(google_id):
+        return await fetch_for_user(google_id, user, prefs, max_results, gmail_budget, gemini_budget)
+
+
+async def fetch_for_user(google_id, user, prefs, max_results, gmail_budget, gemini_budget):
+    # 1. Fetch new emails from Gmail and bulk-store them
+    publish(google_id, 'fetch_progress', {'stage': 'fetching'})
+    try:
+        ingested = await ingest_async(AsyncGmailSource(user['token'], budget=gmail_budget,
+                                                       google_id=google_id),
+                                      ModelsSink(google_id), max_results=max_results)
+    except Exception as ge:
+        publish(google_id, 'fetch_progress', {'stage': 'failed', 'error': str(ge)})
+        raise GmailFetchError(f'Gmail fetch failed: {ge}') from ge
+    emails = ingested['emails']
+    publish(google_id, 'fetch_progress', {'stage': 'fetched', 'fetched': len(emails)})
+
+    # 2. Classify with Gemini (graceful fallback per email), once per thread / near-duplicate cluster
+    priority_profile = prefs.get('priority_profile', {})
+    try:
+        classifications = await classify_clusters(
+            google_id, emails, priority_profile, budget=gemini_budget,
+            on_progress=lambda done, total: publish(
+                google_id, 'fetch_progress', {'stage': 'classifying', 'done': done, 'total': total}))
+    except Exception as ce:
+        print(f'Gemini classify error: {ce}')
+        classifications = []
+
+    # 3. Store results, create calendar events + notifications
+    calendar_count, notify_count = await apply_classifications(
+        google_id, user, emails, classifications)
+
+    summary = {
+        'success': True, 'fetched': len(emails), 'skipped': ingested['skipped'],
+        'classified': len(classifications),
+        'deferred': sum(1 for _, c in classifications if c.get('fallback')),
+        'duplicates': sum(1 for _, c in classifications if c.get('duplicate_of')),
+        'calendar_added': calendar_count, 'notifications': notify_count,
+    }
+    publish(google_id, 'fetch_progress', dict(summary, stage='done'))
+    return summary
+
+
+async def classify_clusters(google_id, emails, priority_profile, **kwargs):
+    """
+    classify_all_emails_async, once per cluster — a Gmail thread and its
+    near-duplicates (emails/dedup.py). Of a cluster's new emails only the
+    newest is classified, as dedup.thread_digest() of its thread; the others
+    reuse its classification. A cluster classified in an earlier fetch reuses
+    its newest stored classification instead, unless a new reply in its
+    thread has something to add. Fallback classifications are never reused.
+    """
+    pending = [e for e in emails if not e.get('classified')]   # Gmail order: newest first
+    groups  = {}
+    for email in pending:
+        groups.setdefault(email.get('cluster_id') or email['gmail_id'], []).append(email)
+    outside = set(groups) - {e['gmail_id'] for e in pending}
+    firsts, stored = {}, {}   # cluster → its stored first email / newest real classification
+    for e in await run_async(get_cluster_emails, google_id, outside) if outside else ():
+        cluster = e.get('cluster_id') or e['gmail_id']
+        if e['gmail_id'] == cluster:
+            firsts[cluster] = e
+        if e.get('classified') and not e.get('fallback') and \
+                e.get('classified_at', '') >= stored.get(cluster, {}).get('classified_at', ''):
+            stored[cluster] = e
+
+    sources, digests = {}, []   # cluster → gmail_id whose classification its new emails get
+    for cluster, group in groups.items():
+        first  = firsts.get(cluster)
+        latest = stored.get(cluster)
+        if latest and not any(adds_to_thread(e, first or latest) for e in group):
+            sources[cluster] = latest['gmail_id']
+        else:
+            sources[cluster] = group[0]['gmail_id']
+            digests.append(thread_digest(group, first))
+    classifications = await classify_all_emails_async(digests, priority_profile, **kwargs)
+
+    results = dict(classifications)
+    results.update((e['gmail_id'], e) for e in stored.values())
+    for cluster, group in groups.items():
+        source = sources[cluster]
+        for email in group:
+            if email['gmail_id'] != source:
+                classifications.append((email['gmail_id'], reused_classification(
+                    source, results[source])))
+    return classifications
+
+
+async def apply_classifications(google_id, user, emails, classifications):
+    by_id   = {e['gmail_id']: e for e in emails}
+    session = AsyncGoogleSession(user['token'], google_id)
+
+    async def apply_one(gmail_id, classification):
+        added = notified = 0
+        await run_async(update_email_classification, google_id, gmail_id, classification)
+        email_data = by_id.get(gmail_id)
+        if not email_data or classification.get('duplicate_of'):
+            # a reused classification's event and notification came with its source
+            return added, notified
+
+        # FIX: Upload EVERYTHING to calendar if it has a date, regardless of priority action
+        if classification['action'] == 'add_to_calendar' or classification.get('event_date'):
+            # One event per cluster, saved under its first email: a later reply
+            # in the thread updates the event instead of adding another
+            key      = email_data.get('cluster_id') or gmail_id
+            existing = await run_async(find_calendar_event, google_id, key) if key != gmail_id else None
+            event    = dict(subject=email_data['subject'], summary=classification['summary'],
+                            event_date=classification['event_date'], colour=classification['colour'])
+            result   = {}
+            if existing and existing.get('google_event_id'):
+                result = await update_calendar_event_async(session, existing['google_event_id'], **event)
+            if not result.get('success'):
+                # Try creating Google Calendar event — non-blocking
+                result = await create_calendar_event_async(session, **event)
+            await run_async(save_calendar_event, google_id, {
+                'gmail_id':          key,
+                'title':             email_data['subject'],
+                'summary':           classification['summary'],
+                'event_date':        classification['event_date'],
+                'event_time':        classification.get('event_time'),
+                'event_venue':       classification.get('event_venue'),
+                'registration_link': classification.get('registration_link'),
+                'organizer':         classification.get('organizer'),
+                'colour':            classification['colour'],
+                'quadrant':          classification['quadrant'],
+                'class':             classification['class'],
+                'google_event_id':   result.get('event_id'),
+            })
+            added = 1
+
+        if classification['action'] == 'notify':
+            await run_async(create_notification,
+                            google_id=google_id, gmail_id=gmail_id,
+                            message=classification['summary'],
+                            importance=classification['importance'])
+            notified = 1
+        return added, notified
+
+    results = await asyncio.gather(*(apply_one(g, c) for g, c in classifications))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
@@ -0,0 +1,57 @@
+# emails/quota.py
+# Process-wide API budgets. Every caller of a budget shares one bucket, and
+# waiters are served in arrival order, so no single user can starve the rest.
+import asyncio
+import time
+
+from django.conf import settings
+
+# Gmail quota cost per call (https://developers.google.com/gmail/api/reference/quota)
+GMAIL_UNITS = {'list': 5, 'get': 5, 'thread': 10}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate     = rate                    # tokens per second
+        self.capacity = capacity or rate
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self._lock    = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, n=1):
+        n = min(n, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:   # FIFO — the head waiter blocks everyone behind it
+            while True:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+    def try_acquire(self, n=1):
+        """Take tokens only if they're available right now"""
+        self._refill()
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+    def refund(self, n=1):
+        """Give back tokens taken but not used"""
+        self.tokens = min(self.capacity, self.tokens + n)
+
+    def available(self):
+        self._refill()
+        return self.tokens
+
+
+GMAIL_BUDGET  = TokenBucket(settings.GMAIL_QUOTA_UNITS_PER_SEC)
+GEMINI_BUDGET = TokenBucket(settings.GEMINI_REQUESTS_PER_MIN / 60,
+                            capacity=max(1, settings.GEMINI_REQUESTS_PER_MIN // 4))
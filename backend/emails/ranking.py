@@ -0,0 +1,114 @@
+# emails/ranking.py
+# Re-rank stored emails after a preference change — no Gemini calls.
+#
+# Gemini's class and urgency don't depend on the user's profile; importance,
+# quadrant, colour and action do. rescore_emails() recomputes the latter for
+# every classified email of a user with the same rules the classify prompt
+# gives Gemini (gemini_service.CLASSIFY_PREFIX):
+#
+#   importance  profile level of the email's class (high/medium/low; ignore → low),
+#               one level up for TRUSTED_SENDERS. Classes the profile doesn't
+#               cover (ACADEMIC, INFORMAL_*, SPAM, OTHER) keep Gemini's importance.
+#   quadrant    Q1 high importance + high urgency   Q2 high importance only
+#               Q3 high urgency only                Q4 neither
+#   colour      red / yellow / blue / grey by quadrant
+#   action      notify in Q1, else add_to_calendar when it has an event date,
+#               else ignore ("ignore" classes always end up ignored)
+#
+# The batch runs as NumPy array ops over integer codes, and the write groups
+# emails by their new values, so a 10k mailbox is a few dozen UpdateMany ops.
+import sys
+import os
+
+import numpy as np
+from django.conf import settings
+
+sys.path.insert(0, os.path.join(settings.BASE_DIR))
+from college_data import TRUSTED_SENDERS
+
+LEVELS     = np.array(['ignore', 'low', 'medium', 'high'])
+LEVEL_CODE = {level: i for i, level in enumerate(LEVELS)}
+IMPORTANCE = np.array(['low', 'low', 'medium', 'high'])   # level → stored importance
+QUADRANTS  = np.array(['Q1', 'Q2', 'Q3', 'Q4'])
+COLOURS    = np.array(['red', 'yellow', 'blue', 'grey'])
+ACTIONS    = np.array(['notify', 'add_to_calendar', 'ignore'])
+
+RANK_FIELDS   = ('gmail_id', 'class', 'urgency', 'sender', 'event_date',
+                 'importance', 'quadrant', 'colour', 'action')
+OUTPUT_FIELDS = ('importance', 'quadrant', 'colour', 'action')
+
+
+def is_trusted(sender):
+    return any(trusted in (sender or '') for trusted in TRUSTED_SENDERS)
+
+
+def rank(emails, priority_profile):
+    """
+    New {importance, quadrant, colour, action} for each email in `emails`
+    (dicts with RANK_FIELDS), as a dict of NumPy string arrays
+    """
+    n = len(emails)
+    # class → profile level, -1 for classes the profile doesn't mention
+    classes  = sorted({e.get('class') or 'OTHER' for e in emails})
+    class_ix = {c: i for i, c in enumerate(classes)}
+    profile_level = np.array([LEVEL_CODE.get(priority_profile.get(c), -1) for c in classes],
+                             dtype=np.int8)
+
+    trusted_by_sender = {}
+    cls     = np.empty(n, dtype=np.int32)
+    stored  = np.empty(n, dtype=np.int8)
+    urgent  = np.empty(n, dtype=bool)
+    trusted = np.empty(n, dtype=bool)
+    dated   = np.empty(n, dtype=bool)
+    for i, e in enumerate(emails):
+        sender = e.get('sender') or ''
+        if sender not in trusted_by_sender:
+            trusted_by_sender[sender] = is_trusted(sender)
+        cls[i]     = class_ix[e.get('class') or 'OTHER']
+        stored[i]  = LEVEL_CODE.get(e.get('importance'), 1)
+        urgent[i]  = e.get('urgency') == 'high'
+        trusted[i] = trusted_by_sender[sender]
+        dated[i]   = bool(e.get('event_date'))
+
+    level   = profile_level[cls]
+    covered = level >= 0
+    ignored = covered & (level == 0)
+    level   = np.where(covered & ~ignored, np.minimum(level + trusted, 3), level)
+    level   = np.where(covered, level, stored)
+
+    important = (level == 3) & ~ignored
+    quadrant  = np.where(important, np.where(urgent, 0, 1), np.where(urgent & ~ignored, 2, 3))
+    action    = np.where(quadrant == 0, 0, np.where(dated & ~ignored, 1, 2))
+
+    return {
+        'importance': IMPORTANCE[level],
+        'quadrant':   QUADRANTS[quadrant],
+        'colour':     COLOURS[quadrant],
+        'action':     ACTIONS[action],
+    }
+
+
+def changed_groups(emails, ranked):
+    """[(new_fields, [gmail_id, ...]), ...] for emails whose ranking changed"""
+    old = {f: np.array([e.get(f) or '' for e in emails]) for f in OUTPUT_FIELDS}
+    changed = np.zeros(len(emails), dtype=bool)
+    for f in OUTPUT_FIELDS:
+        changed |= old[f] != ranked[f]
+
+    groups = {}
+    for i in np.flatnonzero(changed):
+        key = tuple(str(ranked[f][i]) for f in OUTPUT_FIELDS)
+        groups.setdefault(key, []).append(emails[i]['gmail_id'])
+    return [(dict(zip(OUTPUT_FIELDS, key)), ids) for key, ids in groups.items()]
+
+
+def rescore_emails(google_id, priority_profile):
+    """Re-rank every classified email of the user in place. Returns how many changed."""
+    from .models import get_classified_emails, set_email_fields_bulk
+    emails = get_classified_emails(google_id, RANK_FIELDS)
+    if not emails:
+        return 0
+    groups = changed_groups(emails, rank(emails, priority_profile or {}))
+    if groups:
+        set_email_fields_bulk(google_id, groups)
+    return sum(len(ids) for _, ids in groups)
@@ -0,0 +1,103 @@
+# emails/reclassify.py
+# Background retries for fallback-classified emails (models' re-classification
+# queue). Low priority by construction:
+#   - nothing runs while the Gemini circuit breaker is open
+#   - a batch only takes Gemini quota that is free right now, and leaves
+#     RECLASSIFY_RESERVE of the bucket for interactive fetches
+#   - results go through pipeline.apply_classifications, the same path a
+#     fetch uses (stored classification, calendar events, notifications)
+# Run by `manage.py reclassify_emails` and between polls by poll_mailboxes.
+import asyncio
+
+from django.conf import settings
+
+from .gemini_client import breaker
+from .gemini_service import classify_all_emails_async
+from .dedup import reused_classification
+from .models import (
+    run_async, get_user, get_preferences, get_emails_by_ids, get_fallback_duplicates,
+    claim_reclassify_batch, dequeue_reclassify, reclassify_attempt_failed,
+)
+from .pipeline import apply_classifications
+from . import usage
+
+LEASE = 600   # seconds a claimed entry is hidden from other workers
+
+
+def take_spare_quota(budget, limit):
+    """How many of `limit` requests the bucket can spare without eating into the reserve"""
+    if budget is None:
+        return limit
+    reserve = budget.capacity * settings.RECLASSIFY_RESERVE
+    taken = 0
+    while taken < limit and budget.available() - 1 >= reserve and budget.try_acquire():
+        taken += 1
+    return taken
+
+
+async def run_batch(limit=None, budget=None):
+    """
+    Retry up to `limit` due queue entries. Returns
+    {'claimed', 'reclassified', 'failed', 'dropped'} or {'skipped': reason}.
+    """
+    if breaker.is_open():
+        return {'skipped': 'circuit_open'}
+    limit = limit or settings.RECLASSIFY_BATCH
+    quota = take_spare_quota(budget, limit)
+    if not quota:
+        return {'skipped': 'no_spare_quota'}
+    entries = await run_async(claim_reclassify_batch, quota, LEASE)
+    if budget is not None and quota > len(entries):
+        budget.refund(quota - len(entries))
+
+    by_user = {}
+    for entry in entries:
+        by_user.setdefault(entry['google_id'], []).append(entry['gmail_id'])
+    results = await asyncio.gather(*(retry_user(gid, ids) for gid, ids in by_user.items()))
+
+    summary = {'claimed': len(entries), 'reclassified': 0, 'failed': 0, 'dropped': 0}
+    for result in results:
+        for key, n in result.items():
+            summary[key] += n
+    return summary
+
+
+async def retry_user(google_id, gmail_ids):
+    with usage.attribute(google_id):
+        return await retry_user_emails(google_id, gmail_ids)
+
+
+async def retry_user_emails(google_id, gmail_ids):
+    user, prefs, emails = await asyncio.gather(
+        run_async(get_user, google_id), run_async(get_preferences, google_id),
+        run_async(get_emails_by_ids, google_id, gmail_ids))
+
+    # deleted emails or users leave nothing to classify
+    stored = {e['gmail_id'] for e in emails}
+    gone   = [g for g in gmail_ids if g not in stored or not user]
+    for gmail_id in gone:
+        await run_async(dequeue_reclassify, google_id, gmail_id)
+    if not user or not emails:
+        return {'dropped': len(gone)}
+
+    # classify_all_emails_async skips classified emails
+    pending = [dict(e, classified=False) for e in emails]
+    profile = (prefs or {}).get('priority_profile', {})
+    classifications = await classify_all_emails_async(pending, profile)
+
+    succeeded = [(g, c) for g, c in classifications if not c.get('fallback')]
+    failed    = [(g, c) for g, c in classifications if c.get('fallback')]
+    for gmail_id, classification in failed:
+        # refused by an open breaker, the user's daily budget or a missing
+        # local model: not the email's fault, the lease delays the retry
+        if classification['fallback'] not in ('circuit_open', 'over_budget', 'backend_unavailable'):
+            await run_async(reclassify_attempt_failed, google_id, gmail_id,
+                            classification['fallback'])
+    if succeeded:
+        # duplicates that reused a fallback (emails/dedup.py) take the new
+        # result instead of a retry of their own
+        duplicates = await run_async(get_fallback_duplicates, google_id, [g for g, _ in succeeded])
+        reused = [(d, reused_classification(g, c)) for g, c in succeeded for d in duplicates.get(g, ())]
+        # removes the queue entries (models.track_fallback)
+        await apply_classifications(google_id, user, pending, succeeded + reused)
+    return {'reclassified': len(succeeded), 'failed': len(failed), 'dropped': len(gone)}
@@ -29,6 +29,9 @@ emails_data = load_data('emails.json')
 preferences_data = load_data('preferences.json')
 notifications_data = load_data('notifications.json')
 calendar_data = load_data('calendar.json')
+dashboards_data = load_data('dashboards.json')
+reclassify_data = load_data('reclassify.json')
+usage_data = load_data('gemini_usage.json')
 
 def get_users():
     return users_data
@@ -45,6 +48,15 @@ def get_notifications():
 def get_calendar():
     return calendar_data
 
+def get_dashboards():
+    return dashboards_data
+
+def get_reclassify_queue():
+    return reclassify_data
+
+def get_usage():
+    return usage_data
+
 def save_users():
     save_data('users.json', users_data)
 
@@ -58,4 +70,13 @@ def save_notifications():
     save_data('notifications.json', notifications_data)
 
 def save_calendar():
-    save_data('calendar.json', calendar_data)
\ No newline at end of file
+    save_data('calendar.json', calendar_data)
+
+def save_dashboards():
+    save_data('dashboards.json', dashboards_data)
+
+def save_reclassify_queue():
+    save_data('reclassify.json', reclassify_data)
+
+def save_usage():
+    save_data('gemini_usage.json', usage_data)
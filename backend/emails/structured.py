@@ -0,0 +1,346 @@
+# emails/structured.py
+# Structured output for the Gemini calls in gemini_service.py.
+#
+#   JsonExtractor  pulls the first JSON object out of a response — inside code
+#                  fences, after prose, or cut off mid-way (max tokens): a
+#                  truncated object is closed at its last complete value
+#   Schema         field specs compiled once into validators; validate() keeps
+#                  every good field and repairs or defaults only the bad ones
+#                  instead of throwing the whole response away
+#   parse_stats    per-operation counters, including the wasted-call rate
+#                  (responses nothing could be recovered from)
+import dataclasses
+import datetime
+import json
+import re
+import threading
+
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+# ── EXTRACTION ────────────────────────────────────────
+class JsonExtractor:
+    """
+    Incremental scanner: feed() text as it arrives (whole responses or stream
+    chunks) and call value() at any point. `complete` turns True once the first
+    top-level object/array has closed; anything after it is ignored.
+    """
+
+    def __init__(self):
+        self.text      = ''
+        self.start     = None     # index of the opening brace
+        self.end       = None     # index after the closing brace
+        self.stack     = []       # open containers: [closer, expecting_key]
+        self.in_string = False
+        self.is_key    = False
+        self.escape    = False
+        self.safe      = None     # (index, closers) of the last complete value
+        self._pos      = 0
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    def feed(self, chunk):
+        if self.complete:
+            return self
+        self.text += chunk
+        text, stack = self.text, self.stack
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self.start is None:
+                if c in _CLOSERS:
+                    self.start = i
+                    stack.append([_CLOSERS[c], c == '{'])
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if not self.is_key:
+                        self._mark_safe(i + 1)
+                continue
+            if c == '"':
+                self.in_string = True
+                self.is_key    = stack[-1][0] == '}' and stack[-1][1]
+            elif c in _CLOSERS:
+                stack.append([_CLOSERS[c], c == '{'])
+            elif c in '}]':
+                stack.pop()
+                self._mark_safe(i + 1)
+                if not stack:
+                    self.end  = i + 1
+                    self._pos = i + 1
+                    return self
+            elif c == ':':
+                stack[-1][1] = False
+            elif c == ',':
+                self._mark_safe(i)
+                if stack[-1][0] == '}':
+                    stack[-1][1] = True
+        self._pos = len(text)
+        return self
+
+    def _mark_safe(self, index):
+        self.safe = (index, ''.join(closer for closer, _ in reversed(self.stack)))
+
+    def candidate(self):
+        """The JSON text to parse: the complete object, or the truncated one closed off"""
+        if self.start is None:
+            return None
+        if self.complete:
+            return self.text[self.start:self.end]
+        closers = ''.join(closer for closer, _ in reversed(self.stack))
+        if self.in_string and not self.is_key and not self.escape:
+            return self.text[self.start:] + '"' + closers   # keep a cut-off string value
+        if self.safe is None:
+            return self.text[self.start] + closers
+        index, safe_closers = self.safe
+        return self.text[self.start:index].rstrip().rstrip(',') + safe_closers
+
+    def value(self):
+        """The parsed object/array, or None if nothing usable was found"""
+        candidate = self.candidate()
+        if candidate is None:
+            return None
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+        try:   # trailing commas are the commonest near-miss
+            return json.loads(re.sub(r',\s*([}\]])', r'\1', candidate))
+        except ValueError:
+            return None
+
+
+def extract_json(text):
+    """First JSON object in `text` (fenced, wrapped or truncated), or None"""
+    value = JsonExtractor().feed(text or '').value()
+    if isinstance(value, list):   # [{...}] instead of {...}
+        value = next((v for v in value if isinstance(v, dict)), None)
+    return value if isinstance(value, dict) else None
+
+
+# ── SCHEMA ────────────────────────────────────────────
+_NULLS   = {'', 'null', 'none', 'n/a', 'na', 'nil', 'unknown', 'not found', 'not specified'}
+_DATE    = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+_DMY     = re.compile(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})')
+_TIME    = re.compile(r'(\d{1,2})(?:[:.](\d{2}))?(?::\d{2})?\s*([ap])?\.?\s*m?\.?', re.I)
+_URL     = re.compile(r'https?://\S+')
+_MISSING = object()
+
+
+def _norm(value):
+    return re.sub(r'[\s\-]+', '_', str(value).strip()).lower()
+
+
+@dataclasses.dataclass(frozen=True)
+class Field:
+    name:     str
+    kind:     str                  # enum | string | bool | date | time | url
+    default:  object = None
+    choices:  tuple  = ()
+    nullable: bool   = False
+
+
+class Schema:
+    """A flat JSON object schema, compiled once into per-field validators"""
+
+    def __init__(self, name, fields):
+        self.name       = name
+        self.fields     = tuple(fields)
+        self.validators = {f.name: self._compile(f) for f in self.fields}
+
+    def _compile(self, field):
+        # each validator returns (value, repaired)
+        def nullable(check):
+            def validate(value):
+                if value is None or (isinstance(value, str) and value.strip().lower() in _NULLS):
+                    return (None, value is not None) if field.nullable else (field.default, True)
+                return check(value)
+            return validate
+
+        if field.kind == 'enum':
+            lookup = {_norm(c): c for c in field.choices}
+            def check(value):
+                if value in field.choices:
+                    return value, False
+                match = lookup.get(_norm(value))
+                return (match, False) if match is not None else (field.default, True)
+            return nullable(check)
+
+        if field.kind == 'bool':
+            def check(value):
+                if isinstance(value, bool):
+                    return value, False
+                text = _norm(value)
+                if text in ('true', 'yes', '1', 'y'):
+                    return True, True
+                if text in ('false', 'no', '0', 'n'):
+                    return False, True
+                return field.default, True
+            return nullable(check)
+
+        if field.kind == 'date':
+            def check(value):
+                text = str(value)
+                match = _DATE.search(text)
+                parts = match and (match.group(1), match.group(2), match.group(3))
+                if not parts:
+                    match = _DMY.search(text)   # Indian day-first dates
+                    parts = match and (match.group(3), match.group(2), match.group(1))
+                try:
+                    iso = datetime.date(*map(int, parts)).isoformat()
+                except (TypeError, ValueError):
+                    return field.default, True
+                return iso, iso != value
+            return nullable(check)
+
+        if field.kind == 'time':
+            def check(value):
+                match = _TIME.fullmatch(str(value).strip())
+                if not match:
+                    return field.default, True
+                hour, minute = int(match.group(1)), int(match.group(2) or 0)
+                meridiem = (match.group(3) or '').lower()
+                if meridiem == 'p' and hour < 12:
+                    hour += 12
+                elif meridiem == 'a' and hour == 12:
+                    hour = 0
+                if hour > 23 or minute > 59:
+                    return field.default, True
+                hhmm = f'{hour:02d}:{minute:02d}'
+                return hhmm, hhmm != value
+            return nullable(check)
+
+        if field.kind == 'url':
+            def check(value):
+                match = _URL.search(str(value))
+                if not match:
+                    return field.default, True
+                url = match.group(0).rstrip('.,;)>]')
+                return url, url != value
+            return nullable(check)
+
+        def check(value):   # string
+            text = value if isinstance(value, str) else json.dumps(value) \
+                if isinstance(value, (dict, list)) else str(value)
+            text = text.strip()
+            if not text:
+                return field.default, True
+            return text, text != value
+        return nullable(check)
+
+    def validate(self, obj):
+        """
+        (clean dict, repaired field names, missing field names). Every schema
+        field is present in the result; unknown keys are dropped.
+        """
+        result, repaired, missing = {}, [], []
+        for field in self.fields:
+            value = obj.get(field.name, _MISSING)
+            if value is _MISSING:
+                result[field.name] = field.default
+                missing.append(field.name)
+                continue
+            result[field.name], was_repaired = self.validators[field.name](value)
+            if was_repaired:
+                repaired.append(field.name)
+        return result, repaired, missing
+
+    def gemini_schema(self):
+        """OpenAPI-subset schema for Gemini's response_schema"""
+        properties = {}
+        for field in self.fields:
+            prop = {'type': 'BOOLEAN' if field.kind == 'bool' else 'STRING'}
+            if field.kind == 'enum':
+                prop['enum'] = list(field.choices)
+            if field.nullable:
+                prop['nullable'] = True
+            properties[field.name] = prop
+        return {'type': 'OBJECT', 'properties': properties,
+                'required': [f.name for f in self.fields]}
+
+    def json_schema(self):
+        """Standard JSON Schema, for runtimes that constrain output to one (llm_backends.LocalBackend)"""
+        properties = {}
+        for field in self.fields:
+            kind = 'boolean' if field.kind == 'bool' else 'string'
+            prop = {'type': [kind, 'null'] if field.nullable else kind}
+            if field.kind == 'enum':
+                prop['enum'] = list(field.choices)
+            properties[field.name] = prop
+        return {'type': 'object', 'properties': properties,
+                'required': [f.name for f in self.fields]}
+
+
+# ── GEMINI JSON MODE ──────────────────────────────────
+def json_generation_config(schema):
+    """generation_config asking Gemini for JSON that matches `schema`"""
+    return {'response_mime_type': 'application/json', 'response_schema': schema.gemini_schema()}
+
+
+# ── METRICS ───────────────────────────────────────────
+class ParseStats:
+    """
+    Outcome counters per operation (this process only):
+      local     answered by the local model, no Gemini call
+      valid     parsed and schema-valid as returned
+      repaired  parsed, some fields repaired or defaulted
+      wasted    a response came back but no JSON object could be recovered
+      failed    the request itself failed (no response)
+    """
+
+    OUTCOMES = ('local', 'valid', 'repaired', 'wasted', 'failed')
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._counts = {}
+        self._fields = {}
+
+    def record(self, op, outcome, fields=()):
+        with self._lock:
+            counts = self._counts.setdefault(op, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+            per_field = self._fields.setdefault(op, {})
+            for name in fields:
+                per_field[name] = per_field.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            rows = []
+            for op, counts in self._counts.items():
+                responses = counts['valid'] + counts['repaired'] + counts['wasted']
+                calls     = responses + counts['failed']   # Gemini calls; local answers aren't
+                rows.append({
+                    'op': op, 'calls': calls, **counts,
+                    'wasted_rate':   counts['wasted'] / responses if responses else 0.0,
+                    'repaired_rate': counts['repaired'] / responses if responses else 0.0,
+                    'local_rate':    counts['local'] / (calls + counts['local'])
+                                     if calls + counts['local'] else 0.0,
+                    'repaired_fields': dict(sorted(self._fields.get(op, {}).items(),
+                                                   key=lambda kv: -kv[1])),
+                })
+            return rows
+
+
+parse_stats = ParseStats()
+
+
+def parse_response(op, schema, text):
+    """
+    Validated dict from a Gemini response text, or None if the call was
+    wasted. Records the outcome in parse_stats.
+    """
+    obj = extract_json(text)
+    if obj is None:
+        parse_stats.record(op, 'wasted')
+        return None
+    result, repaired, missing = schema.validate(obj)
+    fixed = repaired + missing
+    parse_stats.record(op, 'repaired' if fixed else 'valid', fixed)
+    return result
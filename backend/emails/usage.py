@@ -0,0 +1,150 @@
+# emails/usage.py
+# Per-user Gemini accounting: a ledger of calls, tokens and latency per user,
+# UTC day and operation (models' gemini_usage), and daily budgets checked by
+# gemini_client before every generate_content.
+#
+#   attribution  a user's work runs inside attribute(google_id) — run_fetch,
+#                the re-classification retries and the preferences view. Like
+#                the deadline it is a contextvar, so tasks spawned inside the
+#                block count too. Calls outside any block are recorded under
+#                google_id None and never refused.
+#   tokens       the response's usage_metadata when the SDK reports it, else
+#                estimated at 4 characters per token (condense.estimate_tokens)
+#   budgets      GEMINI_USER_DAILY_CALLS and GEMINI_USER_DAILY_TOKENS (0 turns
+#                a limit off). A user at either limit has further calls
+#                refused until the next UTC day: classify falls back (and the
+#                re-classification queue retries later), interpret returns
+#                its default profile. Calls already in flight when the limit
+#                is reached still finish, so a fetch can overshoot by up to
+#                GEMINI_CONCURRENCY calls.
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from .condense import estimate_tokens
+from .models import USAGE_COUNTERS, get_gemini_usage, get_user, record_gemini_usage, run_async
+
+# google_id the current Gemini calls are made for, None when unattributed
+USER = contextvars.ContextVar('gemini_user', default=None)
+
+
+@contextmanager
+def attribute(google_id):
+    """Count every Gemini call made inside the block (and tasks it spawns) against `google_id`"""
+    token = USER.set(google_id)
+    try:
+        yield
+    finally:
+        USER.reset(token)
+
+
+def today():
+    return datetime.utcnow().date().isoformat()
+
+
+# ── BUDGETS ───────────────────────────────────────────
+def over_budget(google_id, operation):
+    """
+    Why `google_id` may not make another call today (e.g. '300/300 calls
+    today'), or None. A refusal is counted in the ledger.
+    """
+    calls_limit, tokens_limit = settings.GEMINI_USER_DAILY_CALLS, settings.GEMINI_USER_DAILY_TOKENS
+    if google_id is None or not (calls_limit or tokens_limit):
+        return None
+    used = totals(get_gemini_usage(google_id, since=today()))
+    if calls_limit and used['calls'] >= calls_limit:
+        reason = f"{used['calls']}/{calls_limit} calls today"
+    elif tokens_limit and used['tokens'] >= tokens_limit:
+        reason = f"{used['tokens']}/{tokens_limit} tokens today"
+    else:
+        return None
+    record_gemini_usage(google_id, today(), operation, refused=1)
+    return reason
+
+
+async def over_budget_async(google_id, operation):
+    if google_id is None or not (settings.GEMINI_USER_DAILY_CALLS or settings.GEMINI_USER_DAILY_TOKENS):
+        return None
+    return await run_async(over_budget, google_id, operation)
+
+
+# ── LEDGER ────────────────────────────────────────────
+def text_of(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return ''.join(text_of(c) for c in contents)
+    return ''
+
+
+def counts(contents, response, latency):
+    """Ledger increments for one call; `response` is None when it failed"""
+    if response is None:
+        return {'calls': 1, 'failed': 1, 'latency_ms': round(latency * 1000)}
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is not None and getattr(metadata, 'prompt_token_count', 0):
+        input_tokens  = metadata.prompt_token_count
+        output_tokens = getattr(metadata, 'candidates_token_count', 0) or 0
+    else:
+        try:
+            text = response.text
+        except Exception:   # blocked or empty candidates
+            text = ''
+        input_tokens, output_tokens = estimate_tokens(text_of(contents)), estimate_tokens(text)
+    return {'calls': 1, 'input_tokens': input_tokens, 'output_tokens': output_tokens,
+            'latency_ms': round(latency * 1000)}
+
+
+def record(google_id, operation, contents, response, latency):
+    try:
+        record_gemini_usage(google_id, today(), operation, **counts(contents, response, latency))
+    except Exception as e:   # accounting must never fail the call it accounts for
+        print(f"Gemini usage ledger error: {e}")
+
+
+async def record_async(google_id, operation, contents, response, latency):
+    await run_async(record, google_id, operation, contents, response, latency)
+
+
+# ── AGGREGATES ────────────────────────────────────────
+def totals(rows):
+    """Summed counters of ledger rows, plus tokens (input + output) and mean latency"""
+    summed = {c: sum(r.get(c, 0) for r in rows) for c in USAGE_COUNTERS}
+    summed['tokens'] = summed['input_tokens'] + summed['output_tokens']
+    summed['mean_latency_ms'] = round(summed['latency_ms'] / summed['calls']) if summed['calls'] else 0
+    return summed
+
+
+def group(rows, field):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.get(field), []).append(row)
+    return groups
+
+
+def totals_by(rows, field):
+    return {k: totals(v) for k, v in sorted(group(rows, field).items(), key=lambda kv: str(kv[0]))}
+
+
+def stats(days=7):
+    """Usage of the last `days` UTC days: overall, per operation, per day and per user"""
+    since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    rows  = get_gemini_usage(since=since)
+    users = []
+    for google_id, user_rows in group(rows, 'google_id').items():
+        user = get_user(google_id) if google_id else None
+        users.append(dict(totals(user_rows), google_id=google_id,
+                          email=(user or {}).get('email'),
+                          today=totals([r for r in user_rows if r.get('day') == today()]),
+                          operations=totals_by(user_rows, 'operation')))
+    users.sort(key=lambda u: -u['tokens'])
+    return {'since': since, 'today': today(),
+            'limits': {'calls': settings.GEMINI_USER_DAILY_CALLS,
+                       'tokens': settings.GEMINI_USER_DAILY_TOKENS},
+            'totals': totals(rows),
+            'operations': totals_by(rows, 'operation'),
+            'days': totals_by(rows, 'day'),
+            'users': users}
+
@@ -1,34 +1,47 @@
 # emails/views.py — FIXED
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+import asyncio
 import json
 
-from .gmail_service import fetch_emails
-from .gemini_service import interpret_preferences, classify_all_emails
-from .calendar_service import create_calendar_event
+from .cache import cache_stats
+from .decorators import (
+    admin_required, auth_required, csrf_exempt, etag_versioned, require_http_methods, with_deadline,
+)
+from .gemini_service import interpret_preferences
+from .events import broker, parse_last_event_id, stream_events, stream_events_sync
+from .responses import FastJsonResponse
+from .structured import parse_stats
+from . import gemini_client, usage
+from .pipeline import run_fetch, GmailFetchError
+from .ranking import rescore_emails
 from .models import (
-    get_user, save_email, update_email_classification,
+    run_async, get_user,
     get_emails, search_emails, save_preferences, get_preferences,
-    create_notification, get_unseen_notifications, mark_notifications_seen,
-    get_calendar_events, save_calendar_event, create_indexes  # FIX: added calendar event storage and indexes
+    get_unseen_notifications, mark_notifications_seen,
+    get_calendar_events, save_calendar_event, create_indexes,  # FIX: added calendar event storage and indexes
+    get_dashboard, email_bucket, DASHBOARD_BUCKETS,
+    reclassify_queue_stats,
 )
 
 
-def auth_required(view_func):
-    """FIX: Added functools.wraps to preserve function metadata"""
-    import functools
-    @functools.wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if not request.session.get('google_id'):
-            return JsonResponse({'error': 'Not authenticated'}, status=401)
-        return view_func(request, *args, **kwargs)
-    return wrapper
+def parse_fields(value):
+    """
+    `fields=` query param for the email list endpoints: a comma-separated list
+    of fields, `all` for every field, or absent for everything except the body
+    """
+    if not value:
+        return None
+    if value == 'all':
+        return '*'
+    return tuple(f.strip() for f in value.split(',') if f.strip())
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
 @auth_required
+@with_deadline(settings.FETCH_DEADLINE)
 def save_user_preferences(request):
     google_id = request.session.get('google_id')
     try:
@@ -45,7 +58,8 @@ def save_user_preferences(request):
         priority_profile = None
         if raw_text:
             try:
-                priority_profile = interpret_preferences(raw_text)
+                with usage.attribute(google_id):
+                    priority_profile = interpret_preferences(raw_text)
             except Exception as ge:
                 print(f'Gemini preference error (using fallback): {ge}')
                 from college_data import CLUBS, FESTS
@@ -63,9 +77,17 @@ def save_user_preferences(request):
             informals_enabled=informals, informal_categories=informal_cats,
             manual_absences=manual_absences
         )
+
+        # New profile → re-rank what's already stored, locally, without Gemini
+        rescored = 0
+        if raw_text:
+            try:
+                rescored = rescore_emails(google_id, priority_profile)
+            except Exception as re_err:
+                print(f'Re-ranking error: {re_err}')
         return JsonResponse({
             'success': True, 'priority_profile': priority_profile,
-            'message': 'Preferences saved!'
+            'rescored': rescored, 'message': 'Preferences saved!'
         })
     except Exception as e:
         import traceback; traceback.print_exc()
@@ -74,9 +96,9 @@ def save_user_preferences(request):
 
 @require_http_methods(["GET"])
 @auth_required
-def get_user_preferences(request):
-    google_id = request.session.get('google_id')
-    prefs = get_preferences(google_id)
+@etag_versioned('preferences')
+async def get_user_preferences(request):
+    prefs = await run_async(get_preferences, request.google_id)
     if not prefs:
         return JsonResponse({'has_preferences': False})
     if '_id' in prefs:
@@ -87,10 +109,11 @@ def get_user_preferences(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 @auth_required
-def fetch_and_classify(request):
-    google_id = request.session.get('google_id')
-    user  = get_user(google_id)
-    prefs = get_preferences(google_id)
+@with_deadline(settings.FETCH_DEADLINE)
+async def fetch_and_classify(request):
+    google_id = request.google_id
+    user, prefs = await asyncio.gather(run_async(get_user, google_id),
+                                       run_async(get_preferences, google_id))
 
     if not user:
         print(f"Fetch Error: User with google_id {google_id} not found in database.")
@@ -100,76 +123,10 @@ def fetch_and_classify(request):
         return JsonResponse({'error': 'Set preferences first'}, status=400)
 
     try:
-        # 1. Fetch emails from Gmail
-        try:
-            emails = fetch_emails(user['token'], max_results=30)
-        except Exception as ge:
-            import traceback; traceback.print_exc()
-            return JsonResponse({'error': f'Gmail fetch failed: {ge}'}, status=500)
-
-        for email in emails:
-            save_email(google_id, email)
-
-        # 2. Classify with Gemini (graceful fallback per email)
-        priority_profile = prefs.get('priority_profile', {})
-        try:
-            classifications = classify_all_emails(emails, priority_profile)
-        except Exception as ce:
-            print(f'Gemini classify error: {ce}')
-            classifications = []
-
-        calendar_count = 0
-        notify_count   = 0
-
-        for gmail_id, classification in classifications:
-            update_email_classification(google_id, gmail_id, classification)
-
-            # FIX: Upload EVERYTHING to calendar if it has a date, regardless of priority action
-            if classification['action'] == 'add_to_calendar' or classification.get('event_date'):
-                email_data = next((e for e in emails if e['gmail_id'] == gmail_id), None)
-                if email_data:
-                    # Try creating Google Calendar event — non-blocking
-                    try:
-                        result = create_calendar_event(
-                            token_dict=user['token'],
-                            subject=email_data['subject'],
-                            summary=classification['summary'],
-                            event_date=classification['event_date'],
-                            colour=classification['colour']
-                        )
-                    except Exception:
-                        result = {}
-                    save_calendar_event(google_id, {
-                        'gmail_id':          gmail_id,
-                        'title':             email_data['subject'],
-                        'summary':           classification['summary'],
-                        'event_date':        classification['event_date'],
-                        'event_time':        classification.get('event_time'),
-                        'event_venue':       classification.get('event_venue'),
-                        'registration_link': classification.get('registration_link'),
-                        'organizer':         classification.get('organizer'),
-                        'colour':            classification['colour'],
-                        'quadrant':          classification['quadrant'],
-                        'class':             classification['class'],
-                        'google_event_id':   result.get('event_id'),
-                    })
-                    calendar_count += 1
-
-            if classification['action'] == 'notify':
-                email_data = next((e for e in emails if e['gmail_id'] == gmail_id), None)
-                if email_data:
-                    create_notification(
-                        google_id=google_id, gmail_id=gmail_id,
-                        message=classification['summary'],
-                        importance=classification['importance']
-                    )
-                    notify_count += 1
-
-        return JsonResponse({
-            'success': True, 'fetched': len(emails),
-            'classified': len(classifications),
-            'calendar_added': calendar_count, 'notifications': notify_count,
-        })
+        return JsonResponse(await run_fetch(google_id, user, prefs, max_results=30))
+    except GmailFetchError as ge:
+        import traceback; traceback.print_exc()
+        return JsonResponse({'error': str(ge)}, status=500)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -178,24 +135,27 @@ def fetch_and_classify(request):
 
 @require_http_methods(["GET"])
 @auth_required
-def get_user_emails(request):
-    google_id    = request.session.get('google_id')
+@etag_versioned('emails')
+async def get_user_emails(request):
+    google_id    = request.google_id
     quadrant     = request.GET.get('quadrant')
     class_filter = request.GET.get('class')
     is_informal  = request.GET.get('informal', 'false').lower() == 'true'
     limit        = int(request.GET.get('limit', 50))
 
-    emails = get_emails(google_id, quadrant=quadrant, class_filter=class_filter,
-                        is_informal=is_informal, limit=limit)
+    collapse     = request.GET.get('collapse', 'false').lower() == 'true'
+
+    fields       = parse_fields(request.GET.get('fields'))
 
-    grouped = {'Q1': [], 'Q2': [], 'Q3': [], 'Q4': [], 'informal': []}
+    emails = await run_async(get_emails, google_id, quadrant=quadrant, class_filter=class_filter,
+                             is_informal=is_informal, limit=limit, fields=fields, collapse=collapse)
+
+    # grouped holds gmail_ids into `emails` rather than a second copy of every record
+    grouped = {bucket: [] for bucket in DASHBOARD_BUCKETS}
     for e in emails:
-        if e.get('is_informal'):
-            grouped['informal'].append(e)
-        else:
-            grouped[e.get('quadrant', 'Q4')].append(e)
+        grouped[email_bucket(e)].append(e['gmail_id'])
 
-    return JsonResponse({
+    return FastJsonResponse({
         'success': True, 'emails': emails, 'grouped': grouped,
         'counts': {k: len(v) for k, v in grouped.items()}
     })
@@ -203,11 +163,23 @@ def get_user_emails(request):
 
 @require_http_methods(["GET"])
 @auth_required
-def get_user_calendar_events(request):
+@etag_versioned('emails', 'calendar', 'notifications')
+async def get_user_dashboard(request):
+    """
+    Precomputed dashboard snapshot: quadrant counts, newest emails per quadrant,
+    upcoming events and unseen-notification count in one lookup
+    """
+    snapshot = await run_async(get_dashboard, request.google_id)
+    return FastJsonResponse({'success': True, 'dashboard': snapshot})
+
+
+@require_http_methods(["GET"])
+@auth_required
+@etag_versioned('calendar')
+async def get_user_calendar_events(request):
     """NEW endpoint: get all calendar events for the dashboard calendar"""
-    google_id = request.session.get('google_id')
-    events = get_calendar_events(google_id)
-    return JsonResponse({'success': True, 'events': events, 'count': len(events)})
+    events = await run_async(get_calendar_events, request.google_id)
+    return FastJsonResponse({'success': True, 'events': events, 'count': len(events)})
 
 
 @csrf_exempt
@@ -253,22 +225,48 @@ def add_manual_event(request):
 
 @require_http_methods(["GET"])
 @auth_required
-def search_user_emails(request):
-    google_id  = request.session.get('google_id')
+@etag_versioned('emails')
+async def search_user_emails(request):
     query_text = request.GET.get('q', '').strip()
     if not query_text:
         return JsonResponse({'error': 'q param required'}, status=400)
-    results = search_emails(google_id, query_text)
-    return JsonResponse({'success': True, 'query': query_text,
-                         'count': len(results), 'results': results})
+    results = await run_async(search_emails, request.google_id, query_text,
+                              fields=parse_fields(request.GET.get('fields')))
+    return FastJsonResponse({'success': True, 'query': query_text,
+                             'count': len(results), 'results': results})
 
 
 @require_http_methods(["GET"])
 @auth_required
-def get_notifications(request):
-    google_id = request.session.get('google_id')
-    notifs    = get_unseen_notifications(google_id)
-    return JsonResponse({'success': True, 'notifications': notifs, 'count': len(notifs)})
+@etag_versioned('notifications')
+async def get_notifications(request):
+    notifs = await run_async(get_unseen_notifications, request.google_id)
+    return FastJsonResponse({'success': True, 'notifications': notifs, 'count': len(notifs)})
+
+
+@require_http_methods(["GET"])
+@auth_required
+async def notification_stream(request):
+    """
+    Server-Sent Events: new notifications + fetch progress for this user.
+    EventSource reconnects with Last-Event-ID and gets what it missed.
+    """
+    google_id = request.google_id
+    last_id   = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+
+    if isinstance(request, ASGIRequest):
+        sub    = broker.subscribe(google_id, last_id, loop=asyncio.get_running_loop())
+        stream = stream_events(sub)
+    else:
+        # WSGI (runserver) would buffer an async generator forever
+        sub    = broker.subscribe(google_id, last_id)
+        stream = stream_events_sync(sub)
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'   # don't let nginx buffer the stream
+    return response
 
 
 @csrf_exempt
@@ -299,3 +297,38 @@ def toggle_attendance(request):
             return JsonResponse({'error': 'Could not update attendance'}, status=500)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@admin_required
+def get_cache_stats(request):
+    """Hit rates of the per-process user/preference caches (this worker only)"""
+    return JsonResponse({'success': True, 'caches': cache_stats()})
+
+
+@require_http_methods(["GET"])
+@admin_required
+def get_llm_stats(request):
+    """
+    Gemini response outcomes per operation, incl. the wasted-call rate, and
+    the client's breaker/limiter state (this worker only), plus the
+    re-classification queue
+    """
+    return JsonResponse({'success': True, 'operations': parse_stats.stats(),
+                         'client': gemini_client.stats(),
+                         'reclassify_queue': reclassify_queue_stats()})
+
+
+@require_http_methods(["GET"])
+@admin_required
+def get_usage_stats(request):
+    """
+    Gemini calls, tokens and latency from the usage ledger over the last
+    `days` days (default 7): overall, per operation, per day and per user,
+    with each user's usage today against the daily budgets
+    """
+    try:
+        days = max(1, min(int(request.GET.get('days', 7)), 90))
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer'}, status=400)
+    return JsonResponse(dict(usage.stats(days), success=True))
@@ -0,0 +1,5 @@
+# mailmind/asgi.py — serve with an ASGI server, e.g. uvicorn mailmind.asgi:application
+import os
+from django.core.asgi import get_asgi_application
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mailmind.settings')
+application = get_asgi_application()
@@ -0,0 +1,101 @@
+# mailmind/middleware.py
+# Response compression with Accept-Encoding negotiation: brotli when the client
+# accepts it and the `brotli` package is installed, gzip otherwise.
+#
+# Differences from django.middleware.gzip.GZipMiddleware:
+#   - streaming responses (the SSE endpoint) are left alone so events aren't
+#     held back in a compressor buffer
+#   - ETags stay strong: each encoding gets its own tag ("<tag>-br",
+#     "<tag>-gzip") and process_request strips the suffix from If-None-Match,
+#     so emails.decorators.etag_versioned still sees its own tag; a 304 gets
+#     back the suffix the client sent, since a 200 too small to compress went
+#     out with the bare tag
+import re
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_LENGTH     = 200    # below this the headers outweigh the saving
+BROTLI_QUALITY = 5      # 0-11; 5 is the usual sweet spot for dynamic responses
+
+ETAG_SUFFIX = re.compile(r'-(br|gzip)"')
+
+
+def accepted_encodings(header):
+    """'gzip, br;q=0.5, *;q=0' -> {'gzip': 1.0, 'br': 0.5, '*': 0.0}"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header or '')
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def tag_etag(response, coding):
+    etag = response.get('ETag')
+    if etag and etag.endswith('"') and not etag.startswith('W/'):
+        response['ETag'] = f'{etag[:-1]}-{coding}"'
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            suffix = ETAG_SUFFIX.search(if_none_match)
+            request.etag_coding = suffix.group(1) if suffix else None
+            request.META['HTTP_IF_NONE_MATCH'] = ETAG_SUFFIX.sub('"', if_none_match)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.status_code == 304:
+            # match the tag the cached 200 carried: suffixed only if it was compressed
+            coding = getattr(request, 'etag_coding', None)
+            if coding:
+                tag_etag(response, coding)
+            return response
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if coding is None:
+            return response
+        if len(response.content) < MIN_LENGTH:
+            return response
+
+        compressed = compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length']   = str(len(compressed))
+        response['Content-Encoding'] = coding
+        tag_etag(response, coding)
+        return response
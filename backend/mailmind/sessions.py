@@ -0,0 +1,107 @@
+# mailmind/sessions.py
+# File sessions with an in-memory LRU in front (SESSION_ENGINE = 'mailmind.sessions').
+#
+# Django's file backend opens, reads and signature-checks a file on every
+# authenticated request, and never deletes expired files unless someone runs
+# `manage.py clearsessions`. This store:
+#   - serves loads from a per-process LRU, validated by one os.stat(): a cached
+#     entry is used only while the file's mtime and size are unchanged, so a
+#     logout or login handled by another worker is seen immediately
+#   - sweeps expired files in a background thread at most every
+#     SESSION_SWEEP_INTERVAL seconds, triggered by session writes
+#
+# For a stateless alternative set SESSION_ENGINE to
+# 'django.contrib.sessions.backends.signed_cookies' — the session only holds
+# google_id/email/name, so it fits comfortably in a cookie.
+import copy
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.file import SessionStore as FileSessionStore
+from django.core.exceptions import SuspiciousOperation
+
+from emails.cache import LRUCache, register
+
+# mtime/size validate entries, so the TTL only bounds memory held by idle sessions
+session_cache = register(LRUCache('sessions', settings.SESSION_CACHE_SIZE,
+                                  ttl=settings.SESSION_COOKIE_AGE))
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+class SessionStore(FileSessionStore):
+    def load(self):
+        try:
+            path = self._key_to_file()
+            stat = os.stat(path)
+        except (OSError, SuspiciousOperation):
+            self._session_key = None
+            return {}
+
+        key   = self._session_key
+        entry = session_cache.get(key)
+        if entry is not None:
+            mtime_ns, size, data, expiry = entry
+            if (mtime_ns, size) == (stat.st_mtime_ns, stat.st_size) and \
+                    self.get_expiry_age(expiry=expiry) > 0:
+                return copy.deepcopy(data)
+
+        token = session_cache.token()
+        data  = super().load()   # reads the file; deletes it if expired
+        if data and self._session_key == key:
+            session_cache.set(key, (stat.st_mtime_ns, stat.st_size, copy.deepcopy(data),
+                                    self._expiry_date(data)), token)
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        if self._session_key:
+            session_cache.discard(self._session_key)
+        maybe_sweep(type(self))
+
+    def delete(self, session_key=None):
+        key = session_key or self._session_key
+        super().delete(session_key)
+        if key:
+            session_cache.discard(key)
+
+    @classmethod
+    def clear_expired(cls):
+        """
+        Like the file backend's, but files modified within SESSION_COOKIE_AGE
+        can't have expired by age, so they're skipped without being opened
+        """
+        storage_path = cls._get_storage_path()
+        prefix = settings.SESSION_COOKIE_NAME
+        fresh_after = time.time() - settings.SESSION_COOKIE_AGE
+        for name in os.listdir(storage_path):
+            if not name.startswith(prefix) or '_out_' in name:
+                continue
+            try:
+                if os.stat(os.path.join(storage_path, name)).st_mtime > fresh_after:
+                    continue
+            except OSError:
+                continue
+            session = cls(name[len(prefix):])
+            session.create = lambda: None   # load() must not recreate what it deletes
+            session.load()
+
+
+def maybe_sweep(store_class):
+    global _last_sweep
+    now = time.monotonic()
+    with _sweep_lock:
+        if now - _last_sweep < settings.SESSION_SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+    threading.Thread(target=sweep, args=(store_class,), name='session-sweep', daemon=True).start()
+
+
+def sweep(store_class):
+    try:
+        store_class.clear_expired()
+    except Exception as e:
+        print(f"Session sweep failed: {e}")
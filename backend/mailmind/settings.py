@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'mailmind.middleware.CompressionMiddleware',   # gzip/brotli; skips SSE streams
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -62,11 +63,15 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # FIX: Session cookie settings for cross-origin
-SESSION_ENGINE          = 'django.contrib.sessions.backends.file'
+# File sessions behind an in-memory LRU (mailmind/sessions.py); set SESSION_ENGINE to
+# 'django.contrib.sessions.backends.signed_cookies' for stateless cookie sessions
+SESSION_ENGINE          = os.getenv('SESSION_ENGINE', 'mailmind.sessions')
 SESSION_FILE_PATH       = BASE_DIR / 'sessions'
 SESSION_COOKIE_AGE      = 86400
 SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_HTTPONLY = True
+SESSION_CACHE_SIZE      = int(os.getenv('SESSION_CACHE_SIZE', '20000'))
+SESSION_SWEEP_INTERVAL  = int(os.getenv('SESSION_SWEEP_INTERVAL', '3600'))   # seconds between expired-file sweeps
 
 # Make sessions dir if missing
 os.makedirs(BASE_DIR / 'sessions', exist_ok=True)
@@ -86,8 +91,70 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 GEMINI_API_KEY       = os.getenv('GEMINI_API_KEY')
+GEMINI_CONCURRENCY   = int(os.getenv('GEMINI_CONCURRENCY', '4'))   # in-flight classify calls per fetch
+GEMINI_MODEL         = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+# Upload the static prompt prefixes once as Gemini cached content (needs a
+# versioned model, e.g. gemini-1.5-flash-002; without one the prefix is sent
+# with every request as before)
+GEMINI_CONTEXT_CACHE     = os.getenv('GEMINI_CONTEXT_CACHE', 'True') == 'True'
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))   # seconds
+
+# Model behind each LLM operation (emails/llm_backends.py): gemini, local or stub
+LLM_INTERPRET_BACKEND = os.getenv('LLM_INTERPRET_BACKEND', 'gemini')
+LLM_CLASSIFY_BACKEND  = os.getenv('LLM_CLASSIFY_BACKEND', 'gemini')
+# local: a quantized GGUF model run by llama-cpp-python (optional dependency)
+LLM_LOCAL_MODEL_PATH  = os.getenv('LLM_LOCAL_MODEL_PATH', str(BASE_DIR / 'storage' / 'llm.gguf'))
+LLM_LOCAL_CONTEXT     = int(os.getenv('LLM_LOCAL_CONTEXT', '4096'))    # tokens; prefix + condensed body fit
+LLM_LOCAL_THREADS     = int(os.getenv('LLM_LOCAL_THREADS', '0'))       # 0: llama.cpp's default
+LLM_LOCAL_MAX_TOKENS  = int(os.getenv('LLM_LOCAL_MAX_TOKENS', '512'))  # answer length cap
+# stub: simulated seconds per answer, for benchmarks
+LLM_STUB_LATENCY      = float(os.getenv('LLM_STUB_LATENCY', '0'))
+
+# Gemini client guards (emails/gemini_client.py)
+GEMINI_TIMEOUT          = float(os.getenv('GEMINI_TIMEOUT', '20'))        # per request, seconds
+GEMINI_MAX_INFLIGHT     = int(os.getenv('GEMINI_MAX_INFLIGHT', '32'))     # AIMD ceiling, per process
+GEMINI_BREAKER_FAILURES = int(os.getenv('GEMINI_BREAKER_FAILURES', '5'))  # consecutive failures to open
+GEMINI_BREAKER_RESET    = float(os.getenv('GEMINI_BREAKER_RESET', '30'))  # seconds open before a probe
+FETCH_DEADLINE          = float(os.getenv('FETCH_DEADLINE', '25'))        # /api/emails/fetch/ budget, seconds
+
+# Per-user daily Gemini budgets (emails/usage.py); 0 turns a limit off
+GEMINI_USER_DAILY_CALLS  = int(os.getenv('GEMINI_USER_DAILY_CALLS', '300'))      # calls per user per UTC day
+GEMINI_USER_DAILY_TOKENS = int(os.getenv('GEMINI_USER_DAILY_TOKENS', '300000'))  # input + output tokens
+
+# Retrying fallback-classified emails (emails/reclassify.py)
+RECLASSIFY_BATCH        = int(os.getenv('RECLASSIFY_BATCH', '20'))        # emails per background batch
+RECLASSIFY_MAX_ATTEMPTS = int(os.getenv('RECLASSIFY_MAX_ATTEMPTS', '5'))  # then the entry is 'exhausted'
+RECLASSIFY_BACKOFF      = float(os.getenv('RECLASSIFY_BACKOFF', '300'))   # seconds, doubled per failed attempt
+RECLASSIFY_RESERVE      = float(os.getenv('RECLASSIFY_RESERVE', '0.5'))   # share of the Gemini bucket left for fetches
+
+# Near-duplicate clustering at ingest (emails/dedup.py)
+DEDUP_ENABLED     = os.getenv('DEDUP_ENABLED', 'True') == 'True'
+DEDUP_WINDOW_DAYS = int(os.getenv('DEDUP_WINDOW_DAYS', '30'))    # how far back a resend can match
+DEDUP_THRESHOLD   = float(os.getenv('DEDUP_THRESHOLD', '0.7'))   # min estimated shingle Jaccard similarity
+
+# Local classifier trained on stored Gemini labels (emails/local_model.py)
+LOCAL_MODEL_ENABLED   = os.getenv('LOCAL_MODEL_ENABLED', 'True') == 'True'
+LOCAL_MODEL_PATH      = os.getenv('LOCAL_MODEL_PATH', str(BASE_DIR / 'storage' / 'local_model.npz'))
+LOCAL_MODEL_THRESHOLD = float(os.getenv('LOCAL_MODEL_THRESHOLD', '0.9'))   # min confidence to skip Gemini
+
+# Classifier input (emails/condense.py)
+CLASSIFY_BODY_TOKENS = int(os.getenv('CLASSIFY_BODY_TOKENS', '200'))   # body budget per classify prompt, ≈4 chars each
+
+# Global API budgets for the background poller (manage.py poll_mailboxes)
+GMAIL_QUOTA_UNITS_PER_SEC = int(os.getenv('GMAIL_QUOTA_UNITS_PER_SEC', '200'))
+GEMINI_REQUESTS_PER_MIN   = int(os.getenv('GEMINI_REQUESTS_PER_MIN', '15'))
+
+# Per-process LRU cache for user/preference documents (emails/cache.py)
+USER_CACHE_SIZE    = int(os.getenv('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL     = float(os.getenv('USER_CACHE_TTL', '60'))
+CACHE_INVALIDATION = os.getenv('CACHE_INVALIDATION', '')   # 'mongo' to broadcast across workers
+ADMIN_EMAILS       = [e.strip().lower() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()]
+
 GOOGLE_CLIENT_ID     = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 MONGO_URI            = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
 REDIRECT_URI         = os.getenv('REDIRECT_URI', 'http://localhost:8000/auth/callback/')
 FRONTEND_URL         = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+
+# First full Google Calendar sync starts here; later syncs use the stored syncToken
+CALENDAR_SYNC_START  = os.getenv('CALENDAR_SYNC_START', '2026-01-01T00:00:00Z')
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect, render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -51,7 +52,9 @@ def oauth_callback(request):
     flow.fetch_token(authorization_response=request.build_absolute_uri())
     
     credentials = flow.credentials
-    request.session['credentials'] = credentials_to_dict(credentials)
+    # OAuth tokens live on the user document (create_user below), not in the
+    # session — the session only carries the small identity fields
+    request.session.pop('oauth_state', None)
     
     # Get user info
     user_info_service = build('oauth2', 'v2', credentials=credentials)
@@ -105,78 +108,123 @@ def check_auth(request):
         })
     return JsonResponse({'authenticated': False})
 
-def sync_google_calendar(request):
-    """Sync Google Calendar events"""
-    if not request.session.get('google_id'):
+def classify_google_event(event):
+    """Map a Google Calendar event onto the dashboard event shape"""
+    start = event.get('start', {})
+    if 'dateTime' in start:
+        start_date = start['dateTime'][:10]
+        start_time = start['dateTime'][11:16]
+    elif 'date' in start:
+        start_date = start['date']
+        start_time = '00:00'
+    else:
+        return None
+
+    event_data = {
+        'title': event.get('summary', '(No title)'),
+        'event_date': start_date,
+        'event_time': start_time,
+        'summary': event.get('description', ''),
+        'google_event_id': event['id'],
+        'manual': False
+    }
+
+    # Determine event type and quadrant
+    summary_lower = event.get('summary', '').lower()
+    if any(word in summary_lower for word in ['exam', 'test', 'quiz']):
+        event_data.update({'event_type': 'exam', 'class': 'EXAM', 'quadrant': 'Q1'})
+    elif any(word in summary_lower for word in ['assignment', 'due', 'submission']):
+        event_data.update({'event_type': 'assignment', 'class': 'ASSIGNMENT', 'quadrant': 'Q2'})
+    elif any(word in summary_lower for word in ['lecture', 'class', 'session']):
+        event_data.update({'event_type': 'lecture', 'class': 'LECTURE', 'quadrant': 'Q2'})
+    elif any(word in summary_lower for word in ['lab', 'practical']):
+        event_data.update({'event_type': 'lab', 'class': 'LAB', 'quadrant': 'Q2'})
+    elif any(word in summary_lower for word in ['club', 'meeting', 'workshop']):
+        event_data.update({'event_type': 'club', 'class': 'CLUB', 'quadrant': 'Q3'})
+    else:
+        event_data.update({'event_type': 'study', 'class': 'STUDY', 'quadrant': 'Q2'})
+    return event_data
+
+
+async def list_calendar_changes(session, sync_token=None):
+    """
+    Page through events.list. With a sync token only changed/deleted events
+    come back; without one this is a full listing from CALENDAR_SYNC_START.
+    Returns (items, next_sync_token).
+    """
+    from emails.google_async import CALENDAR_API
+    params = {'singleEvents': 'true', 'maxResults': 2500}
+    if sync_token:
+        params['syncToken'] = sync_token
+    else:
+        params['timeMin'] = settings.CALENDAR_SYNC_START
+
+    items = []
+    page_token = None
+    while True:
+        if page_token:
+            params['pageToken'] = page_token
+        result = await session.get(f'{CALENDAR_API}/events', **params)
+        items.extend(result.get('items', []))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return items, result.get('nextSyncToken')
+
+
+async def sync_google_calendar(request):
+    """Sync Google Calendar events — incremental after the first run"""
+    session_get = sync_to_async(request.session.get)
+    google_id = await session_get('google_id')
+    if not google_id:
         return JsonResponse({'error': 'Not authenticated'}, status=401)
     
-    credentials_dict = request.session.get('credentials')
-    if not credentials_dict:
-        return JsonResponse({'error': 'No credentials found'}, status=401)
-    
-    from google.oauth2.credentials import Credentials
-    from googleapiclient.discovery import build
-    
-    credentials = Credentials(**credentials_dict)
-    service = build('calendar', 'v3', credentials=credentials)
-    
-    # Get events from Google Calendar
-    events_result = service.events().list(
-        calendarId='primary',
-        timeMin='2026-01-01T00:00:00Z',
-        maxResults=200,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-    
-    events = events_result.get('items', [])
-    
-    # Save events to database
-    from emails.models import save_calendar_event
-    google_id = request.session['google_id']
-    
-    synced_count = 0
+    from emails.google_async import AsyncGoogleSession, GoogleAPIError
+    from emails.models import (run_async, get_user, set_calendar_sync_token,
+                               save_calendar_events_bulk, delete_calendar_events,
+                               prune_calendar_events)
+
+    user = await run_async(get_user, google_id) or {}
+    if not user.get('token'):
+        return JsonResponse({'error': 'No credentials found — please log in again'}, status=401)
+
+    session = AsyncGoogleSession(user['token'], google_id)
+    sync_token = user.get('calendar_sync_token')
+    try:
+        events, next_sync_token = await list_calendar_changes(session, sync_token)
+    except GoogleAPIError as e:
+        # 410 Gone — the sync token expired, start over with a full sync
+        if e.status != 410:
+            raise
+        sync_token = None
+        events, next_sync_token = await list_calendar_changes(session)
+    resynced = bool(user.get('calendar_sync_token')) and not sync_token   # full listing after a 410
+
+    upserts   = []
+    cancelled = []
     for event in events:
-        start_date = None
-        start_time = ''
-        
-        if 'dateTime' in event['start']:
-            start_date = event['start']['dateTime'][:10]
-            start_time = event['start']['dateTime'][11:16]
-        elif 'date' in event['start']:
-            start_date = event['start']['date']
-            start_time = '00:00'
-            
-        if start_date:
-            event_data = {
-                'title': event['summary'],
-                'event_date': start_date,
-                'event_time': start_time,
-                'summary': event.get('description', ''),
-                'google_event_id': event['id'],
-                'manual': False
-            }
-            
-            # Determine event type and quadrant
-            summary_lower = event.get('summary', '').lower()
-            if any(word in summary_lower for word in ['exam', 'test', 'quiz']):
-                event_data.update({'event_type': 'exam', 'class': 'EXAM', 'quadrant': 'Q1'})
-            elif any(word in summary_lower for word in ['assignment', 'due', 'submission']):
-                event_data.update({'event_type': 'assignment', 'class': 'ASSIGNMENT', 'quadrant': 'Q2'})
-            elif any(word in summary_lower for word in ['lecture', 'class', 'session']):
-                event_data.update({'event_type': 'lecture', 'class': 'LECTURE', 'quadrant': 'Q2'})
-            elif any(word in summary_lower for word in ['lab', 'practical']):
-                event_data.update({'event_type': 'lab', 'class': 'LAB', 'quadrant': 'Q2'})
-            elif any(word in summary_lower for word in ['club', 'meeting', 'workshop']):
-                event_data.update({'event_type': 'club', 'class': 'CLUB', 'quadrant': 'Q3'})
-            else:
-                event_data.update({'event_type': 'study', 'class': 'STUDY', 'quadrant': 'Q2'})
-            
-            save_calendar_event(google_id, event_data)
-            synced_count += 1
+        if event.get('status') == 'cancelled':
+            cancelled.append(event['id'])
+            continue
+        event_data = classify_google_event(event)
+        if event_data:
+            upserts.append(event_data)
+
+    # Save events to database — one bulk write each
+    synced_count  = await run_async(save_calendar_events_bulk, google_id, upserts)
+    deleted_count = await run_async(delete_calendar_events, google_id, cancelled)
+    if resynced:
+        # The full listing omits events deleted while the token was stale —
+        # drop the stored Google events in its window that it lacks
+        deleted_count += await run_async(prune_calendar_events, google_id,
+                                         [e['id'] for e in events if e.get('status') != 'cancelled'],
+                                         settings.CALENDAR_SYNC_START[:10])
+    if next_sync_token:
+        await run_async(set_calendar_sync_token, google_id, next_sync_token)
     
     return JsonResponse({
         'success': True,
         'synced': synced_count,
-        'total': len(events)
-    })
\ No newline at end of file
+        'deleted': deleted_count,
+        'total': len(events),
+        'incremental': bool(sync_token)
+    })